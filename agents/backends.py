@@ -0,0 +1,222 @@
+import asyncio
+import hashlib
+import importlib.util
+import json
+import random
+import threading
+import time
+from collections import deque
+from typing import AsyncIterator, Dict, Iterator, List, Optional
+
+from config import Config
+
+def _gemini_installed() -> bool:
+    try:
+        return importlib.util.find_spec("google.generativeai") is not None
+    except ImportError:
+        return False
+
+# The SDK takes a second or more to import, so it is only looked up here and
+# imported when the first Gemini backend is built
+GEMINI_AVAILABLE = _gemini_installed()
+if not GEMINI_AVAILABLE:
+    print("Warning: google-generativeai not installed. Running in demo mode.")
+
+class ModelBackend:
+    """Interface between the agents and whatever produces completions
+    
+    ``generate`` returns the whole text; ``stream`` yields it in pieces.
+    The async variants default to running the sync ones in a thread. A
+    ``json_schema`` (a JSON Schema object) asks for a JSON response of
+    that shape instead of free text.
+    """
+    
+    model_name = "unknown"
+    
+    def generate(self, prompt: str, json_schema: Optional[Dict] = None) -> str:
+        raise NotImplementedError
+    
+    def stream(self, prompt: str, json_schema: Optional[Dict] = None) -> Iterator[str]:
+        yield self.generate(prompt, json_schema)
+    
+    async def agenerate(self, prompt: str, json_schema: Optional[Dict] = None) -> str:
+        return await asyncio.to_thread(self.generate, prompt, json_schema)
+    
+    async def astream(self, prompt: str, json_schema: Optional[Dict] = None) -> AsyncIterator[str]:
+        yield await self.agenerate(prompt, json_schema)
+
+class GeminiBackend(ModelBackend):
+    """Completions from the Gemini API"""
+    
+    def __init__(self, model_name: str = Config.MODEL_NAME):
+        import google.generativeai as genai
+        
+        if Config.GEMINI_API_KEY:
+            genai.configure(api_key=Config.GEMINI_API_KEY)
+        self.model_name = model_name
+        self.model = genai.GenerativeModel(model_name)
+    
+    @staticmethod
+    def _generation_config(json_schema: Optional[Dict]) -> Optional[Dict]:
+        # The prompt describes the fields; JSON mode keeps the answer parseable
+        return {"response_mime_type": "application/json"} if json_schema else None
+    
+    def generate(self, prompt: str, json_schema: Optional[Dict] = None) -> str:
+        return self.model.generate_content(prompt, generation_config=self._generation_config(json_schema)).text
+    
+    def stream(self, prompt: str, json_schema: Optional[Dict] = None) -> Iterator[str]:
+        for chunk in self.model.generate_content(prompt, stream=True,
+                                                 generation_config=self._generation_config(json_schema)):
+            if chunk.text:
+                yield chunk.text
+    
+    async def agenerate(self, prompt: str, json_schema: Optional[Dict] = None) -> str:
+        response = await self.model.generate_content_async(
+            prompt, generation_config=self._generation_config(json_schema))
+        return response.text
+    
+    async def astream(self, prompt: str, json_schema: Optional[Dict] = None) -> AsyncIterator[str]:
+        async for chunk in await self.model.generate_content_async(
+                prompt, stream=True, generation_config=self._generation_config(json_schema)):
+            if chunk.text:
+                yield chunk.text
+
+class StubRateLimitError(Exception):
+    """Raised by the stub in place of an HTTP 429 from the API"""
+    
+    def __init__(self, retry_after: float):
+        self.retry_after = retry_after
+        super().__init__(f"429 Resource has been exhausted (e.g. check quota). "
+                         f"Please retry in {retry_after:.1f}s.")
+
+class StubBackendError(Exception):
+    """Raised by the stub in place of a transient 5xx from the API"""
+
+class StubBackend(ModelBackend):
+    """Local stand-in for the model API for benchmarks and load tests
+    
+    Responses are a deterministic function of the prompt (a JSON object
+    with the schema's properties when one is given). Each call waits
+    ``latency`` seconds for the first token and then produces the rest at
+    ``tokens_per_second``; ``error_rate`` and ``rate_limit_rate`` make a
+    fraction of calls fail with a server error or a 429. Failures are drawn
+    from a seeded generator, so a run with the same seed and call order
+    fails in the same places. ``quota_per_minute`` additionally answers
+    with a 429 whenever more calls than that arrive within a minute, the
+    way the real API enforces its quota.
+    """
+    
+    model_name = "stub"
+    WORDS = ("learning", "concept", "practice", "example", "model", "review",
+             "module", "summary", "exercise", "principle", "method", "system")
+    
+    def __init__(self, latency: float = 0.5, tokens_per_second: float = 200,
+                 response_tokens: int = 150, error_rate: float = 0.0,
+                 rate_limit_rate: float = 0.0, retry_after: float = 2.0, seed: int = 0,
+                 quota_per_minute: int = 0):
+        self.latency = latency
+        self.tokens_per_second = tokens_per_second
+        self.response_tokens = response_tokens
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.retry_after = retry_after
+        self.quota_per_minute = quota_per_minute
+        self._recent_calls = deque()
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.failures = 0
+    
+    def response_for(self, prompt: str, json_schema: Optional[Dict] = None) -> str:
+        """The text the stub answers ``prompt`` with"""
+        if json_schema:
+            answer = {}
+            for name, spec in json_schema.get("properties", {}).items():
+                text = self.response_for(f"{prompt}\n{name}")
+                answer[name] = text.split("\n") if spec.get("type") == "array" else text
+            return json.dumps(answer)
+        
+        digest = hashlib.sha256(prompt.encode("utf-8")).digest()
+        words = [self.WORDS[digest[i % len(digest)] % len(self.WORDS)]
+                 for i in range(self.response_tokens)]
+        lines = [" ".join(words[i:i + 10]) for i in range(0, len(words), 10)]
+        return "\n".join(f"{n}. {line}" for n, line in enumerate(lines, 1))
+    
+    def _chunks(self, text: str) -> List[str]:
+        lines = text.split("\n")
+        return [line + "\n" for line in lines[:-1]] + lines[-1:]
+    
+    def _chunk_delay(self, chunk: str) -> float:
+        if not self.tokens_per_second:
+            return 0.0
+        return len(chunk.split()) / self.tokens_per_second
+    
+    def _start_call(self):
+        """Count the call and raise the simulated failure, if any"""
+        with self._lock:
+            self.calls += 1
+            if self.quota_per_minute:
+                now = time.time()
+                while self._recent_calls and self._recent_calls[0] <= now - 60:
+                    self._recent_calls.popleft()
+                if len(self._recent_calls) >= self.quota_per_minute:
+                    self.failures += 1
+                    raise StubRateLimitError(self._recent_calls[0] + 60 - now)
+                self._recent_calls.append(now)
+            roll = self._random.random()
+            if roll < self.rate_limit_rate:
+                self.failures += 1
+                raise StubRateLimitError(self.retry_after)
+            if roll < self.rate_limit_rate + self.error_rate:
+                self.failures += 1
+                raise StubBackendError("500 An internal error has occurred (stub)")
+    
+    def generate(self, prompt: str, json_schema: Optional[Dict] = None) -> str:
+        return "".join(self.stream(prompt, json_schema))
+    
+    def stream(self, prompt: str, json_schema: Optional[Dict] = None) -> Iterator[str]:
+        self._start_call()
+        time.sleep(self.latency)
+        for chunk in self._chunks(self.response_for(prompt, json_schema)):
+            time.sleep(self._chunk_delay(chunk))
+            yield chunk
+    
+    async def agenerate(self, prompt: str, json_schema: Optional[Dict] = None) -> str:
+        return "".join([chunk async for chunk in self.astream(prompt, json_schema)])
+    
+    async def astream(self, prompt: str, json_schema: Optional[Dict] = None) -> AsyncIterator[str]:
+        self._start_call()
+        await asyncio.sleep(self.latency)
+        for chunk in self._chunks(self.response_for(prompt, json_schema)):
+            await asyncio.sleep(self._chunk_delay(chunk))
+            yield chunk
+
+_backends: Dict[tuple, Optional[ModelBackend]] = {}
+_backends_lock = threading.Lock()
+
+def create_model_backend(name: str) -> Optional[ModelBackend]:
+    """Build a backend by name; None means demo mode"""
+    if name == "stub":
+        return StubBackend(
+            latency=Config.STUB_LATENCY_SECONDS,
+            tokens_per_second=Config.STUB_TOKENS_PER_SECOND,
+            response_tokens=Config.STUB_RESPONSE_TOKENS,
+            error_rate=Config.STUB_ERROR_RATE,
+            rate_limit_rate=Config.STUB_RATE_LIMIT_RATE,
+            retry_after=Config.STUB_RETRY_AFTER_SECONDS,
+            seed=Config.STUB_SEED,
+            quota_per_minute=Config.STUB_QUOTA_PER_MINUTE,
+        )
+    if name == "gemini":
+        return GeminiBackend(Config.MODEL_NAME) if GEMINI_AVAILABLE else None
+    if name == "demo":
+        return None
+    raise ValueError(f"Unknown model backend: {name}")
+
+def get_model_backend(name: Optional[str] = None) -> Optional[ModelBackend]:
+    """Return the process-wide backend for the configured model, shared by every agent"""
+    key = (name or Config.MODEL_BACKEND, Config.MODEL_NAME)
+    with _backends_lock:
+        if key not in _backends:
+            _backends[key] = create_model_backend(key[0])
+        return _backends[key]
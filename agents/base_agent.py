@@ -1,69 +1,250 @@
+import asyncio
+import itertools
 import time
-from typing import Optional
+from contextlib import contextmanager
+from typing import Callable, Dict, Optional
 
-try:
-    import google.generativeai as genai
-    from config import Config
-    GEMINI_AVAILABLE = True
-except ImportError:
-    GEMINI_AVAILABLE = False
-    print("Warning: google-generativeai not installed. Running in demo mode.")
-
-class RateLimiter:
-    """Simple rate limiter to avoid API limits"""
-    def __init__(self, calls_per_minute: int = 15):
-        self.calls_per_minute = calls_per_minute
-        self.call_times = []
-    
-    def wait_if_needed(self):
-        """Wait if we're approaching rate limits"""
-        now = time.time()
-        # Remove calls older than 1 minute
-        self.call_times = [t for t in self.call_times if now - t < 60]
-        
-        if len(self.call_times) >= self.calls_per_minute:
-            sleep_time = 60 - (now - self.call_times[0])
-            if sleep_time > 0:
-                time.sleep(sleep_time)
-        
-        self.call_times.append(now)
+from services.metrics import (AGENT_BACKOFF_SECONDS, AGENT_CACHE_FALLBACKS, AGENT_CALL_SECONDS,
+                             AGENT_COALESCED, AGENT_FAILURES, AGENT_RETRIES)
+from .backends import ModelBackend, get_model_backend
+from .cache import CompletionCache, get_completion_cache
+from .rate_limiter import RateLimiter, estimate_tokens, get_shared_rate_limiter
+from .result import AgentResult, error_code
+from .retry import RetryPolicy, classify_error, get_circuit_breaker, remaining_budget
+from .single_flight import get_single_flight
 
 class BaseAgent:
-    """Base class for all learning agents"""
+    """Base class for all learning agents
+    
+    An agent with a ``response_schema`` asks the model for JSON of that
+    shape; its text is then the raw JSON for the caller to parse. Answers
+    for which ``cacheable`` returns False are returned but not cached, so
+    one the caller cannot use is asked for again next time. A call
+    identical to one already in flight, from any session, waits for that
+    call's answer instead of making its own.
+    """
     
-    def __init__(self, name: str, system_prompt: str):
+    def __init__(self, name: str, system_prompt: str, backend: Optional[ModelBackend] = None,
+                 response_schema: Optional[Dict] = None, cacheable: Optional[Callable[[str], bool]] = None):
         self.name = name
         self.system_prompt = system_prompt
-        self.max_retries = 3
-        self.rate_limiter = RateLimiter()
+        self.response_schema = response_schema
+        self.cacheable = cacheable
+        self.retry_policy = RetryPolicy()
+        # One limiter for every agent, so the configured quota is global
+        self.rate_limiter = get_shared_rate_limiter()
+        self.cache = get_completion_cache()
+        self.single_flight = get_single_flight()
+        # None means no model is available and the agent answers in demo mode
+        self.backend = backend if backend is not None else get_model_backend()
+        if self.backend is not None:
+            # Shared by every agent on the same provider, so one quota error stops them all
+            self.circuit_breaker = get_circuit_breaker(self.backend.model_name)
+    
+    def run(self, prompt: str, profile: Optional[Dict] = None, use_cache: bool = True,
+            on_chunk: Optional[Callable[[str], None]] = None) -> str:
+        """Execute the agent and return its text, or an apology if it failed
+        
+        See ``call`` for the arguments; use ``call`` directly to tell a
+        failure apart from a real answer.
+        """
+        result = self.call(prompt, profile, use_cache, on_chunk)
+        return result.text if result.ok else self._emit(self._failure_response(result), on_chunk)
+    
+    async def arun(self, prompt: str, profile: Optional[Dict] = None, use_cache: bool = True,
+                   on_chunk: Optional[Callable[[str], None]] = None) -> str:
+        """Async variant of run"""
+        result = await self.acall(prompt, profile, use_cache, on_chunk)
+        return result.text if result.ok else self._emit(self._failure_response(result), on_chunk)
+    
+    def call(self, prompt: str, profile: Optional[Dict] = None, use_cache: bool = True,
+             on_chunk: Optional[Callable[[str], None]] = None) -> AgentResult:
+        """Execute the agent with caching and retry logic
         
-        if GEMINI_AVAILABLE:
-            self.model = genai.GenerativeModel(Config.MODEL_NAME)
-        else:
-            self.model = None
-    
-    def run(self, prompt: str) -> str:
-        """Execute the agent with retry logic"""
-        if not GEMINI_AVAILABLE or self.model is None:
-            return f"[DEMO MODE] {self.name} would process: {prompt[:50]}..."
+        ``profile`` contributes the learner's level and style to the cache
+        key; ``use_cache=False`` bypasses the cache and forces a fresh call.
+        When ``on_chunk`` is given the model response is streamed and each
+        piece of text is passed to it as it arrives; the full text is still
+        returned at the end.
+        """
+        start = time.perf_counter()
+        if self.backend is None:
+            return self._finish(AgentResult(self._emit(self._demo_response(prompt), on_chunk)), start)
         
         full_prompt = f"{self.system_prompt}\n\nUser input: {prompt}"
         
-        for attempt in range(self.max_retries):
+        cache_key, cached = self._check_cache(prompt, profile, use_cache)
+        if cached is not None:
+            return self._finish(AgentResult(self._emit(cached, on_chunk), cached=True), start)
+        
+        if self.single_flight is None:
+            return self._call_model(full_prompt, cache_key, on_chunk, start)
+        result, shared = self.single_flight.do(
+            self._flight_key(prompt, profile),
+            lambda: self._call_model(full_prompt, cache_key, on_chunk, start), share=lambda r: r.ok)
+        return self._finish(self._joined(result, on_chunk), start) if shared else result
+    
+    def _call_model(self, full_prompt: str, cache_key: Optional[str],
+                    on_chunk: Optional[Callable[[str], None]], start: float) -> AgentResult:
+        """Call the model, retrying failures, and cache the answer"""
+        for attempt in itertools.count():
             try:
-                self.rate_limiter.wait_if_needed()
-                response = self.model.generate_content(full_prompt)
+                self.circuit_breaker.before_call()
+                if not self.rate_limiter.acquire(estimate_tokens(full_prompt), timeout=remaining_budget()):
+                    raise TimeoutError("session deadline reached while waiting for the rate limiter")
+                with self._timed_call():
+                    if on_chunk is None:
+                        text = self.backend.generate(full_prompt, self.response_schema)
+                    else:
+                        text = self._generate_streaming(full_prompt, on_chunk)
                 
-                if response.text:
-                    return response.text
-                else:
+                if not text:
                     raise ValueError("Empty response from model")
-                    
+                self.circuit_breaker.record_success()
+                if cache_key is not None and (self.cacheable is None or self.cacheable(text)):
+                    self.cache.set(cache_key, text)
+                return self._finish(AgentResult(text, attempts=attempt + 1), start, full_prompt)
+            
             except Exception as e:
-                if attempt == self.max_retries - 1:
-                    return f"I apologize, but I'm having trouble processing your request right now. Error: {str(e)}"
+                self.circuit_breaker.record_failure(e)
+                delay = self.retry_policy.next_delay(attempt, e)
+                if delay is None:
+                    return self._finish(self._give_up(cache_key, e, attempt + 1, on_chunk), start)
                 
-                print(f"Attempt {attempt + 1} failed, retrying...")
-                time.sleep(2 ** attempt)  # Exponential backoff
+                print(f"Attempt {attempt + 1} failed, retrying in {delay:.1f}s...")
+                self._count_retry(delay)
+                time.sleep(delay)
+    
+    async def acall(self, prompt: str, profile: Optional[Dict] = None, use_cache: bool = True,
+                    on_chunk: Optional[Callable[[str], None]] = None) -> AgentResult:
+        """Async variant of call: awaits the model, the rate limiter and backoff
+        instead of blocking the calling thread"""
+        start = time.perf_counter()
+        if self.backend is None:
+            return self._finish(AgentResult(self._emit(self._demo_response(prompt), on_chunk)), start)
+        
+        full_prompt = f"{self.system_prompt}\n\nUser input: {prompt}"
+        
+        cache_key, cached = self._check_cache(prompt, profile, use_cache)
+        if cached is not None:
+            return self._finish(AgentResult(self._emit(cached, on_chunk), cached=True), start)
         
-        return "I'm unable to process this request at the moment. Please try again later."
\ No newline at end of file
+        if self.single_flight is None:
+            return await self._acall_model(full_prompt, cache_key, on_chunk, start)
+        result, shared = await self.single_flight.ado(
+            self._flight_key(prompt, profile),
+            lambda: self._acall_model(full_prompt, cache_key, on_chunk, start), share=lambda r: r.ok)
+        return self._finish(self._joined(result, on_chunk), start) if shared else result
+    
+    async def _acall_model(self, full_prompt: str, cache_key: Optional[str],
+                           on_chunk: Optional[Callable[[str], None]], start: float) -> AgentResult:
+        """Async variant of _call_model"""
+        for attempt in itertools.count():
+            try:
+                self.circuit_breaker.before_call()
+                if not await self.rate_limiter.acquire_async(estimate_tokens(full_prompt),
+                                                             timeout=remaining_budget()):
+                    raise TimeoutError("session deadline reached while waiting for the rate limiter")
+                with self._timed_call():
+                    if on_chunk is None:
+                        text = await self.backend.agenerate(full_prompt, self.response_schema)
+                    else:
+                        text = await self._agenerate_streaming(full_prompt, on_chunk)
+                
+                if not text:
+                    raise ValueError("Empty response from model")
+                self.circuit_breaker.record_success()
+                if cache_key is not None and (self.cacheable is None or self.cacheable(text)):
+                    self.cache.set(cache_key, text)
+                return self._finish(AgentResult(text, attempts=attempt + 1), start, full_prompt)
+            
+            except Exception as e:
+                self.circuit_breaker.record_failure(e)
+                delay = self.retry_policy.next_delay(attempt, e)
+                if delay is None:
+                    return self._finish(self._give_up(cache_key, e, attempt + 1, on_chunk), start)
+                
+                print(f"Attempt {attempt + 1} failed, retrying in {delay:.1f}s...")
+                self._count_retry(delay)
+                await asyncio.sleep(delay)
+    
+    @staticmethod
+    def _finish(result: AgentResult, start: float, full_prompt: Optional[str] = None) -> AgentResult:
+        """Stamp a result with its latency and, for model calls, estimated tokens"""
+        result.latency = time.perf_counter() - start
+        if full_prompt is not None:
+            result.tokens = estimate_tokens(full_prompt) + estimate_tokens(result.text)
+        return result
+    
+    def _flight_key(self, prompt: str, profile: Optional[Dict]) -> str:
+        """Calls with the same key get the same answer, so they can share one"""
+        return CompletionCache.make_key(self.system_prompt, prompt, self.backend.model_name, profile)
+    
+    def _joined(self, result: AgentResult, on_chunk: Optional[Callable[[str], None]]) -> AgentResult:
+        """A follower's copy of the answer to the call it joined"""
+        AGENT_COALESCED.inc(agent=self.name)
+        return AgentResult(self._emit(result.text, on_chunk), cached=result.cached, stale=result.stale,
+                           coalesced=True)
+    
+    def _check_cache(self, prompt: str, profile: Optional[Dict], use_cache: bool):
+        """Return ``(cache_key, cached_text)``; either may be None"""
+        if self.cache is None:
+            return None, None
+        cache_key = CompletionCache.make_key(self.system_prompt, prompt, self.backend.model_name, profile)
+        return cache_key, self.cache.get(cache_key) if use_cache else None
+    
+    @contextmanager
+    def _timed_call(self):
+        """Observe one model call's latency, labelled with its outcome"""
+        start = time.perf_counter()
+        outcome = "error"
+        try:
+            yield
+            outcome = "ok"
+        finally:
+            AGENT_CALL_SECONDS.observe(time.perf_counter() - start, agent=self.name, outcome=outcome)
+    
+    def _count_retry(self, backoff: float):
+        AGENT_RETRIES.inc(agent=self.name)
+        AGENT_BACKOFF_SECONDS.inc(backoff, agent=self.name)
+    
+    def _give_up(self, cache_key: Optional[str], error: Exception, attempts: int,
+                 on_chunk: Optional[Callable[[str], None]]) -> AgentResult:
+        """Result once the last attempt failed: a cached completion if there
+        is one, even an expired one, otherwise the error"""
+        AGENT_FAILURES.inc(agent=self.name, reason=classify_error(error))
+        if cache_key is not None:
+            stale = self.cache.get(cache_key, allow_stale=True)
+            if stale is not None:
+                AGENT_CACHE_FALLBACKS.inc(agent=self.name)
+                return AgentResult(self._emit(stale, on_chunk), attempts=attempts, cached=True, stale=True)
+        message = str(error).split("\n", 1)[0][:200]
+        return AgentResult(error_code=error_code(error), error=message, attempts=attempts)
+    
+    def _demo_response(self, prompt: str) -> str:
+        return f"[DEMO MODE] {self.name} would process: {prompt[:50]}..."
+    
+    def _failure_response(self, result: AgentResult) -> str:
+        return f"I apologize, but I'm having trouble processing your request right now. Error: {result.error}"
+    
+    def _generate_streaming(self, full_prompt: str, on_chunk: Callable[[str], None]) -> str:
+        """Stream a response from the model, forwarding each chunk"""
+        pieces = []
+        for chunk in self.backend.stream(full_prompt, self.response_schema):
+            pieces.append(chunk)
+            on_chunk(chunk)
+        return "".join(pieces)
+    
+    async def _agenerate_streaming(self, full_prompt: str, on_chunk: Callable[[str], None]) -> str:
+        pieces = []
+        async for chunk in self.backend.astream(full_prompt, self.response_schema):
+            pieces.append(chunk)
+            on_chunk(chunk)
+        return "".join(pieces)
+    
+    @staticmethod
+    def _emit(text: str, on_chunk: Optional[Callable[[str], None]]) -> str:
+        """Deliver a complete (non-streamed) response to a streaming caller"""
+        if on_chunk is not None:
+            on_chunk(text)
+        return text
\ No newline at end of file
@@ -0,0 +1,217 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Optional, Tuple
+
+from config import Config
+from services.metrics import CACHE_REQUESTS
+
+class MemoryCacheTier:
+    """In-process LRU cache with per-entry expiry"""
+    
+    def __init__(self, max_entries: int = 512, ttl: float = 3600):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def get(self, key: str, allow_stale: bool = False) -> Optional[str]:
+        """Look up a value; expired entries stay until evicted and are
+        returned only with ``allow_stale``"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.time() and not allow_stale:
+                return None
+            self._entries.move_to_end(key)
+            return value
+    
+    def set(self, key: str, value: str, ttl: Optional[float] = None):
+        expires_at = time.time() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+    
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+    
+    def __len__(self):
+        return len(self._entries)
+
+class SQLiteCacheTier:
+    """On-disk cache tier shared by every process using the same file"""
+    
+    def __init__(self, filename: str, max_entries: int = 5000, ttl: float = 3600):
+        self.filename = filename
+        self.max_entries = max_entries
+        self.ttl = ttl
+        os.makedirs(os.path.dirname(filename) or ".", exist_ok=True)
+        self._lock = threading.Lock()
+        self._connection = None
+        self._pid = None
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS completions ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, "
+            "expires_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_completions_accessed ON completions(accessed_at)"
+        )
+        self._conn.commit()
+    
+    @property
+    def _conn(self) -> sqlite3.Connection:
+        """The connection of this process; SQLite connections must not cross a fork"""
+        if self._pid != os.getpid():
+            self._connection = sqlite3.connect(self.filename, check_same_thread=False, timeout=10)
+            self._pid = os.getpid()
+        return self._connection
+    
+    def get(self, key: str, allow_stale: bool = False) -> Optional[str]:
+        entry = self.get_entry(key, allow_stale)
+        return None if entry is None else entry[0]
+    
+    def get_entry(self, key: str, allow_stale: bool = False) -> Optional[Tuple[str, float]]:
+        """Look up ``(value, expires_at)``, so the entry can be copied with its remaining lifetime"""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, expires_at FROM completions WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            if row[1] < now and not allow_stale:
+                return None
+            self._conn.execute("UPDATE completions SET accessed_at = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            return row[0], row[1]
+    
+    def set(self, key: str, value: str, ttl: Optional[float] = None):
+        now = time.time()
+        expires_at = now + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO completions (key, value, expires_at, accessed_at) "
+                "VALUES (?, ?, ?, ?)", (key, value, expires_at, now)
+            )
+            # Evict least recently used rows beyond the size bound
+            self._conn.execute(
+                "DELETE FROM completions WHERE key IN ("
+                "SELECT key FROM completions ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,)
+            )
+            self._conn.commit()
+    
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM completions")
+            self._conn.commit()
+    
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM completions").fetchone()[0]
+
+_ttl: ContextVar[Optional[float]] = ContextVar("cache_ttl", default=None)
+
+@contextmanager
+def cache_ttl(ttl: float):
+    """Keep completions cached in this context for ``ttl`` seconds instead of the tiers' default"""
+    token = _ttl.set(ttl)
+    try:
+        yield
+    finally:
+        _ttl.reset(token)
+
+class CompletionCache:
+    """Two-tier cache for agent completions with hit/miss accounting"""
+    
+    def __init__(self, memory_tier: MemoryCacheTier, disk_tier: Optional[SQLiteCacheTier] = None):
+        self.memory_tier = memory_tier
+        self.disk_tier = disk_tier
+        self.hits = 0
+        self.misses = 0
+    
+    @staticmethod
+    def make_key(system_prompt: str, prompt: str, model_name: str, profile: Optional[Dict] = None) -> str:
+        """Hash everything that can change a completion into a cache key"""
+        profile = profile or {}
+        material = json.dumps([
+            system_prompt, prompt, model_name,
+            profile.get("level", ""), profile.get("style", "")
+        ])
+        return hashlib.sha256(material.encode("utf-8")).hexdigest()
+    
+    def get(self, key: str, allow_stale: bool = False) -> Optional[str]:
+        """Look up a completion; ``allow_stale`` also returns expired ones,
+        as a fallback when the model cannot be reached"""
+        value = self.memory_tier.get(key, allow_stale)
+        if value is None and self.disk_tier is not None:
+            entry = self.disk_tier.get_entry(key, allow_stale)
+            if entry is not None:
+                value, expires_at = entry
+                if not allow_stale:
+                    # Promoted with what is left of its lifetime, so repeated hits never extend it
+                    self.memory_tier.set(key, value, expires_at - time.time())
+        
+        if allow_stale:
+            return value
+        if value is None:
+            self.misses += 1
+            CACHE_REQUESTS.inc(result="miss")
+        else:
+            self.hits += 1
+            CACHE_REQUESTS.inc(result="hit")
+        return value
+    
+    def set(self, key: str, value: str, ttl: Optional[float] = None):
+        ttl = _ttl.get() if ttl is None else ttl
+        self.memory_tier.set(key, value, ttl)
+        if self.disk_tier is not None:
+            self.disk_tier.set(key, value, ttl)
+    
+    def clear(self):
+        self.memory_tier.clear()
+        if self.disk_tier is not None:
+            self.disk_tier.clear()
+    
+    def stats(self) -> Dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+            "memory_entries": len(self.memory_tier),
+            "disk_entries": len(self.disk_tier) if self.disk_tier is not None else 0
+        }
+
+_shared_cache: Optional[CompletionCache] = None
+_shared_lock = threading.Lock()
+
+def get_completion_cache() -> Optional[CompletionCache]:
+    """Return the process-wide completion cache, or None when caching is disabled"""
+    global _shared_cache
+    if not Config.CACHE_ENABLED:
+        return None
+    with _shared_lock:
+        if _shared_cache is None:
+            disk_tier = None
+            if Config.CACHE_DB_FILE:
+                disk_tier = SQLiteCacheTier(
+                    Config.CACHE_DB_FILE, Config.CACHE_DISK_MAX_ENTRIES, Config.CACHE_TTL_SECONDS
+                )
+            _shared_cache = CompletionCache(
+                MemoryCacheTier(Config.CACHE_MAX_ENTRIES, Config.CACHE_TTL_SECONDS), disk_tier
+            )
+        return _shared_cache
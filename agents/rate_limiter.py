@@ -0,0 +1,198 @@
+import asyncio
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Optional
+
+try:
+    import fcntl
+    FCNTL_AVAILABLE = True
+except ImportError:
+    FCNTL_AVAILABLE = False
+
+from config import Config
+from services.metrics import RATE_LIMITER_WAIT_SECONDS
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count for quota accounting (about 4 characters per token)"""
+    return max(1, len(text) // 4)
+
+_background: ContextVar[bool] = ContextVar("rate_limit_background", default=False)
+
+@contextmanager
+def background_priority():
+    """Admit calls made in this context only while the buckets keep
+    Config.RATE_LIMIT_BACKGROUND_RESERVE of their capacity for live requests"""
+    token = _background.set(True)
+    try:
+        yield
+    finally:
+        _background.reset(token)
+
+class _MemoryState:
+    """Bucket state shared by the threads of one process"""
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._state: Dict = {}
+    
+    def update(self, fn):
+        with self._lock:
+            result, self._state = fn(self._state)
+            return result
+
+class _FileState:
+    """Bucket state shared by every process on the host through a locked file
+    
+    The file is opened once per process: a forked worker would otherwise
+    share its parent's open file, and with it the flock, so the lock would
+    no longer keep the two apart.
+    """
+    
+    def __init__(self, path: str):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.path = path
+        self._lock = threading.Lock()
+        self._file = None
+        self._pid = None
+    
+    def _handle(self):
+        if self._pid != os.getpid():
+            self._file = open(self.path, "a+")
+            self._pid = os.getpid()
+        return self._file
+    
+    def update(self, fn):
+        with self._lock:
+            f = self._handle()
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                f.seek(0)
+                try:
+                    state = json.loads(f.read() or "{}")
+                except json.JSONDecodeError:
+                    state = {}
+                result, state = fn(state)
+                f.seek(0)
+                f.truncate()
+                f.write(json.dumps(state))
+                f.flush()
+                return result
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+class RateLimiter:
+    """Token-bucket rate limiter for requests and tokens per minute.
+    
+    Both buckets refill continuously, so admission is a constant-time
+    calculation rather than a scan over recent calls. Calls made under
+    ``background_priority`` wait until the buckets are fuller, so live
+    requests are always admitted first.
+    """
+    
+    def __init__(self, calls_per_minute: int = 15, tokens_per_minute: Optional[int] = None,
+                 state_file: Optional[str] = None):
+        self.calls_per_minute = calls_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        if state_file and FCNTL_AVAILABLE:
+            self._state = _FileState(state_file)
+        else:
+            self._state = _MemoryState()
+    
+    def _limits(self) -> Dict[str, int]:
+        limits = {"requests": self.calls_per_minute}
+        if self.tokens_per_minute:
+            limits["tokens"] = self.tokens_per_minute
+        return limits
+    
+    def _check(self, tokens: int, consume: bool):
+        """Refill both buckets and return a state transition for _state.update"""
+        limits = self._limits()
+        cost = {"requests": 1, "tokens": tokens}
+        reserve = Config.RATE_LIMIT_BACKGROUND_RESERVE if _background.get() else 0.0
+        
+        def transition(state):
+            now = time.time()
+            wait = 0.0
+            levels = {}
+            for bucket, per_minute in limits.items():
+                level, updated = state.get(bucket, (per_minute, now))
+                rate = per_minute / 60.0
+                level = min(per_minute, level + max(0.0, now - updated) * rate)
+                needed = min(cost[bucket], per_minute)
+                # Background calls must leave the reserve in the bucket
+                floor = min(per_minute - needed, per_minute * reserve)
+                if level < needed + floor:
+                    wait = max(wait, (needed + floor - level) / rate)
+                levels[bucket] = (level, needed)
+            
+            admitted = consume and wait == 0.0
+            new_state = {}
+            for bucket, (level, needed) in levels.items():
+                new_state[bucket] = (level - needed if admitted else level, now)
+            return (admitted, wait), new_state
+        
+        return transition
+    
+    def try_acquire(self, tokens: int = 1) -> bool:
+        """Take a slot if one is free right now, without blocking"""
+        admitted, _ = self._state.update(self._check(tokens, consume=True))
+        return admitted
+    
+    def time_until_available(self, tokens: int = 1) -> float:
+        """Seconds until a call costing ``tokens`` would be admitted"""
+        _, wait = self._state.update(self._check(tokens, consume=False))
+        return wait
+    
+    def acquire(self, tokens: int = 1, timeout: Optional[float] = None) -> bool:
+        """Block until a slot is available; returns False if ``timeout`` expires first"""
+        with RATE_LIMITER_WAIT_SECONDS.time():
+            deadline = None if timeout is None else time.monotonic() + timeout
+            while True:
+                admitted, wait = self._state.update(self._check(tokens, consume=True))
+                if admitted:
+                    return True
+                if deadline is not None:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        return False
+                    wait = min(wait, remaining)
+                time.sleep(wait)
+    
+    async def acquire_async(self, tokens: int = 1, timeout: Optional[float] = None) -> bool:
+        """Like acquire, but waits with asyncio.sleep so the event loop keeps running"""
+        with RATE_LIMITER_WAIT_SECONDS.time():
+            deadline = None if timeout is None else time.monotonic() + timeout
+            while True:
+                admitted, wait = self._state.update(self._check(tokens, consume=True))
+                if admitted:
+                    return True
+                if deadline is not None:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        return False
+                    wait = min(wait, remaining)
+                await asyncio.sleep(wait)
+    
+    def wait_if_needed(self):
+        """Wait if we're approaching rate limits"""
+        self.acquire()
+
+_shared_limiter: Optional[RateLimiter] = None
+_shared_lock = threading.Lock()
+
+def get_shared_rate_limiter() -> RateLimiter:
+    """Return the process-wide limiter configured from Config"""
+    global _shared_limiter
+    with _shared_lock:
+        if _shared_limiter is None:
+            state_file = Config.RATE_LIMIT_STATE_FILE if Config.RATE_LIMIT_BACKEND == "file" else None
+            _shared_limiter = RateLimiter(
+                calls_per_minute=Config.RATE_LIMIT_CALLS_PER_MINUTE,
+                tokens_per_minute=Config.RATE_LIMIT_TOKENS_PER_MINUTE,
+                state_file=state_file
+            )
+        return _shared_limiter
@@ -0,0 +1,53 @@
+import threading
+from typing import Callable, Dict, List
+
+from .base_agent import BaseAgent
+from .explainer_agent import ExplainerAgent
+from .planner_agent import PlannerAgent
+from .quizmaster_agent import QuizmasterAgent
+
+class AgentRegistry:
+    """Builds each agent on first use and shares it afterwards
+    
+    Agents are registered as factories, so importing the app builds none
+    of them; the first call that needs one pays for looking up its
+    backend, cache and rate limiter, once per process.
+    """
+    
+    def __init__(self):
+        self._factories: Dict[str, Callable[[], BaseAgent]] = {}
+        self._agents: Dict[str, BaseAgent] = {}
+        self._lock = threading.Lock()
+    
+    def register(self, name: str, factory: Callable[[], BaseAgent]):
+        with self._lock:
+            self._factories[name] = factory
+            self._agents.pop(name, None)
+    
+    def get(self, name: str) -> BaseAgent:
+        agent = self._agents.get(name)
+        if agent is None:
+            with self._lock:
+                agent = self._agents.get(name)
+                if agent is None:
+                    agent = self._agents[name] = self._factories[name]()
+        return agent
+    
+    __getitem__ = get
+    
+    def __contains__(self, name: str) -> bool:
+        return name in self._factories
+    
+    def built(self) -> List[str]:
+        """Names of the agents constructed so far"""
+        return sorted(self._agents)
+    
+    def build_all(self):
+        """Construct every registered agent now, e.g. to warm a worker up"""
+        for name in list(self._factories):
+            self.get(name)
+
+AGENTS = AgentRegistry()
+AGENTS.register("planner", PlannerAgent)
+AGENTS.register("explainer", ExplainerAgent)
+AGENTS.register("quizmaster", QuizmasterAgent)
@@ -0,0 +1,74 @@
+import asyncio
+from dataclasses import dataclass
+from typing import Optional
+
+from .retry import FATAL, RATE_LIMITED, CircuitOpenError, classify_error
+
+# Compact codes stored for failed sections instead of the provider's error text
+ERROR_MESSAGES = {
+    "rate_limited": "The model provider's quota is exhausted; try again shortly.",
+    "provider_unavailable": "The model provider is temporarily unavailable.",
+    "timeout": "The model took too long to respond.",
+    "request_rejected": "The model provider rejected the request.",
+    "model_error": "The model failed to respond.",
+    "internal_error": "Something went wrong while preparing this section.",
+}
+
+def error_code(error: BaseException) -> str:
+    """The compact code recorded for a failed agent call"""
+    if isinstance(error, CircuitOpenError):
+        return "provider_unavailable"
+    if isinstance(error, (TimeoutError, asyncio.TimeoutError)):
+        return "timeout"
+    kind = classify_error(error)
+    if kind == RATE_LIMITED:
+        return "rate_limited"
+    if kind == FATAL:
+        return "request_rejected"
+    return "model_error"
+
+def section_error_code(message: str) -> str:
+    """Map a SessionExecutor error string (an AgentCallError's code, a
+    timeout, or any other exception's text) to an error code"""
+    if message in ERROR_MESSAGES:
+        return message
+    if message.startswith("timed out"):
+        return "timeout"
+    return "internal_error"
+
+@dataclass
+class AgentResult:
+    """Outcome of one agent call
+    
+    ``text`` is only meaningful when ``ok``; failures carry a compact
+    ``error_code`` plus a short ``error`` message for logs. ``stale`` marks
+    text served from an expired cache entry after the model failed;
+    ``coalesced`` marks text shared by an identical call already in flight.
+    """
+    
+    text: str = ""
+    error_code: Optional[str] = None
+    error: Optional[str] = None
+    latency: float = 0.0
+    tokens: int = 0
+    attempts: int = 0
+    cached: bool = False
+    stale: bool = False
+    coalesced: bool = False
+    
+    @property
+    def ok(self) -> bool:
+        return self.error_code is None
+    
+    def unwrap(self) -> str:
+        """Return the text, or raise AgentCallError for a failed call"""
+        if not self.ok:
+            raise AgentCallError(self)
+        return self.text
+
+class AgentCallError(Exception):
+    """A failed agent call; ``str()`` is its error code"""
+    
+    def __init__(self, result: AgentResult):
+        self.result = result
+        super().__init__(result.error_code)
@@ -0,0 +1,191 @@
+import random
+import re
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Optional
+
+from config import Config
+
+RATE_LIMITED = "rate_limited"
+RETRYABLE = "retryable"
+FATAL = "fatal"
+
+# Provider hints, e.g. "Please retry in 44.03s." or "retry_delay { seconds: 44 }"
+RETRY_AFTER_PATTERNS = [
+    re.compile(r"retry in ([\d.]+)\s*s", re.IGNORECASE),
+    re.compile(r"retry_delay\s*\{\s*seconds:\s*(\d+)"),
+    re.compile(r"retry-after:\s*([\d.]+)", re.IGNORECASE),
+]
+RATE_LIMITED_MARKERS = ("429", "resource has been exhausted", "quota", "rate limit", "too many requests")
+FATAL_MARKERS = ("400", "401", "403", "404", "api key not valid", "permission denied",
+                 "invalid argument", "not found", "unauthenticated")
+FATAL_ERROR_TYPES = {"InvalidArgument", "PermissionDenied", "Unauthenticated", "NotFound",
+                     "BadRequest", "Forbidden", "TypeError", "AttributeError"}
+RATE_LIMITED_ERROR_TYPES = {"ResourceExhausted", "TooManyRequests", "StubRateLimitError"}
+
+def parse_retry_after(error: BaseException) -> Optional[float]:
+    """Seconds the provider asked us to wait, if the error says"""
+    hint = getattr(error, "retry_after", None)
+    if hint is not None:
+        return float(hint)
+    message = str(error)
+    for pattern in RETRY_AFTER_PATTERNS:
+        match = pattern.search(message)
+        if match:
+            return float(match.group(1))
+    return None
+
+def classify_error(error: BaseException) -> str:
+    """Sort an error into RATE_LIMITED, RETRYABLE or FATAL
+    
+    Unknown errors count as retryable, since most provider hiccups are
+    transient; only errors that cannot succeed on a second try are fatal.
+    """
+    name = type(error).__name__
+    message = str(error).lower()
+    if name in RATE_LIMITED_ERROR_TYPES or any(marker in message for marker in RATE_LIMITED_MARKERS):
+        return RATE_LIMITED
+    if name in FATAL_ERROR_TYPES or any(message.startswith(marker) for marker in FATAL_MARKERS):
+        return FATAL
+    return RETRYABLE
+
+_deadline: ContextVar[Optional[float]] = ContextVar("retry_deadline", default=None)
+
+@contextmanager
+def deadline_at(deadline: float):
+    """Limit retries in this context to finish by ``deadline`` (time.monotonic)"""
+    current = _deadline.get()
+    token = _deadline.set(deadline if current is None else min(current, deadline))
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+def run_with_deadline(deadline: float, fn, *args, **kwargs):
+    """Call ``fn`` with ``deadline`` in effect; for work handed to other threads"""
+    with deadline_at(deadline):
+        return fn(*args, **kwargs)
+
+def remaining_budget() -> Optional[float]:
+    """Seconds left before the current deadline, or None without one"""
+    deadline = _deadline.get()
+    return None if deadline is None else deadline - time.monotonic()
+
+class RetryPolicy:
+    """Decides whether and how long to wait before retrying a failed call
+    
+    Backoff is exponential with full jitter, so retries from concurrent
+    sessions spread out instead of arriving together. A provider
+    retry-after hint replaces the backoff; hints longer than ``max_wait``
+    and waits past the current deadline end the retries instead.
+    """
+    
+    def __init__(self, max_attempts: int = Config.MAX_RETRIES, base_delay: float = Config.RETRY_BASE_DELAY,
+                 max_delay: float = Config.RETRY_MAX_DELAY, max_wait: float = Config.RETRY_MAX_WAIT_SECONDS):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.max_wait = max_wait
+    
+    def next_delay(self, attempt: int, error: BaseException) -> Optional[float]:
+        """Seconds to wait before retrying after failed ``attempt`` (0-based); None to give up"""
+        if attempt + 1 >= self.max_attempts or isinstance(error, CircuitOpenError):
+            return None
+        if classify_error(error) == FATAL:
+            return None
+        
+        hint = parse_retry_after(error)
+        if hint is not None:
+            if hint > self.max_wait:
+                return None
+            delay = hint + random.uniform(0, self.base_delay)
+        else:
+            delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+        
+        budget = remaining_budget()
+        if budget is not None and delay >= budget:
+            return None
+        return delay
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a provider that is known to be failing"""
+    
+    def __init__(self, retry_after: float):
+        self.retry_after = retry_after
+        super().__init__(f"Model provider unavailable, not retrying for {retry_after:.0f}s")
+
+class CircuitBreaker:
+    """Stops calling a provider that keeps failing
+    
+    Opens after ``failure_threshold`` consecutive failures, or at once on
+    a rate-limit error, for ``reset_timeout`` seconds. While open, calls
+    fail fast; once the time is up a single probe call is let through, and
+    its outcome closes or reopens the circuit. A rate-limit error with a
+    retry-after hint opens it for exactly that long, after which calls
+    resume without a probe, since the provider said when to come back.
+    """
+    
+    def __init__(self, failure_threshold: int = Config.CIRCUIT_FAILURE_THRESHOLD,
+                 reset_timeout: float = Config.CIRCUIT_RESET_SECONDS):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.open_until = 0.0
+        self._probe_required = False
+        self._probing = False
+        self._lock = threading.Lock()
+    
+    @property
+    def is_open(self) -> bool:
+        return time.monotonic() < self.open_until
+    
+    def before_call(self):
+        """Raise CircuitOpenError unless a call may go ahead"""
+        with self._lock:
+            now = time.monotonic()
+            if now < self.open_until:
+                raise CircuitOpenError(self.open_until - now)
+            if self.open_until and not self._probe_required:
+                self.open_until = 0.0
+            elif self.open_until:
+                # Cool-down over: let one probe through, fail fast for the rest
+                if self._probing:
+                    raise CircuitOpenError(self.reset_timeout)
+                self._probing = True
+    
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.open_until = 0.0
+            self._probing = False
+    
+    def record_failure(self, error: BaseException):
+        if isinstance(error, CircuitOpenError):
+            return
+        with self._lock:
+            self.failures += 1
+            was_probe, self._probing = self._probing, False
+            hint = parse_retry_after(error)
+            if classify_error(error) == RATE_LIMITED and hint is not None:
+                self._open(hint, probe_required=False)
+            elif (classify_error(error) == RATE_LIMITED or self.failures >= self.failure_threshold
+                  or was_probe):
+                self._open(self.reset_timeout, probe_required=True)
+    
+    def _open(self, seconds: float, probe_required: bool):
+        until = time.monotonic() + seconds
+        if until > self.open_until:
+            self.open_until = until
+            self._probe_required = probe_required
+
+_breakers: Dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+def get_circuit_breaker(name: str) -> CircuitBreaker:
+    """Return the process-wide breaker for a provider"""
+    with _breakers_lock:
+        if name not in _breakers:
+            _breakers[name] = CircuitBreaker()
+        return _breakers[name]
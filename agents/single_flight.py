@@ -0,0 +1,129 @@
+import asyncio
+import threading
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+from config import Config
+from .retry import remaining_budget
+
+class _Flight:
+    """One in-flight execution and what its followers need to know about it"""
+    
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.failed = False
+        self.shared = False
+
+class _AsyncFlight:
+    """A shared task and how many callers are still waiting for it"""
+    
+    def __init__(self, task: asyncio.Future):
+        self.task = task
+        self.waiters = 0
+
+class SingleFlight:
+    """Lets concurrent callers with the same key share one execution
+    
+    The first caller for a key (the leader) runs the function; callers
+    arriving while it runs (followers) wait for its result instead of
+    running their own, so N identical concurrent requests cost one. A
+    follower waits at most ``timeout`` seconds, or until its own session
+    deadline, and then runs the function itself.
+    
+    Results that ``share`` rejects, such as failures that may only reflect
+    the leader's own deadline, are not handed out; followers then run
+    again, coalescing among themselves. In the async variant the work runs
+    as a task of its own, so a cancelled caller, leader or not, only stops
+    waiting; the work is cancelled once nobody is waiting for it.
+    """
+    
+    def __init__(self, timeout: float = Config.SINGLE_FLIGHT_TIMEOUT):
+        self.timeout = timeout
+        self._flights: Dict[Hashable, _Flight] = {}
+        self._tasks: Dict[Hashable, _AsyncFlight] = {}
+        self._lock = threading.Lock()
+    
+    def _wait_timeout(self) -> float:
+        budget = remaining_budget()
+        return self.timeout if budget is None else max(0.0, min(self.timeout, budget))
+    
+    def do(self, key: Hashable, fn: Callable[[], Any],
+           share: Optional[Callable[[Any], bool]] = None) -> Tuple[Any, bool]:
+        """Run ``fn`` or join an identical run in flight; returns ``(value, shared)``"""
+        while True:
+            with self._lock:
+                flight = self._flights.get(key)
+                leader = flight is None
+                if leader:
+                    flight = self._flights[key] = _Flight()
+            
+            if leader:
+                try:
+                    flight.value = fn()
+                    flight.shared = share is None or share(flight.value)
+                    return flight.value, False
+                except BaseException:
+                    flight.failed = True
+                    raise
+                finally:
+                    with self._lock:
+                        del self._flights[key]
+                    flight.done.set()
+            
+            if not flight.done.wait(self._wait_timeout()):
+                return fn(), False
+            if not flight.failed and flight.shared:
+                return flight.value, True
+    
+    async def ado(self, key: Hashable, fn: Callable[[], Awaitable[Any]],
+                  share: Optional[Callable[[Any], bool]] = None) -> Tuple[Any, bool]:
+        """Async variant of do for coroutine functions"""
+        # Tasks belong to one event loop, so flights are kept per loop
+        key = (id(asyncio.get_running_loop()), key)
+        while True:
+            with self._lock:
+                flight = self._tasks.get(key)
+                leader = flight is None
+                if leader:
+                    flight = self._tasks[key] = _AsyncFlight(asyncio.ensure_future(fn()))
+                    flight.task.add_done_callback(lambda _, flight=flight: self._forget(key, flight))
+                flight.waiters += 1
+            task = flight.task
+            
+            try:
+                if leader:
+                    return await asyncio.shield(task), False
+                try:
+                    await asyncio.wait_for(asyncio.shield(task), self._wait_timeout())
+                except asyncio.TimeoutError:
+                    if not task.done():
+                        return await fn(), False
+                except Exception:
+                    # The leader failed; try again, most likely as a leader
+                    continue
+            finally:
+                flight.waiters -= 1
+                if flight.waiters == 0 and not task.done():
+                    task.cancel()
+            
+            if (not task.cancelled() and task.exception() is None
+                    and (share is None or share(task.result()))):
+                return task.result(), True
+    
+    def _forget(self, key: Hashable, flight: "_AsyncFlight"):
+        with self._lock:
+            if self._tasks.get(key) is flight:
+                del self._tasks[key]
+
+_shared_flight: Optional[SingleFlight] = None
+_shared_lock = threading.Lock()
+
+def get_single_flight() -> Optional[SingleFlight]:
+    """Return the process-wide single-flight group, or None when coalescing is disabled"""
+    global _shared_flight
+    if not Config.SINGLE_FLIGHT_ENABLED:
+        return None
+    with _shared_lock:
+        if _shared_flight is None:
+            _shared_flight = SingleFlight()
+        return _shared_flight
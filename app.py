@@ -6,81 +6,463 @@ Adaptive Learning Companion - Flask Web Application
 import os
 import sys
 import json
+import time
+import random
+import uuid
+import asyncio
+import threading
 from datetime import datetime
-from flask import Flask, render_template, request, jsonify, session
+from flask import Flask, Response, render_template, request, jsonify, session, stream_with_context
 
 # Add the project root to Python path
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 # Import our components
-from memory.memory_bank import EnhancedMemoryBank
-from tools.learning_tools import LearningTools
-from agents.planner_agent import PlannerAgent
-from agents.explainer_agent import ExplainerAgent
-from agents.quizmaster_agent import QuizmasterAgent
+from memory.backends import UserMemoryRegistry
+from tools.learning_tools import TOOLKIT_FIELDS, LearningTools
+from agents.registry import AGENTS
+from agents.result import ERROR_MESSAGES, section_error_code
+from agents.single_flight import get_single_flight
+from config import Config
+from memory.topic_index import profile_key
+from services.batch import BatchExecutor, BatchJob, BatchJobStore, normalize_topic, unique_topics
+from services.cache_warmer import CacheWarmer, WarmStore
+from services.job_queue import DONE, FAILED, PRIORITIES, get_job_queue
+from services.metrics import REGISTRY, SESSION_COALESCED, SESSION_REUSES, SESSION_WARM_HITS, SessionTimer
+from services.prefetcher import Prefetcher
+from services.session_executor import SessionExecutor
 
 app = Flask(__name__)
 app.secret_key = os.getenv('FLASK_SECRET_KEY', 'dev-secret-key-change-in-production')
 
+# Sections of a stored session, in display order
+SESSION_SECTIONS = ("study_plan", "subtopics", "analogy", "time_estimate", "explanation", "quiz")
+
+# Topics and profile used by the quick demo
+DEMO_TOPICS = [
+    "machine learning basics",
+    "neural networks",
+    "python programming",
+    "climate change science",
+    "world history overview"
+]
+DEMO_PROFILE = {
+    'level': 'beginner',
+    'timeline': '1 week',
+    'style': 'mixed'
+}
+
 class WebLearningCompanion:
     """Web version of the learning companion"""
     
     def __init__(self):
-        self.memory = EnhancedMemoryBank()
-        self.tools = LearningTools()
-        self.agents = {
-            "planner": PlannerAgent(),
-            "explainer": ExplainerAgent(),
-            "quizmaster": QuizmasterAgent()
-        }
-        self.user_profile = {}
+        self.memories = UserMemoryRegistry()
+        # Agents are built on first use, see warm_up
+        self.agents = AGENTS
+        self.tools = LearningTools(self.agents)
+        self.executor = SessionExecutor()
+        self.batch_executor = BatchExecutor()
+        self.batch_jobs = BatchJobStore()
+        self.single_flight = get_single_flight()
+        # Sessions for demo and popular topics, generated in the background
+        self.warm_store = WarmStore()
+        self.warm_executor = SessionExecutor(max_workers=Config.CACHE_WARM_WORKERS)
+        self.cache_warmer = CacheWarmer(self._warm_session, self._warm_targets, self.warm_store)
+        # Explanations of the subtopics a finished session suggests, see _complete_session
+        self.prefetcher = (Prefetcher(self._prefetch_explanation)
+                           if Config.PREFETCH_ENABLED and Config.CACHE_ENABLED else None)
     
-    def run_learning_session(self, topic: str, user_profile: dict = None):
+    def warm_up(self):
+        """Build every agent and load the default memory now instead of on first use"""
+        self.agents.build_all()
+        self.memory_for("default")
+    
+    def memory_for(self, user_id: str = "default"):
+        """Return the memory shard for a user"""
+        return self.memories.get(user_id)
+    
+    def run_learning_session(self, topic: str, user_profile: dict = None, use_cache: bool = True,
+                             user_id: str = "default"):
         """Run a complete learning session for the web"""
-        if user_profile:
-            self.user_profile = user_profile
+        profile = user_profile or {}
         
-        session_data = {}
+        timer = SessionTimer()
+        reuse, reused_from = self._reusable_sections(topic, profile, use_cache, user_id, timer)
         
-        # Step 1: Planning Phase
-        planning_prompt = f"""
-        Create a study plan for: {topic}
-        Student level: {self.user_profile.get('level', 'beginner')}
-        Timeline: {self.user_profile.get('timeline', 'flexible')}
-        Learning style: {self.user_profile.get('style', 'mixed')}
+        # None of the calls depend on each other, so run them all at once
+        def generate():
+            return self.executor.run(timer.wrap(self._session_calls(topic, profile, use_cache, reuse)))
+        
+        if reuse or self.single_flight is None:
+            results, errors = generate()
+        else:
+            (results, errors), shared = self.single_flight.do(
+                self._flight_key(topic, profile, use_cache), generate, share=lambda outcome: not outcome[1])
+            if shared:
+                SESSION_COALESCED.inc()
+        return self._complete_session(topic, results, errors, profile, user_id, timer, reused_from)
+    
+    def stream_learning_session(self, topic: str, user_profile: dict = None, use_cache: bool = True,
+                                user_id: str = "default"):
+        """Run a learning session, yielding each event as soon as it is ready
+        
+        Yields ``delta`` events with partial model output, one ``section``
+        (or ``error``) event per section, and a final ``done`` event with the
+        complete session data once it has been saved.
+        """
+        profile = user_profile or {}
+        timer = SessionTimer()
+        
+        reuse, reused_from = self._reusable_sections(topic, profile, use_cache, user_id, timer)
+        
+        results, errors = {}, {}
+        calls = timer.wrap(self._session_calls(topic, profile, use_cache, reuse))
+        for kind, name, payload in self.executor.stream(calls):
+            yield from self._session_events(kind, name, payload, results, errors)
+        
+        session_data = self._complete_session(topic, results, errors, profile, user_id, timer, reused_from)
+        yield {"event": "done", "topic": topic, "session_data": session_data}
+    
+    async def arun_learning_session(self, topic: str, user_profile: dict = None, use_cache: bool = True,
+                                    user_id: str = "default"):
+        """Async variant of run_learning_session for the ASGI serving path"""
+        profile = user_profile or {}
+        timer = SessionTimer()
+        reuse, reused_from = await asyncio.to_thread(self._reusable_sections, topic, profile, use_cache,
+                                                     user_id, timer)
+        
+        def generate():
+            return self.executor.arun(timer.awrap(self._async_session_calls(topic, profile, use_cache, reuse)))
+        
+        if reuse or self.single_flight is None:
+            results, errors = await generate()
+        else:
+            (results, errors), shared = await self.single_flight.ado(
+                self._flight_key(topic, profile, use_cache), generate, share=lambda outcome: not outcome[1])
+            if shared:
+                SESSION_COALESCED.inc()
+        return await asyncio.to_thread(self._complete_session, topic, results, errors, profile, user_id, timer,
+                                       reused_from)
+    
+    async def astream_learning_session(self, topic: str, user_profile: dict = None, use_cache: bool = True,
+                                       user_id: str = "default"):
+        """Async variant of stream_learning_session, yielding the same events"""
+        profile = user_profile or {}
+        timer = SessionTimer()
+        reuse, reused_from = await asyncio.to_thread(self._reusable_sections, topic, profile, use_cache,
+                                                     user_id, timer)
+        
+        results, errors = {}, {}
+        calls = timer.awrap(self._async_session_calls(topic, profile, use_cache, reuse))
+        async for kind, name, payload in self.executor.astream(calls):
+            for event in self._session_events(kind, name, payload, results, errors):
+                yield event
+        
+        session_data = await asyncio.to_thread(self._complete_session, topic, results, errors, profile,
+                                               user_id, timer, reused_from)
+        yield {"event": "done", "topic": topic, "session_data": session_data}
+    
+    def stream_batch(self, topics: list, user_profile: dict = None, use_cache: bool = True,
+                     user_id: str = "default"):
+        """Run learning sessions for many topics, yielding each as it completes
+        
+        Every topic's agent calls share one bounded pool and the shared rate
+        limit, and a topic repeated in the list is generated only once.
+        Yields one ``topic`` event with the saved session data per distinct
+        topic, in completion order.
+        """
+        profile = user_profile or {}
+        timers = {topic: SessionTimer() for topic in unique_topics(topics)}
+        reuse = {topic: self._reusable_sections(topic, profile, use_cache, user_id, timer)
+                 for topic, timer in timers.items()}
+        sessions = {topic: timer.wrap(self._session_calls(topic, profile, use_cache, reuse[topic][0]))
+                    for topic, timer in timers.items()}
+        
+        for topic, results, errors in self.batch_executor.stream(sessions):
+            session_data = self._complete_session(topic, results, errors, profile, user_id, timers[topic],
+                                                  reuse[topic][1])
+            yield {"event": "topic", "topic": topic, "session_data": session_data}
+    
+    def run_batch(self, topics: list, user_profile: dict = None, use_cache: bool = True,
+                  user_id: str = "default") -> dict:
+        """Run learning sessions for many topics; returns session data by topic"""
+        return {event["topic"]: event["session_data"]
+                for event in self.stream_batch(topics, user_profile, use_cache, user_id)}
+    
+    def start_batch(self, topics: list, user_profile: dict = None, use_cache: bool = True,
+                    user_id: str = "default") -> BatchJob:
+        """Run a batch in the background; poll the returned job for progress"""
+        job = BatchJob(unique_topics(topics), user_id)
+        self.batch_jobs.add(job)
+        threading.Thread(target=self._run_batch_job, args=(job, user_profile, use_cache),
+                         name=f"batch-{job.job_id[:8]}", daemon=True).start()
+        return job
+    
+    def _run_batch_job(self, job: BatchJob, user_profile: dict, use_cache: bool):
+        job.start()
+        try:
+            for event in self.stream_batch(job.topics, user_profile, use_cache, job.user_id):
+                job.record(event["topic"], event["session_data"])
+        except Exception as e:
+            job.finish(f"An error occurred: {str(e)}")
+        else:
+            job.finish()
+    
+    def _session_events(self, kind: str, name: str, payload, results: dict, errors: dict) -> list:
+        """Turn an executor event into client events, collecting finished sections
+        
+        The topic toolkit call becomes one event per section it fills.
         """
-        session_data["study_plan"] = self.agents["planner"].run(planning_prompt)
+        if kind == "delta":
+            return [{"event": "delta", "section": name, "text": payload}]
+        if name == "toolkit":
+            sections, failures = self._expand_toolkit({name: payload} if kind == "section" else {},
+                                                      {name: payload} if kind == "error" else {})
+        else:
+            sections, failures = ({name: payload}, {}) if kind == "section" else ({}, {name: payload})
         
-        # Step 2: Learning Tools
-        session_data["subtopics"] = self.tools.break_down_topic(topic)
-        session_data["analogy"] = self.tools.generate_analogy(topic)
-        session_data["time_estimate"] = self.tools.estimate_study_time(
-            topic, self.user_profile.get('level', 'beginner')
-        )
+        events = []
+        for section, data in sections.items():
+            results[section] = data
+            events.append({"event": "section", "section": section, "data": data})
+        for section, message in failures.items():
+            errors[section] = section_error_code(message)
+            events.append({"event": "error", "section": section, "code": errors[section],
+                           "error": ERROR_MESSAGES[errors[section]]})
+        return events
+    
+    @staticmethod
+    def _expand_toolkit(results: dict, errors: dict):
+        """Replace a topic toolkit result (or error) with its three sections"""
+        results, errors = dict(results), dict(errors)
+        if "toolkit" in results:
+            results.update(results.pop("toolkit"))
+        if "toolkit" in errors:
+            message = errors.pop("toolkit")
+            errors.update({section: message for section in TOOLKIT_FIELDS})
+        return results, errors
+    
+    @staticmethod
+    def _flight_key(topic: str, profile: dict, use_cache: bool) -> tuple:
+        """Sessions with the same key are generated identically, so concurrent
+        ones share one run; each learner still records their own session"""
+        return ("session", normalize_topic(topic), profile_key(profile), use_cache)
+    
+    def _session_prompts(self, topic: str, profile: dict) -> dict:
+        """Prompts for the agent calls of a session"""
+        level = profile.get('level', 'beginner')
+        style = profile.get('style', 'mixed')
         
-        # Step 3: Explanation Phase
-        explanation_prompt = f"""
+        return {
+            "study_plan": f"""
+        Create a study plan for: {topic}
+        Student level: {level}
+        Timeline: {profile.get('timeline', 'flexible')}
+        Learning style: {style}
+        """,
+            "explanation": f"""
         Explain the topic: {topic}
-        Target audience: {self.user_profile.get('level', 'beginner')} level
-        Learning style: {self.user_profile.get('style', 'mixed')}
+        Target audience: {level} level
+        Learning style: {style}
+        """,
+            "quiz": f"Create a 3-question quiz about: {topic}"
+        }
+    
+    def _reusable_sections(self, topic: str, profile: dict, use_cache: bool, user_id: str,
+                           timer: SessionTimer = None):
+        """Sections the warm store or an earlier session on a near-identical topic can supply
+        
+        Returns ``(sections, reused_from)``; a warm topic or a complete match
+        supplies every section, a partial match only the sections that
+        succeeded, leaving the rest to be generated. ``use_cache=False``
+        always regenerates.
+        """
+        if not use_cache:
+            return {}, None
+        warm = self.warm_store.get(topic, profile)
+        if warm is not None:
+            SESSION_WARM_HITS.inc()
+            return warm, None
+        if not Config.TOPIC_REUSE_ENABLED:
+            return {}, None
+        with (timer or SessionTimer()).stage("reuse"):
+            match = self.memory_for(user_id).find_similar_session(topic, profile, user_id)
+        if match is None:
+            return {}, None
+        
+        responses = match["responses"]
+        failed = responses.get("errors") or {}
+        sections = {name: responses[name] for name in SESSION_SECTIONS
+                    if responses.get(name) and name not in failed}
+        if not sections:
+            return {}, None
+        SESSION_REUSES.inc(kind="served" if len(sections) == len(SESSION_SECTIONS) else "seeded")
+        return sections, {"session_id": match["id"], "topic": match["user_input"],
+                          "similarity": match["similarity"], "sections": sorted(sections)}
+    
+    def _warm_session(self, topic: str, profile: dict):
+        """Generate a session's sections for the warm store; None if any failed"""
+        results, errors = self.warm_executor.run(self._session_calls(topic, profile))
+        results, errors = self._expand_toolkit(results, errors)
+        if errors:
+            return None
+        return {name: results[name] for name in SESSION_SECTIONS}
+    
+    def _warm_targets(self) -> list:
+        """The demo topics, then the most requested recent topics, to keep warm"""
+        popular = self.memories.popular_topics(Config.CACHE_WARM_POPULAR_TOPICS)
+        return ([(topic, DEMO_PROFILE) for topic in DEMO_TOPICS]
+                + [(entry["user_input"], entry["user_profile"]) for entry in popular])
+    
+    def demo_topic(self) -> str:
+        """A random demo topic, preferring ones the warmer has ready, which are served without model calls"""
+        warm = [topic for topic in DEMO_TOPICS if self.warm_store.get(topic, DEMO_PROFILE) is not None]
+        return random.choice(warm or DEMO_TOPICS)
+    
+    def _prefetch_explanation(self, topic: str, profile: dict) -> bool:
+        """Generate and cache the explanation a session on ``topic`` would ask for"""
+        prompt = self._session_prompts(topic, profile)["explanation"]
+        return self.agents["explainer"].call(prompt, profile).ok
+    
+    @staticmethod
+    def _apply_reuse(calls: dict, reuse: dict, constant) -> dict:
+        """Replace the calls for reused sections with ones returning the earlier result"""
+        if not reuse:
+            return calls
+        if "toolkit" in calls:
+            if all(field in reuse for field in TOOLKIT_FIELDS):
+                del calls["toolkit"]
+            else:
+                # The toolkit call regenerates all three fields anyway
+                reuse = {name: value for name, value in reuse.items() if name not in TOOLKIT_FIELDS}
+        calls.update({name: constant(value) for name, value in reuse.items()})
+        return calls
+    
+    def _session_calls(self, topic: str, profile: dict, use_cache: bool = True, reuse: dict = None) -> dict:
+        """Build the independent calls of a session; each accepts an optional on_chunk callback
+        
+        Sections in ``reuse`` are answered with the given value instead of a model call.
         """
-        session_data["explanation"] = self.agents["explainer"].run(explanation_prompt)
+        prompts = self._session_prompts(topic, profile)
+        level = profile.get('level', 'beginner')
+        
+        if Config.TOPIC_TOOLKIT_ENABLED:
+            tools = {"toolkit": lambda on_chunk=None: self.tools.topic_toolkit(topic, level, use_cache)}
+        else:
+            tools = {
+                "subtopics": lambda on_chunk=None: self.tools.break_down_topic(topic, use_cache),
+                "analogy": lambda on_chunk=None: self.tools.generate_analogy(topic, use_cache, on_chunk),
+                "time_estimate": lambda on_chunk=None: self.tools.estimate_study_time(
+                    topic, level, use_cache, on_chunk),
+            }
+        
+        calls = {
+            "study_plan": lambda on_chunk=None: self.agents["planner"].call(
+                prompts["study_plan"], profile, use_cache, on_chunk).unwrap(),
+            **tools,
+            "explanation": lambda on_chunk=None: self.agents["explainer"].call(
+                prompts["explanation"], profile, use_cache, on_chunk).unwrap(),
+            "quiz": lambda on_chunk=None: self.agents["quizmaster"].call(
+                prompts["quiz"], use_cache=use_cache, on_chunk=on_chunk).unwrap(),
+        }
+        return self._apply_reuse(calls, reuse, lambda value: lambda on_chunk=None: value)
+    
+    def _async_session_calls(self, topic: str, profile: dict, use_cache: bool = True, reuse: dict = None) -> dict:
+        """Coroutine-function counterparts of _session_calls"""
+        prompts = self._session_prompts(topic, profile)
+        level = profile.get('level', 'beginner')
         
-        # Step 4: Quiz Phase
-        quiz_prompt = f"Create a 3-question quiz about: {topic}"
-        session_data["quiz"] = self.agents["quizmaster"].run(quiz_prompt)
+        if Config.TOPIC_TOOLKIT_ENABLED:
+            tools = {"toolkit": lambda on_chunk=None: self.tools.atopic_toolkit(topic, level, use_cache)}
+        else:
+            tools = {
+                "subtopics": lambda on_chunk=None: self.tools.abreak_down_topic(topic, use_cache),
+                "analogy": lambda on_chunk=None: self.tools.agenerate_analogy(topic, use_cache, on_chunk),
+                "time_estimate": lambda on_chunk=None: self.tools.aestimate_study_time(
+                    topic, level, use_cache, on_chunk),
+            }
         
-        # Simulate quiz score for demo
-        session_data["score"] = 85.0
+        calls = {
+            "study_plan": lambda on_chunk=None: self._unwrap(self.agents["planner"].acall(
+                prompts["study_plan"], profile, use_cache, on_chunk)),
+            **tools,
+            "explanation": lambda on_chunk=None: self._unwrap(self.agents["explainer"].acall(
+                prompts["explanation"], profile, use_cache, on_chunk)),
+            "quiz": lambda on_chunk=None: self._unwrap(self.agents["quizmaster"].acall(
+                prompts["quiz"], use_cache=use_cache, on_chunk=on_chunk)),
+        }
+        return self._apply_reuse(calls, reuse, lambda value: lambda on_chunk=None: self._resolved(value))
+    
+    @staticmethod
+    async def _unwrap(pending_result):
+        """Await an agent result and return its text, raising if the call failed"""
+        return (await pending_result).unwrap()
+    
+    @staticmethod
+    async def _resolved(value):
+        return value
+    
+    def _complete_session(self, topic: str, results: dict, errors: dict, profile: dict,
+                          user_id: str, timer: SessionTimer = None, reused_from: dict = None) -> dict:
+        """Assemble session data from (possibly partial) results and save it"""
+        timer = timer or SessionTimer()
+        results, errors = self._expand_toolkit(results, errors)
+        session_data = {
+            "study_plan": results.get("study_plan", ""),
+            "subtopics": results.get("subtopics", []),
+            "analogy": results.get("analogy", ""),
+            "time_estimate": results.get("time_estimate", ""),
+            "explanation": results.get("explanation", ""),
+            "quiz": results.get("quiz", ""),
+        }
+        if errors:
+            # Compact codes only; the provider's error text is never stored
+            session_data["errors"] = {name: section_error_code(message) for name, message in errors.items()}
+        if reused_from:
+            session_data["reused_from"] = reused_from
+        
+        # Simulate quiz score for demo; there is nothing to score without a quiz
+        if "quiz" in results:
+            session_data["score"] = 85.0
         
-        # Save to memory
-        self.memory.add_session(topic, session_data, self.user_profile)
-        self.memory.update_progress(topic, quiz_score=session_data.get("score", 0))
+        # Save to the user's memory shard
+        with timer.stage("save"):
+            memory = self.memory_for(user_id)
+            memory.add_session(topic, session_data, profile, user_id=user_id)
+            memory.update_progress(topic, quiz_score=session_data.get("score"), user_id=user_id)
         
+        # The subtopics are the likely next sessions; their explanations are
+        # the slowest section, so have them ready in the cache
+        if self.prefetcher is not None:
+            for subtopic in session_data["subtopics"]:
+                self.prefetcher.submit(("explanation", normalize_topic(subtopic), profile_key(profile)),
+                                       subtopic, profile)
+        
+        timer.finish(topic=topic, user_id=user_id, failed_sections=sorted(errors))
         return session_data
 
 # Initialize the companion
 companion = WebLearningCompanion()
+if not Config.LAZY_INIT:
+    companion.warm_up()
+if Config.CACHE_WARMER_ENABLED:
+    companion.cache_warmer.start()
+
+@app.context_processor
+def inject_error_messages():
+    """Give the pages the one table that describes failed sections (see agents.result)"""
+    return {'error_messages': ERROR_MESSAGES}
+
+def new_user_id() -> str:
+    """The id for a browser without one: "default" for the first, then random ids"""
+    return "default" if companion.memories.claim_default() else uuid.uuid4().hex
+
+def current_user_id() -> str:
+    """Identify the learner by an id kept in the signed session cookie"""
+    if 'user_id' not in session:
+        session['user_id'] = new_user_id()
+        session.permanent = True
+    return session['user_id']
 
 @app.route('/')
 def index():
@@ -92,6 +474,18 @@ def learn():
     """Learning page"""
     return render_template('learn.html')
 
+def enqueue_session(topic: str, user_profile: dict, use_cache: bool = True, priority: str = None):
+    """Hand a session to a worker (see worker.py) and tell the client where to poll for it"""
+    job_id = get_job_queue().enqueue(
+        'learning_session', {'topic': topic, 'profile': user_profile, 'use_cache': use_cache},
+        current_user_id(), PRIORITIES.get(priority, PRIORITIES['normal']))
+    return jsonify({
+        'success': True,
+        'job_id': job_id,
+        'topic': topic,
+        'status_url': f'/api/jobs/{job_id}'
+    }), 202
+
 @app.route('/api/learning-session', methods=['POST'])
 def api_learning_session():
     """API endpoint for learning sessions"""
@@ -99,6 +493,7 @@ def api_learning_session():
         data = request.json
         topic = data.get('topic', '').strip()
         user_profile = data.get('profile', {})
+        use_cache = not data.get('refresh', False)
         
         if not topic:
             return jsonify({
@@ -106,49 +501,192 @@ def api_learning_session():
                 'error': 'Please enter a topic to learn about'
             })
         
+        if Config.JOB_QUEUE_ENABLED:
+            return enqueue_session(topic, user_profile, use_cache, data.get('priority'))
+        
         # Run learning session
-        session_data = companion.run_learning_session(topic, user_profile)
+        session_data = companion.run_learning_session(topic, user_profile, use_cache, current_user_id())
         
         return jsonify({
             'success': True,
             'session_data': session_data,
             'topic': topic
         })
-        
+    
     except Exception as e:
         return jsonify({
             'success': False,
             'error': f'An error occurred: {str(e)}'
         }), 500
 
+@app.route('/api/learning-session/stream', methods=['POST'])
+def api_learning_session_stream():
+    """Streaming API endpoint: one JSON object per line as each section completes"""
+    data = request.json or {}
+    topic = data.get('topic', '').strip()
+    user_profile = data.get('profile', {})
+    use_cache = not data.get('refresh', False)
+    
+    if not topic:
+        return jsonify({
+            'success': False,
+            'error': 'Please enter a topic to learn about'
+        })
+    
+    if Config.JOB_QUEUE_ENABLED:
+        # Nothing is generated in the request; the client polls the job instead
+        return enqueue_session(topic, user_profile, use_cache, data.get('priority'))
+    
+    user_id = current_user_id()
+    
+    def generate():
+        try:
+            for event in companion.stream_learning_session(topic, user_profile, use_cache, user_id):
+                yield json.dumps(event) + "\n"
+        except Exception as e:
+            yield json.dumps({'event': 'failed', 'error': f'An error occurred: {str(e)}'}) + "\n"
+    
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'  # stop nginx from buffering the stream
+    })
+
+def job_status(job: dict) -> dict:
+    """The client-facing view of a queued job"""
+    status = {
+        'success': True,
+        'job_id': job['job_id'],
+        'status': job['status'],
+        'attempts': job['attempts'],
+        'topic': job['payload'].get('topic')
+    }
+    if job['status'] == 'queued':
+        status['position'] = get_job_queue().position(job['job_id'])
+    if job['result'] is not None:
+        status['session_data'] = job['result']['session_data']
+    if job['error']:
+        status['error'] = job['error']
+    return status
+
+@app.route('/api/jobs/<job_id>')
+def api_job(job_id):
+    """Status of a queued learning session, with its data once done"""
+    job = get_job_queue().get(job_id)
+    if job is None or job['user_id'] != current_user_id():
+        return jsonify({'success': False, 'error': 'Job not found'}), 404
+    return jsonify(job_status(job))
+
+@app.route('/api/jobs/<job_id>/stream')
+def api_job_stream(job_id):
+    """Subscribe to a queued job: one JSON line per status change until it finishes"""
+    job = get_job_queue().get(job_id)
+    if job is None or job['user_id'] != current_user_id():
+        return jsonify({'success': False, 'error': 'Job not found'}), 404
+    
+    def generate():
+        last = None
+        deadline = time.monotonic() + Config.JOB_SUBSCRIBE_SECONDS
+        while True:
+            current = get_job_queue().get(job_id)
+            status = job_status(current)
+            if (status['status'], status.get('position')) != last:
+                last = (status['status'], status.get('position'))
+                yield json.dumps(status) + "\n"
+            if current['status'] in (DONE, FAILED):
+                return
+            if time.monotonic() > deadline:
+                # Clients resubscribe (or poll) if the job is still waiting
+                yield json.dumps({'event': 'timeout', 'job_id': job_id}) + "\n"
+                return
+            time.sleep(Config.JOB_POLL_INTERVAL)
+    
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+
+def batch_request():
+    """Parse a batch request body into ``(topics, profile, use_cache, error)``
+    
+    ``error`` is a message when the topic list is unusable, else None.
+    """
+    data = request.json or {}
+    topics = data.get('topics')
+    user_profile = data.get('profile', {})
+    use_cache = not data.get('refresh', False)
+    
+    if not isinstance(topics, list) or not all(isinstance(topic, str) for topic in topics):
+        return [], user_profile, use_cache, 'Please provide a list of topics'
+    topics = unique_topics(topics)
+    if not topics:
+        return topics, user_profile, use_cache, 'Please enter at least one topic'
+    if len(topics) > Config.BATCH_MAX_TOPICS:
+        return topics, user_profile, use_cache, f'A batch can hold at most {Config.BATCH_MAX_TOPICS} topics'
+    return topics, user_profile, use_cache, None
+
+@app.route('/api/batch', methods=['POST'])
+def api_batch():
+    """Start a multi-topic batch; poll /api/batch/<job_id> for progress"""
+    topics, user_profile, use_cache, error = batch_request()
+    if error:
+        return jsonify({'success': False, 'error': error}), 400
+    
+    job = companion.start_batch(topics, user_profile, use_cache, current_user_id())
+    return jsonify({
+        'success': True,
+        'job_id': job.job_id,
+        'topics': job.topics,
+        'status_url': f'/api/batch/{job.job_id}'
+    }), 202
+
+@app.route('/api/batch/<job_id>')
+def api_batch_status(job_id):
+    """Progress of a batch job; ``?results=0`` leaves out the finished sessions"""
+    job = companion.batch_jobs.get(job_id)
+    if job is None or job.user_id != current_user_id():
+        return jsonify({'success': False, 'error': 'Batch not found'}), 404
+    include_results = request.args.get('results', '1') != '0'
+    return jsonify({'success': True, **job.to_dict(include_results)})
+
+@app.route('/api/batch/stream', methods=['POST'])
+def api_batch_stream():
+    """Run a batch and stream one JSON line per topic as each one completes"""
+    topics, user_profile, use_cache, error = batch_request()
+    if error:
+        return jsonify({'success': False, 'error': error}), 400
+    user_id = current_user_id()
+    
+    def generate():
+        try:
+            for event in companion.stream_batch(topics, user_profile, use_cache, user_id):
+                yield json.dumps(event) + "\n"
+            yield json.dumps({'event': 'done', 'topics': topics}) + "\n"
+        except Exception as e:
+            yield json.dumps({'event': 'failed', 'error': f'An error occurred: {str(e)}'}) + "\n"
+    
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+
 @app.route('/api/quick-demo')
 def api_quick_demo():
     """API endpoint for quick demo"""
     try:
-        demo_topics = [
-            "machine learning basics",
-            "neural networks", 
-            "python programming",
-            "climate change science",
-            "world history overview"
-        ]
+        topic = companion.demo_topic()
         
-        import random
-        topic = random.choice(demo_topics)
+        if Config.JOB_QUEUE_ENABLED:
+            return enqueue_session(topic, DEMO_PROFILE)
         
         # Run demo session with default profile
-        session_data = companion.run_learning_session(topic, {
-            'level': 'beginner',
-            'timeline': '1 week', 
-            'style': 'mixed'
-        })
+        session_data = companion.run_learning_session(topic, DEMO_PROFILE, user_id=current_user_id())
         
         return jsonify({
             'success': True,
             'topic': topic,
             'session_data': session_data
         })
-        
+    
     except Exception as e:
         return jsonify({
             'success': False,
@@ -158,19 +696,40 @@ def api_quick_demo():
 @app.route('/dashboard')
 def dashboard():
     """Learning dashboard"""
-    insights = companion.memory.get_learning_insights()
+    user_id = current_user_id()
+    insights = companion.memory_for(user_id).get_learning_insights(user_id)
     return render_template('dashboard.html', insights=insights)
 
 @app.route('/history')
 def history():
     """Learning history page"""
-    sessions = companion.memory.memory.get("sessions", [])[-10:]
-    return render_template('history.html', sessions=sessions)
+    user_id = current_user_id()
+    page = companion.memory_for(user_id).get_sessions_page(limit=10, user_id=user_id)
+    return render_template('history.html', sessions=page['sessions'], next_cursor=page['next_cursor'])
+
+@app.route('/api/history')
+def api_history():
+    """API endpoint for one page of session history (index entries only)"""
+    user_id = current_user_id()
+    cursor = request.args.get('cursor', type=int)
+    limit = min(request.args.get('limit', 10, type=int), 100)
+    page = companion.memory_for(user_id).get_sessions_page(cursor, limit, user_id)
+    return jsonify(page)
+
+@app.route('/api/history/<int:session_id>')
+def api_history_session(session_id):
+    """API endpoint for the full content of one past session"""
+    user_id = current_user_id()
+    session_record = companion.memory_for(user_id).get_session(session_id)
+    if session_record is None or session_record.get('user_id', 'default') != user_id:
+        return jsonify({'success': False, 'error': 'Session not found'}), 404
+    return jsonify({'success': True, 'session': session_record})
 
 @app.route('/api/dashboard-data')
 def api_dashboard_data():
     """API endpoint for dashboard data"""
-    insights = companion.memory.get_learning_insights()
+    user_id = current_user_id()
+    insights = companion.memory_for(user_id).get_learning_insights(user_id)
     return jsonify(insights)
 
 # Health check endpoint for deployment
@@ -182,6 +741,11 @@ def health():
         'timestamp': datetime.now().isoformat()
     })
 
+@app.route('/metrics')
+def metrics():
+    """Prometheus-style metrics"""
+    return Response(REGISTRY.render(), mimetype='text/plain; version=0.0.4')
+
 if __name__ == '__main__':
     # Validate configuration
     try:
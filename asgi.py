@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+Adaptive Learning Companion - ASGI entry point
+
+The learning-session endpoints are served natively on the event loop, so a
+session that is waiting on the model holds no worker thread and one process
+can keep hundreds of sessions in flight. Every other route is passed
+through to the Flask app.
+
+Run with: uvicorn asgi:application --host 0.0.0.0 --port 5000
+"""
+
+import json
+from http.cookies import SimpleCookie
+
+from asgiref.wsgi import WsgiToAsgi
+
+from app import app, companion, new_user_id, DEMO_PROFILE
+from config import Config
+
+flask_application = WsgiToAsgi(app)
+session_serializer = app.session_interface.get_signing_serializer(app)
+
+def _session_user(scope: dict):
+    """Read the user id from Flask's signed session cookie.
+    
+    Returns ``(user_id, set_cookie)`` where ``set_cookie`` is a header value
+    when a new id had to be issued, so both serving paths share identities.
+    """
+    cookie_name = app.config['SESSION_COOKIE_NAME']
+    max_age = int(app.permanent_session_lifetime.total_seconds())
+    cookies = SimpleCookie()
+    for name, value in scope['headers']:
+        if name == b'cookie':
+            cookies.load(value.decode('latin-1'))
+    
+    data = {}
+    if cookie_name in cookies:
+        try:
+            data = session_serializer.loads(cookies[cookie_name].value, max_age=max_age)
+        except Exception:
+            data = {}
+    if 'user_id' in data:
+        return data['user_id'], None
+    
+    data.update({'user_id': new_user_id(), '_permanent': True})
+    set_cookie = f"{cookie_name}={session_serializer.dumps(data)}; Path=/; HttpOnly; Max-Age={max_age}"
+    return data['user_id'], set_cookie
+
+async def _read_json(receive) -> dict:
+    body = b''
+    while True:
+        message = await receive()
+        body += message.get('body', b'')
+        if not message.get('more_body'):
+            break
+    try:
+        return json.loads(body or b'{}')
+    except json.JSONDecodeError:
+        return {}
+
+async def _start(send, status: int, content_type: str, set_cookie=None, extra_headers=()):
+    headers = [(b'content-type', content_type.encode())]
+    if set_cookie:
+        headers.append((b'set-cookie', set_cookie.encode('latin-1')))
+    headers.extend(extra_headers)
+    await send({'type': 'http.response.start', 'status': status, 'headers': headers})
+
+async def _send_json(send, payload: dict, status: int = 200, set_cookie=None):
+    await _start(send, status, 'application/json', set_cookie)
+    await send({'type': 'http.response.body', 'body': json.dumps(payload).encode()})
+
+async def learning_session(scope, receive, send):
+    """Async counterpart of POST /api/learning-session"""
+    user_id, set_cookie = _session_user(scope)
+    data = await _read_json(receive)
+    topic = data.get('topic', '').strip()
+    
+    if not topic:
+        await _send_json(send, {'success': False, 'error': 'Please enter a topic to learn about'},
+                         set_cookie=set_cookie)
+        return
+    
+    try:
+        session_data = await companion.arun_learning_session(
+            topic, data.get('profile', {}), not data.get('refresh', False), user_id)
+        await _send_json(send, {'success': True, 'session_data': session_data, 'topic': topic},
+                         set_cookie=set_cookie)
+    except Exception as e:
+        await _send_json(send, {'success': False, 'error': f'An error occurred: {str(e)}'}, 500, set_cookie)
+
+async def learning_session_stream(scope, receive, send):
+    """Async counterpart of POST /api/learning-session/stream"""
+    user_id, set_cookie = _session_user(scope)
+    data = await _read_json(receive)
+    topic = data.get('topic', '').strip()
+    
+    if not topic:
+        await _send_json(send, {'success': False, 'error': 'Please enter a topic to learn about'},
+                         set_cookie=set_cookie)
+        return
+    
+    await _start(send, 200, 'application/x-ndjson', set_cookie,
+                 [(b'cache-control', b'no-cache'), (b'x-accel-buffering', b'no')])
+    try:
+        async for event in companion.astream_learning_session(
+                topic, data.get('profile', {}), not data.get('refresh', False), user_id):
+            await send({'type': 'http.response.body', 'body': (json.dumps(event) + "\n").encode(),
+                        'more_body': True})
+    except Exception as e:
+        failure = {'event': 'failed', 'error': f'An error occurred: {str(e)}'}
+        await send({'type': 'http.response.body', 'body': (json.dumps(failure) + "\n").encode(),
+                    'more_body': True})
+    await send({'type': 'http.response.body', 'body': b''})
+
+async def quick_demo(scope, receive, send):
+    """Async counterpart of GET /api/quick-demo"""
+    user_id, set_cookie = _session_user(scope)
+    topic = companion.demo_topic()
+    try:
+        session_data = await companion.arun_learning_session(topic, DEMO_PROFILE, user_id=user_id)
+        await _send_json(send, {'success': True, 'topic': topic, 'session_data': session_data},
+                         set_cookie=set_cookie)
+    except Exception as e:
+        await _send_json(send, {'success': False, 'error': f'Demo error: {str(e)}'}, 500, set_cookie)
+
+ASYNC_ROUTES = {
+    ('POST', '/api/learning-session'): learning_session,
+    ('POST', '/api/learning-session/stream'): learning_session_stream,
+    ('GET', '/api/quick-demo'): quick_demo,
+}
+
+async def application(scope, receive, send):
+    """ASGI application: async routes first, Flask for everything else"""
+    if scope['type'] == 'lifespan':
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+    
+    route = ASYNC_ROUTES.get((scope.get('method'), scope.get('path')))
+    # With the job queue enabled, Flask enqueues sessions for the workers instead
+    if route is not None and not Config.JOB_QUEUE_ENABLED:
+        await route(scope, receive, send)
+    else:
+        await flask_application(scope, receive, send)
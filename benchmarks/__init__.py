@@ -0,0 +1,6 @@
+"""
+Benchmark suite for the Adaptive Learning Companion
+
+Run with ``python -m benchmarks`` (see ``--help``). Results are written as
+JSON and can be compared against an earlier run with ``--compare``.
+"""
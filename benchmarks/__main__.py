@@ -0,0 +1,71 @@
+"""
+Run the benchmark suite
+
+    python -m benchmarks                      # full run
+    python -m benchmarks --quick              # smaller sizes, for a quick check
+    python -m benchmarks --compare benchmarks/results/baseline.json --threshold 0.25
+
+Exits with status 1 when ``--compare`` finds a regression.
+"""
+
+import argparse
+import json
+import sys
+import tempfile
+
+from .harness import BenchmarkResults, compare_results, configure
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark sessions, memory and the web app")
+    parser.add_argument("--output", default="benchmarks/results/latest.json",
+                        help="where to write the JSON results")
+    parser.add_argument("--compare", help="earlier results file to check for regressions")
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="allowed slowdown as a fraction (default 0.2 = 20%%)")
+    parser.add_argument("--thresholds", help='JSON object of per-metric thresholds, e.g. \'{"session.cached.p95": 0.5}\'')
+    parser.add_argument("--quick", action="store_true", help="use small history sizes")
+    parser.add_argument("--only", choices=["sessions", "memory", "web", "startup"], action="append",
+                        help="run only the named group (may be repeated)")
+    parser.add_argument("--stub-latency", type=float, default=0.05,
+                        help="simulated model latency in seconds")
+    args = parser.parse_args(argv)
+    
+    groups = args.only or ["sessions", "memory", "web", "startup"]
+    results = BenchmarkResults()
+    with tempfile.TemporaryDirectory(prefix="learning-bench-") as workdir:
+        configure(workdir, args.stub_latency)
+        
+        from . import bench_memory, bench_sessions, bench_startup, bench_web
+        
+        if "sessions" in groups:
+            print("⏱️  Sessions")
+            bench_sessions.run(results, quick=args.quick)
+        if "memory" in groups:
+            print("💾 Memory")
+            bench_memory.run(results, workdir, (100, 1000) if args.quick else (100, 10000, 100000))
+        if "web" in groups:
+            print("🌐 Web")
+            bench_web.run(results, (100,) if args.quick else (100, 10000))
+        if "startup" in groups:
+            print("🚀 Startup")
+            bench_startup.run(results, workdir, 3 if args.quick else 10)
+    
+    results.save(args.output)
+    print(f"\nResults written to {args.output}")
+    
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        thresholds = json.loads(args.thresholds) if args.thresholds else None
+        regressions = compare_results(baseline, results.to_dict(), args.threshold, thresholds)
+        if regressions:
+            print(f"\n💥 {len(regressions)} regression(s) against {args.compare}:")
+            for r in regressions:
+                print(f"  {r['metric']}: {r['baseline']} → {r['current']} "
+                      f"({r['change']:+.0%}, limit {r['threshold']:.0%})")
+            return 1
+        print(f"\n🎉 No regressions against {args.compare}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
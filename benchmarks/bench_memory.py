@@ -0,0 +1,71 @@
+"""Memory bank cost as history grows"""
+
+import os
+import time
+
+from config import Config
+from memory.memory_bank import EnhancedMemoryBank
+from memory.serializers import MSGPACK_AVAILABLE, get_serializer, loads_any
+from .harness import BenchmarkResults, timed
+
+SESSION_RESPONSES = {
+    "study_plan": "Module 1: Foundations\nModule 2: Practice\nModule 3: Review" * 5,
+    "explanation": "An explanation of the topic with a worked example. " * 20,
+    "quiz": "1. A question?\n   A) one B) two C) three D) four\n" * 5,
+    "subtopics": ["basics", "practice", "review"],
+    "analogy": "It is like learning to ride a bike. " * 5,
+    "study_time": "About 10 hours",
+}
+
+def populate(filename: str, count: int, user_id: str = "default") -> EnhancedMemoryBank:
+    """Create a memory bank holding ``count`` sessions"""
+    bank = EnhancedMemoryBank(filename)
+    for i in range(count):
+        bank.add_session(f"topic {i % 500}", SESSION_RESPONSES, user_id=user_id)
+    return bank
+
+def run(results: BenchmarkResults, workdir: str, sizes=(100, 10000, 100000)):
+    # Background archiving would otherwise run inside the timed operations;
+    # it is timed on its own after them instead
+    retention, Config.MEMORY_RETENTION_ENABLED = Config.MEMORY_RETENTION_ENABLED, False
+    try:
+        for size in sizes:
+            bench_size(results, workdir, size)
+    finally:
+        Config.MEMORY_RETENTION_ENABLED = retention
+
+def bench_size(results: BenchmarkResults, workdir: str, size: int):
+    filename = os.path.join(workdir, f"memory_{size}.json")
+    
+    start = time.perf_counter()
+    bank = populate(filename, size)
+    results.record(f"memory.{size}.populate_per_session",
+                   (time.perf_counter() - start) * 1000 / size)
+    
+    repeat = 50
+    results.record_latency(f"memory.{size}.add_session", timed(
+        lambda: bank.add_session("one more topic", SESSION_RESPONSES), repeat))
+    results.record_latency(f"memory.{size}.save", timed(bank.save, 5))
+    results.record_latency(f"memory.{size}.load", timed(lambda: EnhancedMemoryBank(filename), 5))
+    results.record_latency(f"memory.{size}.insights", timed(bank.get_learning_insights, repeat))
+    results.record_latency(f"memory.{size}.history_page", timed(bank.get_sessions_page, repeat))
+    results.record(f"memory.{size}.snapshot_bytes", os.path.getsize(filename), unit="bytes")
+    bench_formats(results, f"memory.{size}", bank.memory)
+    
+    # What retention does once for this much history, timed on its own
+    start = time.perf_counter()
+    archived = bank.compact_memory()
+    results.record(f"memory.{size}.archive", (time.perf_counter() - start) * 1000)
+    results.record(f"memory.{size}.archived_sessions", archived, unit="sessions")
+
+def bench_formats(results: BenchmarkResults, prefix: str, snapshot: dict, repeat: int = 5):
+    """Encode and decode time and size of ``snapshot`` in each snapshot format"""
+    formats = ["json-pretty", "json"] + (["msgpack"] if MSGPACK_AVAILABLE else [])
+    for fmt in formats:
+        for level in (0, 6):
+            serializer = get_serializer(fmt, level)
+            data = serializer.dumps(snapshot)
+            name = f"{prefix}.format.{serializer.name}"
+            results.record_latency(f"{name}.dumps", timed(lambda: serializer.dumps(snapshot), repeat))
+            results.record_latency(f"{name}.loads", timed(lambda: loads_any(data), repeat))
+            results.record(f"{name}.bytes", len(data), unit="bytes")
@@ -0,0 +1,28 @@
+"""Learning-session latency against the stub model backend"""
+
+from .harness import BenchmarkResults, timed
+
+def run(results: BenchmarkResults, quick: bool = False):
+    from app import companion
+    
+    repeat = 5 if quick else 20
+    profile = {"level": "beginner", "timeline": "1 week", "style": "mixed"}
+    
+    topics = iter(f"benchmark topic {i}" for i in range(repeat))
+    samples = timed(lambda: companion.run_learning_session(
+        next(topics), profile, use_cache=False, user_id="bench_sessions"), repeat)
+    results.record_latency("session.uncached", samples)
+    
+    samples = timed(lambda: companion.run_learning_session(
+        "benchmark topic 0", profile, user_id="bench_sessions"), repeat)
+    results.record_latency("session.cached", samples)
+    
+    samples = timed(lambda: companion.run_learning_session(
+        "Benchmark Topic 0 basics", profile, user_id="bench_sessions"), repeat)
+    results.record_latency("session.reused", samples)
+    
+    def streamed():
+        for _ in companion.stream_learning_session("benchmark stream", profile, use_cache=False,
+                                                   user_id="bench_sessions"):
+            pass
+    results.record_latency("session.streamed", timed(streamed, repeat))
@@ -0,0 +1,39 @@
+"""Cold start: importing the app and serving the first requests in a fresh process"""
+
+import json
+import os
+import subprocess
+import sys
+
+from .harness import BenchmarkResults
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Runs in a fresh interpreter and prints one JSON line of millisecond timings
+PROBE = """
+import json, sys, time
+start = time.perf_counter()
+from benchmarks.harness import configure
+configure(sys.argv[1], 0)
+import app
+imported = time.perf_counter()
+client = app.app.test_client()
+client.get("/health")
+health = time.perf_counter()
+client.post("/api/learning-session", json={"topic": "cold start"})
+session = time.perf_counter()
+print(json.dumps({"import_app": (imported - start) * 1000, "first_health": (health - imported) * 1000,
+                  "first_session": (session - health) * 1000}))
+"""
+
+def probe(workdir: str, lazy: bool) -> dict:
+    env = dict(os.environ, LAZY_INIT="1" if lazy else "0")
+    output = subprocess.run([sys.executable, "-c", PROBE, workdir], cwd=ROOT, env=env,
+                            capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+def run(results: BenchmarkResults, workdir: str, repeat: int = 5):
+    for mode, lazy in (("lazy", True), ("eager", False)):
+        runs = [probe(os.path.join(workdir, f"startup-{mode}-{n}"), lazy) for n in range(repeat)]
+        for name in ("import_app", "first_health", "first_session"):
+            results.record_latency(f"startup.{mode}.{name}", [run[name] for run in runs])
@@ -0,0 +1,62 @@
+"""Flask response times and throughput under concurrent load"""
+
+import json
+import threading
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from werkzeug.serving import WSGIRequestHandler, make_server
+
+from .bench_memory import populate
+from .harness import BenchmarkResults, percentile, timed
+
+class QuietRequestHandler(WSGIRequestHandler):
+    def log_request(self, *args, **kwargs):
+        pass
+
+def run(results: BenchmarkResults, history_sizes=(100, 10000), concurrency: int = 16,
+        requests_per_client: int = 10):
+    from app import app, companion
+    
+    client = app.test_client()
+    for size in history_sizes:
+        user_id = f"bench_history_{size}"
+        populate(companion.memories._shard_filename(user_id), size, user_id)
+        with client.session_transaction() as flask_session:
+            flask_session['user_id'] = user_id
+        results.record_latency(f"web.{size}.history", timed(lambda: client.get('/history'), 20))
+        results.record_latency(f"web.{size}.dashboard_data",
+                               timed(lambda: client.get('/api/dashboard-data'), 20))
+    
+    server = make_server("127.0.0.1", 0, app, threaded=True, request_handler=QuietRequestHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    base_url = f"http://127.0.0.1:{server.server_port}"
+    
+    def post_session(i):
+        body = json.dumps({"topic": f"load topic {i % 8}"}).encode()
+        request = urllib.request.Request(f"{base_url}/api/learning-session", data=body,
+                                         headers={"Content-Type": "application/json"})
+        start = time.perf_counter()
+        with urllib.request.urlopen(request) as response:
+            response.read()
+        return (time.perf_counter() - start) * 1000
+    
+    def get_health(i):
+        start = time.perf_counter()
+        with urllib.request.urlopen(f"{base_url}/health") as response:
+            response.read()
+        return (time.perf_counter() - start) * 1000
+    
+    try:
+        for name, fn in (("learning_session", post_session), ("health", get_health)):
+            total = concurrency * requests_per_client
+            start = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=concurrency) as pool:
+                samples = list(pool.map(fn, range(total)))
+            elapsed = time.perf_counter() - start
+            results.record(f"web.load.{name}.throughput", total / elapsed, unit="req/s", better="higher")
+            results.record(f"web.load.{name}.p95", percentile(samples, 95))
+    finally:
+        server.shutdown()
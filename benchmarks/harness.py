@@ -0,0 +1,103 @@
+import json
+import os
+import platform
+import statistics
+import time
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+from config import Config
+
+def configure(workdir: str, stub_latency: float = 0.05):
+    """Point every store at ``workdir`` and use the stub model backend
+    
+    Must run before ``app`` is imported, since the companion reads these
+    settings when it is constructed.
+    """
+    Config.MODEL_BACKEND = "stub"
+    Config.STUB_LATENCY_SECONDS = stub_latency
+    Config.STUB_TOKENS_PER_SECOND = 2000
+    Config.STUB_ERROR_RATE = 0
+    Config.STUB_RATE_LIMIT_RATE = 0
+    Config.STUB_QUOTA_PER_MINUTE = 0
+    Config.MEMORY_BACKEND = "json"
+    Config.MEMORY_FILE = os.path.join(workdir, "learning_memory.json")
+    Config.USER_MEMORY_DIR = os.path.join(workdir, "users")
+    Config.MEMORY_DB_FILE = os.path.join(workdir, "learning_memory.db")
+    Config.JOB_QUEUE_DB_FILE = os.path.join(workdir, "jobs.db")
+    Config.CACHE_DB_FILE = None
+    Config.RATE_LIMIT_BACKEND = "memory"
+    Config.RATE_LIMIT_CALLS_PER_MINUTE = 10 ** 6
+    Config.RATE_LIMIT_TOKENS_PER_MINUTE = 10 ** 9
+
+def timed(fn: Callable, repeat: int) -> List[float]:
+    """Run ``fn`` ``repeat`` times and return each duration in milliseconds"""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+def percentile(samples: List[float], pct: float) -> float:
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+class BenchmarkResults:
+    """Collects named measurements and writes them out as JSON
+    
+    Every metric records whether lower or higher is better, so two runs
+    can be compared without knowing anything about the benchmarks.
+    """
+    
+    def __init__(self):
+        self.metrics: Dict[str, Dict] = {}
+    
+    def record(self, name: str, value: float, unit: str = "ms", better: str = "lower"):
+        self.metrics[name] = {"value": round(value, 4), "unit": unit, "better": better}
+        print(f"  {name:<45} {value:>12.3f} {unit}")
+    
+    def record_latency(self, name: str, samples: List[float]):
+        """Record the median and p95 of a list of millisecond samples"""
+        self.record(f"{name}.p50", statistics.median(samples))
+        self.record(f"{name}.p95", percentile(samples, 95))
+    
+    def to_dict(self) -> Dict:
+        return {
+            "created_at": datetime.now().isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "metrics": self.metrics,
+        }
+    
+    def save(self, filename: str):
+        directory = os.path.dirname(filename)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(filename, "w") as f:
+            json.dump(self.to_dict(), f, indent=2)
+
+def compare_results(baseline: Dict, current: Dict, threshold: float = 0.2,
+                    thresholds: Optional[Dict[str, float]] = None) -> List[Dict]:
+    """Return the metrics in ``current`` that regressed against ``baseline``
+    
+    A metric regresses when it moved in the wrong direction by more than
+    ``threshold`` (a fraction, e.g. 0.2 for 20%). ``thresholds`` overrides
+    the limit for individual metrics. Metrics missing from either run are
+    ignored.
+    """
+    thresholds = thresholds or {}
+    regressions = []
+    for name, metric in current["metrics"].items():
+        before = baseline["metrics"].get(name)
+        if before is None or not before["value"]:
+            continue
+        change = (metric["value"] - before["value"]) / before["value"]
+        if metric["better"] == "higher":
+            change = -change
+        limit = thresholds.get(name, threshold)
+        if change > limit:
+            regressions.append({"metric": name, "baseline": before["value"],
+                                "current": metric["value"], "change": change, "threshold": limit})
+    return regressions
@@ -9,14 +9,122 @@ class Config:
     # Gemini API Configuration
     GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
     MODEL_NAME = "gemini-1.5-flash-exp" 
+    # "gemini", "stub" (local fake for benchmarks and load tests) or "demo"
+    MODEL_BACKEND = os.getenv("MODEL_BACKEND", "gemini")
+    
+    # Stub Backend Configuration
+    STUB_LATENCY_SECONDS = float(os.getenv("STUB_LATENCY_SECONDS", "0.5"))  # time to first token
+    STUB_TOKENS_PER_SECOND = float(os.getenv("STUB_TOKENS_PER_SECOND", "200"))
+    STUB_RESPONSE_TOKENS = int(os.getenv("STUB_RESPONSE_TOKENS", "150"))
+    STUB_ERROR_RATE = float(os.getenv("STUB_ERROR_RATE", "0"))  # fraction of calls failing with a 500
+    STUB_RATE_LIMIT_RATE = float(os.getenv("STUB_RATE_LIMIT_RATE", "0"))  # fraction answered with a 429
+    STUB_RETRY_AFTER_SECONDS = float(os.getenv("STUB_RETRY_AFTER_SECONDS", "2"))
+    STUB_SEED = int(os.getenv("STUB_SEED", "0"))
+    STUB_QUOTA_PER_MINUTE = int(os.getenv("STUB_QUOTA_PER_MINUTE", "0"))  # 0 = no quota
     
     # Memory Configuration
+    MEMORY_BACKEND = "json"  # "json" or "sqlite" (see python -m memory.migrate)
     MEMORY_FILE = "data/learning_memory.json"
+    MEMORY_DB_FILE = "data/learning_memory.db"
+    USER_MEMORY_DIR = "data/users"  # one JSON shard per user
+    USER_MEMORY_MAX_OPEN = 256  # shards kept loaded at once
     MAX_SESSIONS = 100
+    # The journal is folded into a fresh snapshot once it outgrows both this
+    # and the snapshot itself, keeping compaction cost amortized O(1)
+    JOURNAL_COMPACT_BYTES = 256 * 1024
+    # Snapshot format: "json" (compact), "json-pretty" or "msgpack" (needs the
+    # msgpack package). Any format is read back; a file in another format is
+    # rewritten in this one on load
+    MEMORY_FORMAT = os.getenv("MEMORY_FORMAT", "json")
+    MEMORY_COMPRESSION = int(os.getenv("MEMORY_COMPRESSION", "0"))  # zlib level, 0 = off
+    # Once MAX_SESSIONS + ARCHIVE_SEGMENT_SESSIONS sessions are hot, the oldest
+    # segment's worth moves to a gzipped archive in a background thread
+    MEMORY_RETENTION_ENABLED = True
+    ARCHIVE_SEGMENT_SESSIONS = 200
     
     # Agent Configuration
-    MAX_RETRIES = 3
+    MAX_RETRIES = 3  # attempts per agent call, including the first
+    RETRY_BASE_DELAY = 1.0  # backoff is uniform(0, min(RETRY_MAX_DELAY, base * 2 ** attempt))
+    RETRY_MAX_DELAY = 20.0
+    RETRY_MAX_WAIT_SECONDS = 10.0  # longer provider retry-after hints fail the call instead
+    CIRCUIT_FAILURE_THRESHOLD = 5  # consecutive failures before calls fail fast
+    CIRCUIT_RESET_SECONDS = 30.0
+    # One structured call for subtopics, analogy and time estimate instead of three
+    TOPIC_TOOLKIT_ENABLED = True
+    # Identical model calls (and sessions) already in flight are joined instead
+    # of repeated; a joining caller waits at most this long before calling itself
+    SINGLE_FLIGHT_ENABLED = True
+    SINGLE_FLIGHT_TIMEOUT = 120.0
     RATE_LIMIT_CALLS_PER_MINUTE = 5
+    RATE_LIMIT_TOKENS_PER_MINUTE = 250000
+    # "file" shares the limit between gunicorn workers; "memory" is per process
+    RATE_LIMIT_BACKEND = "file"
+    RATE_LIMIT_STATE_FILE = "data/rate_limit.state"
+    # Share of each bucket that background work (cache warming) leaves for live requests
+    RATE_LIMIT_BACKGROUND_RESERVE = 0.5
+    
+    # Completion Cache Configuration
+    CACHE_ENABLED = True
+    CACHE_MAX_ENTRIES = 512
+    CACHE_TTL_SECONDS = 24 * 60 * 60
+    CACHE_DB_FILE = "data/completion_cache.db"  # None keeps the cache in memory only
+    CACHE_DISK_MAX_ENTRIES = 5000
+    
+    # Topic Reuse Configuration
+    # A new session on a topic this close (cosine similarity of character
+    # n-grams) to an earlier one reuses that session's sections
+    TOPIC_REUSE_ENABLED = True
+    TOPIC_REUSE_THRESHOLD = 0.85
+    
+    # Cache Warmer Configuration
+    # When enabled, a background thread keeps complete sessions ready for the
+    # demo topics and the most requested recent topics, using only spare quota
+    CACHE_WARMER_ENABLED = os.getenv("CACHE_WARMER_ENABLED", "") == "1"
+    CACHE_WARM_INTERVAL = 60  # seconds between passes
+    CACHE_WARM_REFRESH_SECONDS = 60 * 60  # warm sessions older than this are regenerated
+    CACHE_WARM_POPULAR_TOPICS = 10  # popular topics kept warm besides the demo topics
+    CACHE_WARM_WINDOW = 200  # recent stored sessions that decide which topics are popular
+    CACHE_WARM_WORKERS = 2  # agent calls a warming session runs at once
+    
+    # Prefetch Configuration
+    # When enabled, the explanations of a finished session's subtopics are
+    # generated in the background, so following up on one is near-instant;
+    # queued prefetches are dropped as soon as live requests need the quota
+    PREFETCH_ENABLED = os.getenv("PREFETCH_ENABLED", "") == "1"
+    PREFETCH_WORKERS = 2
+    PREFETCH_MAX_PENDING = 20  # further prefetches are dropped while this many are queued
+    PREFETCH_TIMEOUT = 30  # seconds a prefetch may wait for the rate limiter
+    PREFETCH_TTL_SECONDS = 60 * 60  # speculative completions are cached for less than real ones
+    
+    # Startup Configuration
+    # Agents, the model SDK and memory are built on first use so workers boot
+    # fast; LAZY_INIT=0 builds them at import instead (e.g. with gunicorn --preload,
+    # which is safe: lock files and SQLite connections are reopened in each worker)
+    LAZY_INIT = os.getenv("LAZY_INIT", "1") == "1"
+    
+    # Session Configuration
+    SESSION_MAX_WORKERS = 6  # one thread per independent agent call
+    SESSION_CALL_TIMEOUT = 90  # seconds before a single call is given up on
+    SESSION_TIMING_LOG = os.getenv("SESSION_TIMING_LOG", "") == "1"  # one JSON timing line per session
+    
+    # Job Queue Configuration
+    # When enabled, /api/learning-session enqueues a job for worker.py instead
+    # of running the session inside the request
+    JOB_QUEUE_ENABLED = os.getenv("JOB_QUEUE_ENABLED", "") == "1"
+    JOB_QUEUE_DB_FILE = "data/jobs.db"
+    JOB_WORKERS = int(os.getenv("JOB_WORKERS", "4"))  # jobs one worker process runs at once
+    JOB_MAX_RUNNING_PER_USER = 2
+    JOB_LEASE_SECONDS = 60  # renewed while running; a dead worker's jobs are retried after this
+    JOB_MAX_ATTEMPTS = 3
+    JOB_POLL_INTERVAL = 0.5  # seconds between queue checks by idle workers and subscribers
+    JOB_SUBSCRIBE_SECONDS = 300  # a job status stream ends after this; clients resubscribe
+    JOB_RETENTION_SECONDS = 24 * 60 * 60  # finished jobs are kept this long for polling
+    
+    # Batch Configuration
+    BATCH_MAX_TOPICS = 50
+    BATCH_MAX_WORKERS = 8  # agent calls in flight across a whole batch
+    BATCH_MAX_JOBS = 100  # batch jobs kept for polling
+    BATCH_JOB_TTL_SECONDS = 60 * 60  # finished jobs are forgotten after this
     
     # UI Configuration
     MAX_DISPLAY_WIDTH = 70
@@ -1,3 +1,5 @@
 from .memory_bank import MemoryBank, EnhancedMemoryBank
+from .sqlite_memory_bank import SQLiteMemoryBank
+from .backends import create_memory_bank, UserMemoryRegistry
 
-__all__ = ["MemoryBank", "EnhancedMemoryBank"]
\ No newline at end of file
+__all__ = ["MemoryBank", "EnhancedMemoryBank", "SQLiteMemoryBank", "create_memory_bank", "UserMemoryRegistry"]
\ No newline at end of file
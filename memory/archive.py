@@ -0,0 +1,61 @@
+import gzip
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, List
+
+from .serializers import dumps_json, loads_json
+
+class SessionArchive:
+    """Compressed, immutable segments of old sessions next to a memory file
+    
+    Each segment is a gzipped JSON-lines file holding the full bodies of a
+    contiguous range of session ids, oldest first. Segments are written
+    once and never modified, so they can be read without any lock; the
+    few most recently read are kept decoded for paging through history.
+    """
+    
+    def __init__(self, directory: str, cached_segments: int = 2):
+        self.directory = directory
+        self.cached_segments = cached_segments
+        self._cache: "OrderedDict[str, List[Dict]]" = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def write_segment(self, sessions: List[Dict]) -> Dict:
+        """Write full sessions (each with its ``id``) and return the segment's manifest entry"""
+        os.makedirs(self.directory, exist_ok=True)
+        name = f"segment-{sessions[0]['id']:08d}-{sessions[-1]['id']:08d}.jsonl.gz"
+        path = os.path.join(self.directory, name)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, 'wb') as raw:
+            with gzip.GzipFile(fileobj=raw, mode='wb', mtime=0) as f:
+                for session in sessions:
+                    f.write(dumps_json(session) + b"\n")
+            raw.flush()
+            os.fsync(raw.fileno())
+        os.replace(tmp_path, path)
+        return {
+            "file": name,
+            "first_id": sessions[0]["id"],
+            "last_id": sessions[-1]["id"],
+            "count": len(sessions),
+            "first_timestamp": sessions[0]["timestamp"],
+            "last_timestamp": sessions[-1]["timestamp"],
+            "bytes": os.path.getsize(path),
+        }
+    
+    def read_segment(self, segment: Dict) -> List[Dict]:
+        """The sessions of one segment, oldest first"""
+        with self._lock:
+            sessions = self._cache.get(segment["file"])
+            if sessions is not None:
+                self._cache.move_to_end(segment["file"])
+                return sessions
+        
+        with gzip.open(os.path.join(self.directory, segment["file"]), 'rb') as f:
+            sessions = [loads_json(line) for line in f]
+        with self._lock:
+            self._cache[segment["file"]] = sessions
+            while len(self._cache) > self.cached_segments:
+                self._cache.popitem(last=False)
+        return sessions
@@ -0,0 +1,93 @@
+import hashlib
+import os
+import re
+import threading
+from collections import OrderedDict
+from typing import Dict, List
+
+from config import Config
+from .memory_bank import EnhancedMemoryBank
+from .sqlite_memory_bank import SQLiteMemoryBank
+from .topic_index import popular_topics
+
+def create_memory_bank(backend: str = None, filename: str = None):
+    """Build the memory store selected by Config.MEMORY_BACKEND"""
+    backend = backend or Config.MEMORY_BACKEND
+    if backend == "sqlite":
+        return SQLiteMemoryBank(filename or Config.MEMORY_DB_FILE, max_sessions=Config.MAX_SESSIONS)
+    if backend == "json":
+        return EnhancedMemoryBank(filename or Config.MEMORY_FILE, max_sessions=Config.MAX_SESSIONS)
+    raise ValueError(f"Unknown memory backend: {backend}")
+
+class UserMemoryRegistry:
+    """Hands out the memory shard for each user
+    
+    With the JSON backend every user gets their own file under
+    Config.USER_MEMORY_DIR (the "default" user keeps Config.MEMORY_FILE), so
+    each user's writes take only that user's locks. The SQLite backend
+    already partitions rows by user, so one store serves everybody.
+    Open shards are kept in a small LRU so idle users don't hold memory.
+    Nothing is opened or loaded until a user's data is first asked for.
+    """
+    
+    def __init__(self, backend: str = None, users_dir: str = None, max_open: int = None):
+        self.backend = backend or Config.MEMORY_BACKEND
+        self._users_dir = users_dir
+        self.max_open = max_open or Config.USER_MEMORY_MAX_OPEN
+        self._banks: "OrderedDict[str, object]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._shared = None
+    
+    @property
+    def users_dir(self) -> str:
+        """The shard directory; Config.USER_MEMORY_DIR as it is when used, unless one was given"""
+        return self._users_dir or Config.USER_MEMORY_DIR
+    
+    def get(self, user_id: str = "default"):
+        """Return the memory store holding ``user_id``'s data"""
+        with self._lock:
+            if self.backend == "sqlite":
+                if self._shared is None:
+                    self._shared = create_memory_bank("sqlite")
+                return self._shared
+            
+            bank = self._banks.get(user_id)
+            if bank is None:
+                bank = create_memory_bank(self.backend, self._shard_filename(user_id))
+                self._banks[user_id] = bank
+                while len(self._banks) > self.max_open:
+                    self._banks.popitem(last=False)
+            else:
+                self._banks.move_to_end(user_id)
+            return bank
+    
+    def claim_default(self) -> bool:
+        """Claim the "default" user for a new visitor; True only for the first caller
+        
+        Everything recorded before memory was split per user belongs to
+        "default", so the first browser to arrive is given that id and
+        keeps its history. A marker file makes the claim once across
+        processes and restarts; delete it to hand "default" out again.
+        """
+        os.makedirs(self.users_dir, exist_ok=True)
+        marker = os.path.join(self.users_dir, ".default_claimed")
+        try:
+            os.close(os.open(marker, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+        except FileExistsError:
+            return False
+        return True
+    
+    def popular_topics(self, limit: int = 10) -> List[Dict]:
+        """The most requested recent topics across the shards currently open"""
+        if self.backend == "sqlite":
+            return self.get().get_popular_topics(limit)
+        with self._lock:
+            banks = list(self._banks.values())
+        return popular_topics((entry for bank in banks for entry in bank.get_popular_topics(limit)), limit)
+    
+    def _shard_filename(self, user_id: str) -> str:
+        if user_id == "default":
+            return Config.MEMORY_FILE
+        if not re.fullmatch(r"[A-Za-z0-9_-]{1,64}", user_id):
+            user_id = hashlib.sha256(user_id.encode("utf-8")).hexdigest()
+        return os.path.join(self.users_dir, f"{user_id}.json")
@@ -1,55 +1,574 @@
-import json
+import bisect
+import itertools
 import os
+import threading
+from contextlib import contextmanager
 from datetime import datetime
 from typing import Dict, List, Optional
 
+try:
+    import fcntl
+    FCNTL_AVAILABLE = True
+except ImportError:
+    FCNTL_AVAILABLE = False
+
+from config import Config
+from services.metrics import MEMORY_JOURNAL_BYTES, MEMORY_SAVE_SECONDS, MEMORY_SNAPSHOT_BYTES
+from .archive import SessionArchive
+from .serializers import dumps_json, get_serializer, loads_any, loads_json
+from .topic_index import TopicIndex, pick_reusable_session, popular_topics
+
+REQUIRED_SESSION_KEYS = ["study_plan", "explanation", "quiz"]
+
+# Older versions stored the agent's apology, provider error and all, as the section text
+LEGACY_FAILURE_PREFIX = "I apologize, but I'm having trouble processing your request right now."
+
+def legacy_error_code(text: str) -> str:
+    """Error code for a failure stored as text by an older version"""
+    lowered = text.lower()
+    if "429" in lowered or "quota" in lowered or "resource has been exhausted" in lowered:
+        return "rate_limited"
+    if "timed out" in lowered or "deadline" in lowered:
+        return "timeout"
+    return "model_error"
+
+def compact_responses(responses: Dict) -> Dict:
+    """Drop failed sections from a session's responses, keeping only a
+    compact error code for each under ``errors``"""
+    errors = dict(responses.get("errors") or {})
+    compacted = {}
+    for key, value in responses.items():
+        if key == "errors":
+            continue
+        if isinstance(value, str) and value.startswith(LEGACY_FAILURE_PREFIX):
+            errors[key] = legacy_error_code(value)
+        elif isinstance(value, list) and value and str(value[0]).startswith(LEGACY_FAILURE_PREFIX):
+            # Subtopics parsed line by line out of the failure text
+            errors[key] = legacy_error_code("\n".join(map(str, value)))
+        elif key not in errors:
+            compacted[key] = value
+    if errors:
+        compacted["errors"] = {key: code if len(code) <= 32 else legacy_error_code(code)
+                               for key, code in errors.items()}
+    return compacted
+
+def is_complete_session(responses: Dict) -> bool:
+    """Whether a session produced every core section with real content"""
+    errors = responses.get("errors") or {}
+    return all(
+        key not in errors and isinstance(responses.get(key), str) and responses[key].strip()
+        and not responses[key].startswith(LEGACY_FAILURE_PREFIX)
+        for key in REQUIRED_SESSION_KEYS
+    )
+
+def session_index_entry(session: Dict) -> Dict:
+    """The compact, always-resident part of a session record"""
+    return {
+        "timestamp": session["timestamp"],
+        "user_id": session.get("user_id", "default"),
+        "user_input": session["user_input"],
+        "score": session["responses"].get("score"),
+        "complete": is_complete_session(session["responses"])
+    }
+
 class MemoryBank:
-    """Simple file-based memory system"""
+    """File-based memory system backed by a snapshot plus an append-only journal
+    
+    Every change is appended to ``<filename>.journal`` as one JSON line, so
+    recording a session costs the same regardless of history size. The
+    snapshot in ``filename`` is only rewritten (atomically) once the journal
+    has grown as large as the snapshot itself, and the journal is replayed
+    on load.
+    
+    Writers hold an exclusive lock on ``<filename>.lock`` and first replay
+    whatever other processes appended, so several gunicorn workers can
+    share one memory file without losing updates.
+    
+    Only a compact index of each session (timestamp, topic, score and the
+    location of its body) stays in ``memory["sessions"]``; the full agent
+    responses go to ``<filename>.sessions`` and are read back on demand.
+    ``archive_sessions`` moves the oldest of them into gzipped segments
+    under ``<filename>.archive``, which history lookups still read.
+    
+    The snapshot is written in Config.MEMORY_FORMAT (see memory.serializers)
+    and read back in whatever format it was written.
+    
+    With ``read_only`` the files are only read: no lock file is created,
+    the journal is replayed without repairing it, older layouts are
+    upgraded in memory only, and any change raises.
+    """
     
-    def __init__(self, filename: str = "data/learning_memory.json"):
+    LAYOUT_VERSION = 2
+    
+    def __init__(self, filename: str = "data/learning_memory.json", read_only: bool = False):
         self.filename = filename
-        self._ensure_data_directory()
-        self.memory = self._load_memory()
+        self.read_only = read_only
+        self.journal_filename = filename + ".journal"
+        self.archive = SessionArchive(filename + ".archive")
+        self.serializer = get_serializer()
+        self._lock = threading.RLock()
+        self._lock_depth = 0
+        self._journal_bytes = 0
+        self._snapshot_bytes = 0
+        self._loaded_snapshot = None
+        # Built on the first similarity lookup, then kept current as sessions are added
+        self._topic_index = None
+        if not read_only:
+            self._ensure_data_directory()
+        self._lock_file = None
+        self._lock_pid = None
+        self.memory = self._empty_memory()
+        if self._snapshot_stat() is None and self._journal_size() == 0:
+            # Nothing written yet, so nothing to lock against: a user who
+            # only reads leaves no files behind
+            self._load_memory()
+        else:
+            with self._exclusive():
+                self._load_memory()
+    
+    @property
+    def sessions_filename(self) -> str:
+        """The file holding hot session bodies; replaced each time sessions are archived"""
+        name = self.memory.get("sessions_file") or os.path.basename(self.filename) + ".sessions"
+        return os.path.join(os.path.dirname(self.filename), name)
     
     def _ensure_data_directory(self):
         """Ensure the data directory exists"""
         os.makedirs(os.path.dirname(self.filename), exist_ok=True)
     
+    def _empty_memory(self) -> Dict:
+        return {"sessions": [], "study_plans": {}, "progress": {}, "user_profiles": {},
+                "layout_version": self.LAYOUT_VERSION}
+    
+    @contextmanager
+    def _exclusive(self):
+        """Hold the thread lock and, on the outermost entry, the cross-process file lock"""
+        with self._lock:
+            self._lock_depth += 1
+            lock_file = self._process_lock_file() if self._lock_depth == 1 else None
+            try:
+                if lock_file is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX)
+                yield
+            finally:
+                if lock_file is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+                self._lock_depth -= 1
+    
+    def _process_lock_file(self):
+        """The lock file, opened once per process
+        
+        A descriptor inherited across fork shares its flock with the parent,
+        so a forked worker (e.g. under gunicorn --preload) opens its own.
+        """
+        if not FCNTL_AVAILABLE or self.read_only:
+            return None
+        if self._lock_pid != os.getpid():
+            self._lock_file = open(self.filename + ".lock", "a")
+            self._lock_pid = os.getpid()
+        return self._lock_file
+    
+    def _snapshot_stat(self):
+        """Identify the snapshot on disk so a rewrite by another process is noticed"""
+        try:
+            stat = os.stat(self.filename)
+            return stat.st_ino, stat.st_mtime_ns, stat.st_size
+        except FileNotFoundError:
+            return None
+    
+    def _journal_size(self) -> int:
+        try:
+            return os.path.getsize(self.journal_filename)
+        except FileNotFoundError:
+            return 0
+    
     def _load_memory(self) -> Dict:
-        """Load memory from file"""
+        """Load the snapshot and replay any journaled changes on top of it"""
+        self._loaded_snapshot = self._snapshot_stat()
+        self._topic_index = None
+        file_format = None
+        try:
+            with open(self.filename, 'rb') as f:
+                data = f.read()
+            self.memory, file_format = loads_any(data)
+            self._snapshot_bytes = len(data)
+        except (FileNotFoundError, ValueError):
+            self.memory = self._empty_memory()
+        
+        self._journal_bytes = 0
+        self._upgrade_snapshot()
+        self._replay_journal()
+        self._move_inline_sessions()
+        self._upgrade_layout()
+        if file_format not in (None, self.serializer.name) and not self.read_only:
+            # Written in another format, e.g. by an older version; switch it over
+            self.save()
+        return self.memory
+    
+    def _catch_up(self):
+        """Apply changes other processes made since we last looked (call under _exclusive)"""
+        if self._snapshot_stat() != self._loaded_snapshot:
+            # Another process compacted; its snapshot includes everything we had
+            self._load_memory()
+        elif self._journal_size() != self._journal_bytes:
+            self._replay_journal()
+    
+    def refresh(self):
+        """Pick up changes written by other processes; cheap when there are none"""
+        if (self._snapshot_stat() != self._loaded_snapshot
+                or self._journal_size() != self._journal_bytes):
+            with self._exclusive():
+                self._catch_up()
+    
+    def _upgrade_snapshot(self):
+        """Bring a snapshot written by an older version up to the current layout"""
+        for progress in self.memory["progress"].values():
+            if "score_sum" not in progress:
+                scores = progress.get("quiz_scores", [])
+                progress["score_sum"] = sum(scores)
+                progress["score_count"] = len(scores)
+    
+    def _move_inline_sessions(self):
+        """Move session bodies stored inline by older versions out to the sessions file"""
+        sessions = self.memory["sessions"]
+        if not any("responses" in session for session in sessions):
+            return
+        if self.read_only:
+            # Bodies stay inline; number them as moving them out would
+            for session in sessions:
+                if "id" not in session:
+                    self.memory.setdefault("next_session_id", 1)
+                    session["id"] = self.memory["next_session_id"]
+                    self.memory["next_session_id"] += 1
+            return
+        
+        for index, session in enumerate(sessions):
+            if "responses" in session:
+                sessions[index] = self._store_session_body(session)
+        self.save()
+    
+    def _upgrade_layout(self):
+        """Recompute what older versions derived differently; runs once per file
+        
+        Version 2 stopped counting sessions whose sections hold failure text
+        as complete, so those sessions' index flags are corrected.
+        """
+        if self.memory.get("layout_version", 1) >= self.LAYOUT_VERSION:
+            return
+        for entry in self.memory["sessions"]:
+            complete = is_complete_session(self._load_session_body(entry)["responses"])
+            if entry.get("complete") and not complete:
+                self._session_invalidated(entry)
+            entry["complete"] = complete
+        self.memory["layout_version"] = self.LAYOUT_VERSION
+        if not self.read_only:
+            self.save()
+    
+    def _session_invalidated(self, entry: Dict):
+        """Hook for aggregates when a session turns out not to be complete"""
+    
+    def _store_session_body(self, session: Dict) -> Dict:
+        """Append a full session to the sessions file and return its index entry"""
+        self._check_writable()
+        session = dict(session, responses=compact_responses(session["responses"]))
+        body = dumps_json(session) + b"\n"
+        with open(self.sessions_filename, 'ab') as f:
+            f.seek(0, os.SEEK_END)
+            offset = f.tell()
+            f.write(body)
+        
+        entry = session_index_entry(session)
+        self.memory.setdefault("next_session_id", 1)
+        entry.update({
+            "id": self.memory["next_session_id"],
+            "offset": offset,
+            "length": len(body)
+        })
+        self.memory["next_session_id"] += 1
+        return entry
+    
+    def _replay_journal(self):
+        """Apply journal entries newer than the snapshot"""
+        applied_seq = self.memory.get("journal_seq", 0)
         try:
-            with open(self.filename, 'r') as f:
-                return json.load(f)
-        except (FileNotFoundError, json.JSONDecodeError):
-            return {"sessions": [], "study_plans": {}, "progress": {}, "user_profiles": {}}
+            with open(self.journal_filename, 'rb' if self.read_only else 'rb+') as f:
+                f.seek(self._journal_bytes)
+                for line in f:
+                    if not line.endswith(b"\n"):
+                        # A torn final line from a crash mid-append; drop it so
+                        # the next entry starts on a clean line
+                        if not self.read_only:
+                            f.truncate(self._journal_bytes)
+                        break
+                    self._journal_bytes += len(line)
+                    try:
+                        event = loads_json(line)
+                    except ValueError:
+                        continue
+                    if event["seq"] > applied_seq:
+                        self._apply(event)
+                        applied_seq = event["seq"]
+        except FileNotFoundError:
+            pass
+        self.memory["journal_seq"] = applied_seq
+    
+    def _apply(self, event: Dict):
+        """Apply one journal event to the in-memory state"""
+        getattr(self, f"_apply_{event['op']}")(event)
+    
+    def _check_writable(self):
+        if self.read_only:
+            raise PermissionError(f"{self.filename} was opened read-only")
+    
+    def _record(self, event: Dict):
+        """Apply an event and append it to the journal"""
+        self._check_writable()
+        with self._exclusive():
+            self._catch_up()
+            event["seq"] = self.memory.get("journal_seq", 0) + 1
+            self._apply(event)
+            self.memory["journal_seq"] = event["seq"]
+            
+            line = dumps_json(event) + b"\n"
+            with open(self.journal_filename, 'ab') as f:
+                f.write(line)
+            self._journal_bytes += len(line)
+            MEMORY_JOURNAL_BYTES.set(self._journal_bytes)
+            
+            # Compact once replaying the journal would cost more than a snapshot
+            if self._journal_bytes >= max(Config.JOURNAL_COMPACT_BYTES, self._snapshot_bytes):
+                self.save()
     
     def save(self):
-        """Save memory to file"""
-        with open(self.filename, 'w') as f:
-            json.dump(self.memory, f, indent=2)
+        """Write a full snapshot atomically and reset the journal"""
+        self._check_writable()
+        with self._exclusive(), MEMORY_SAVE_SECONDS.time():
+            tmp_filename = self.filename + ".tmp"
+            data = self.serializer.dumps(self.memory)
+            with open(tmp_filename, 'wb') as f:
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+            self._snapshot_bytes = len(data)
+            os.replace(tmp_filename, self.filename)
+            
+            # Entries up to journal_seq are now in the snapshot, so a crash
+            # before this truncation only leaves entries that replay skips
+            open(self.journal_filename, 'w').close()
+            self._journal_bytes = 0
+            self._loaded_snapshot = self._snapshot_stat()
+            MEMORY_SNAPSHOT_BYTES.set(self._snapshot_bytes)
     
-    def add_session(self, user_input: str, agent_responses: Dict, user_profile: Dict = None):
+    def add_session(self, user_input: str, agent_responses: Dict, user_profile: Dict = None,
+                    user_id: str = "default"):
         """Record a complete learning session"""
         session = {
             "timestamp": datetime.now().isoformat(),
+            "user_id": user_id,
             "user_input": user_input,
             "responses": agent_responses,
             "user_profile": user_profile or {}
         }
+        with self._exclusive():
+            self._catch_up()
+            # The body is written first; if we crash before journaling the
+            # index entry, the orphaned body is simply never referenced
+            self._record({"op": "add_session", "session": self._store_session_body(session)})
+    
+    def _apply_add_session(self, event: Dict):
+        session = event["session"]
         self.memory["sessions"].append(session)
-        self.save()
+        if "id" in session:
+            self.memory["next_session_id"] = max(self.memory.get("next_session_id", 1), session["id"] + 1)
+        if self._topic_index is not None and "id" in session:
+            self._topic_index.add(session["id"], session["user_input"])
+    
+    def get_session(self, session_id: int) -> Optional[Dict]:
+        """Load one full session (including agent responses) by id"""
+        self.refresh()
+        # Held so an archive run cannot swap the sessions file mid-read
+        with self._lock:
+            sessions = self.memory["sessions"]
+            index = bisect.bisect_left(sessions, session_id, key=lambda s: s.get("id", 0))
+            if index < len(sessions) and sessions[index].get("id") == session_id:
+                return self._load_session_body(sessions[index])
+            segments = self.memory.get("archives", [])
+        
+        index = bisect.bisect_right(segments, session_id, key=lambda s: s["first_id"]) - 1
+        if index < 0 or session_id > segments[index]["last_id"]:
+            return None
+        archived = self.archive.read_segment(segments[index])
+        index = bisect.bisect_left(archived, session_id, key=lambda s: s["id"])
+        if index == len(archived) or archived[index]["id"] != session_id:
+            return None
+        return dict(archived[index])
+    
+    def find_similar_session(self, topic: str, profile: Dict = None, user_id: str = "default",
+                             threshold: float = Config.TOPIC_REUSE_THRESHOLD) -> Optional[Dict]:
+        """The best earlier session on a near-identical topic for the same
+        kind of learner, with its ``similarity`` score, or None"""
+        self.refresh()
+        with self._lock:
+            if self._topic_index is None:
+                self._topic_index = TopicIndex()
+                for entry in self.memory["sessions"]:
+                    if "id" in entry:
+                        self._topic_index.add(entry["id"], entry["user_input"])
+            matches = self._topic_index.search(topic, threshold)
+        return pick_reusable_session(matches, self.get_session, profile)
+    
+    def _load_session_body(self, entry: Dict) -> Dict:
+        if "responses" in entry:
+            session = dict(entry)
+        else:
+            with open(self.sessions_filename, 'rb') as f:
+                f.seek(entry["offset"])
+                session = loads_json(f.read(entry["length"]))
+            session["id"] = entry["id"]
+        # Bodies written before failures were stored as codes
+        session["responses"] = compact_responses(session["responses"])
+        return session
+    
+    def get_recent_sessions(self, limit: int = 10, user_id: str = "default") -> List[Dict]:
+        """Return the most recent full sessions, oldest first
+        
+        A JSON memory file holds a single user's shard, so ``user_id`` is
+        accepted only for interface parity with the SQLite backend.
+        """
+        self.refresh()
+        with self._lock:
+            return [self._load_session_body(entry) for entry in self.memory["sessions"][-limit:]]
+    
+    def get_popular_topics(self, limit: int = 10, window: int = Config.CACHE_WARM_WINDOW) -> List[Dict]:
+        """The most requested topics among the last ``window`` sessions, see ``popular_topics``"""
+        return popular_topics(self.get_recent_sessions(window), limit)
+    
+    def get_sessions_page(self, cursor: Optional[int] = None, limit: int = 10,
+                          user_id: str = "default") -> Dict:
+        """Return one page of the session index, newest first
+        
+        Pass the returned ``next_cursor`` back in to get the following page;
+        it is None once the oldest session has been returned. Paging runs
+        on past the hot sessions into archived ones.
+        """
+        self.refresh()
+        with self._lock:
+            sessions = self.memory["sessions"]
+            end = len(sessions)
+            if cursor is not None:
+                end = bisect.bisect_left(sessions, cursor, key=lambda s: s.get("id", 0))
+            hot = sessions[max(0, end - limit - 1):end]
+            segments = self.memory.get("archives", [])
+        
+        # One entry past the page tells whether another page follows
+        entries = list(itertools.islice(
+            itertools.chain(reversed(hot), self._archived_entries(segments, cursor)), limit + 1))
+        page = [dict(entry) for entry in entries[:limit]]
+        for entry in page:
+            entry.pop("offset", None)
+            entry.pop("length", None)
+        return {
+            "sessions": page,
+            "next_cursor": page[-1]["id"] if len(entries) > limit else None
+        }
+    
+    def _archived_entries(self, segments: List[Dict], before: Optional[int] = None):
+        """Index entries of archived sessions with ids below ``before``, newest first"""
+        for segment in reversed(segments):
+            if before is not None and segment["first_id"] >= before:
+                continue
+            for session in reversed(self.archive.read_segment(segment)):
+                if before is None or session["id"] < before:
+                    yield dict(session_index_entry(session), id=session["id"])
+    
+    def iter_sessions(self):
+        """Every full session, archived ones included, oldest first"""
+        self.refresh()
+        with self._lock:
+            segments = self.memory.get("archives", [])
+            hot = [self._load_session_body(entry) for entry in self.memory["sessions"]]
+        for segment in segments:
+            for session in self.archive.read_segment(segment):
+                yield dict(session)
+        yield from hot
+    
+    def archive_sessions(self, keep: int, segment_size: int = Config.ARCHIVE_SEGMENT_SESSIONS) -> int:
+        """Move the oldest sessions into compressed archive segments
+        
+        Whole segments of ``segment_size`` sessions are archived while at
+        least ``keep`` stay hot. The hot bodies are then copied to a fresh
+        sessions file, so neither the snapshot nor the sessions file grows
+        with history. Returns how many sessions were archived.
+        """
+        with self._exclusive():
+            self._catch_up()
+            sessions = self.memory["sessions"]
+            count = (len(sessions) - keep) // segment_size * segment_size
+            if count <= 0:
+                return 0
+            
+            segments = [
+                self.archive.write_segment([self._load_session_body(entry)
+                                            for entry in sessions[start:start + segment_size]])
+                for start in range(0, count, segment_size)
+            ]
+            
+            # The new sessions file only becomes live with the snapshot below;
+            # a crash before then leaves it unreferenced
+            old_name = os.path.basename(self.sessions_filename)
+            generation = self.memory.get("sessions_generation", 0) + 1
+            name = f"{os.path.basename(self.filename)}.sessions.{generation}"
+            hot = []
+            with open(self.sessions_filename, 'rb') as src, \
+                    open(os.path.join(os.path.dirname(self.filename), name), 'wb') as dst:
+                for entry in sessions[count:]:
+                    src.seek(entry["offset"])
+                    body = src.read(entry["length"])
+                    hot.append(dict(entry, offset=dst.tell()))
+                    dst.write(body)
+                dst.flush()
+                os.fsync(dst.fileno())
+            
+            self.memory["sessions"] = hot
+            self.memory["archives"] = self.memory.get("archives", []) + segments
+            self.memory["sessions_file"] = name
+            self.memory["sessions_generation"] = generation
+            self._topic_index = None
+            self.save()
+            # The previous file stays for processes that have not caught up yet
+            self._remove_session_files(keep={name, old_name})
+            return count
+    
+    def _remove_session_files(self, keep: set):
+        directory = os.path.dirname(self.filename)
+        prefix = os.path.basename(self.filename) + ".sessions"
+        for name in os.listdir(directory):
+            if name.startswith(prefix) and name not in keep:
+                try:
+                    os.remove(os.path.join(directory, name))
+                except FileNotFoundError:
+                    pass
     
     def save_study_plan(self, topic: str, plan: str):
         """Save a study plan for future reference"""
-        self.memory["study_plans"][topic] = {
+        self._record({
+            "op": "save_study_plan",
+            "topic": topic,
             "plan": plan,
-            "created_at": datetime.now().isoformat(),
+            "created_at": datetime.now().isoformat()
+        })
+    
+    def _apply_save_study_plan(self, event: Dict):
+        topic = event["topic"]
+        self.memory["study_plans"][topic] = {
+            "plan": event["plan"],
+            "created_at": event["created_at"],
             "sessions_count": self.memory["study_plans"].get(topic, {}).get("sessions_count", 0) + 1
         }
-        self.save()
     
     def get_user_progress(self, user_id: str = "default") -> Dict:
         """Get learning progress for a user"""
+        self.refresh()
         return self.memory["progress"].get(user_id, {
             "started_at": datetime.now().isoformat(),
             "total_sessions": 0,
@@ -59,92 +578,166 @@ class MemoryBank:
     
     def update_progress(self, topic: str, quiz_score: Optional[float] = None, user_id: str = "default"):
         """Update learning progress for a topic and user"""
+        self._record({
+            "op": "update_progress",
+            "user_id": user_id,
+            "topic": topic,
+            "quiz_score": quiz_score,
+            "timestamp": datetime.now().isoformat()
+        })
+    
+    def _apply_update_progress(self, event: Dict):
+        user_id = event["user_id"]
         if user_id not in self.memory["progress"]:
             self.memory["progress"][user_id] = {
-                "started_at": datetime.now().isoformat(),
+                "started_at": event["timestamp"],
                 "total_sessions": 0,
                 "topics_covered": [],
                 "quiz_scores": [],
+                "score_sum": 0.0,
+                "score_count": 0,
                 "average_score": 0.0,
                 "last_session": None
             }
         
         progress = self.memory["progress"][user_id]
         progress["total_sessions"] += 1
-        progress["last_session"] = datetime.now().isoformat()
+        progress["last_session"] = event["timestamp"]
         
+        topic = event["topic"]
         if topic not in progress["topics_covered"]:
             progress["topics_covered"].append(topic)
         
+        quiz_score = event["quiz_score"]
         if quiz_score is not None:
             progress["quiz_scores"].append(quiz_score)
-            progress["average_score"] = sum(progress["quiz_scores"]) / len(progress["quiz_scores"])
-        
-        self.save()
+            progress["score_sum"] += quiz_score
+            progress["score_count"] += 1
+            progress["average_score"] = progress["score_sum"] / progress["score_count"]
 
 class EnhancedMemoryBank(MemoryBank):
-    """Enhanced memory with analytics and compaction"""
+    """Enhanced memory with analytics and compaction
+    
+    Insights are kept as a running aggregate in ``memory["insights"]`` that
+    is updated as each session is recorded, so the dashboard never has to
+    scan the session history.
+    """
+    
+    RECENT_TOPICS = 5
     
     def __init__(self, filename: str = "data/learning_memory.json", max_sessions: int = 100):
         super().__init__(filename)
         self.max_sessions = max_sessions
+        self._retention_thread = None
     
-    def compact_memory(self):
-        """Remove oldest sessions if we exceed maximum"""
-        sessions = self.memory.get("sessions", [])
-        if len(sessions) > self.max_sessions:
-            # Keep only the most recent sessions
-            self.memory["sessions"] = sessions[-self.max_sessions:]
-            self.save()
+    def _upgrade_snapshot(self):
+        super()._upgrade_snapshot()
+        if "insights" not in self.memory:
+            self.memory["insights"] = self._empty_insights()
+            for session in self.memory["sessions"]:
+                self._update_insights(session)
     
-    def get_learning_insights(self, user_id: str = "default") -> Dict:
-        """Generate insights from learning history"""
-        sessions = self.memory.get("sessions", [])
-        user_progress = self.get_user_progress(user_id)
+    def _session_invalidated(self, entry: Dict):
+        self.memory["insights"]["complete_sessions"] -= 1
+    
+    def _empty_insights(self) -> Dict:
+        return {
+            "total_sessions": 0,
+            "complete_sessions": 0,
+            "topic_counts": {},
+            "active_days": [],
+            "recent_topics": [],
+            "first_session": None
+        }
+    
+    def add_session(self, user_input: str, agent_responses: Dict, user_profile: Dict = None,
+                    user_id: str = "default"):
+        super().add_session(user_input, agent_responses, user_profile, user_id)
+        if (Config.MEMORY_RETENTION_ENABLED
+                and len(self.memory["sessions"]) >= self.max_sessions + Config.ARCHIVE_SEGMENT_SESSIONS):
+            self._schedule_retention()
+    
+    def _schedule_retention(self):
+        """Archive old sessions on a background thread, at most one at a time"""
+        with self._lock:
+            if self._retention_thread is not None and self._retention_thread.is_alive():
+                return
+            self._retention_thread = threading.Thread(target=self._run_retention,
+                                                      name="memory-retention", daemon=True)
+            self._retention_thread.start()
+    
+    def _run_retention(self):
+        try:
+            self.compact_memory()
+        except Exception as e:
+            print(f"Warning: could not archive old sessions: {e}")
+    
+    def _apply_add_session(self, event: Dict):
+        super()._apply_add_session(event)
+        self._update_insights(event["session"])
+    
+    def _update_insights(self, session: Dict):
+        """Fold one session into the insights aggregate"""
+        insights = self.memory["insights"]
+        topic = session["user_input"]
         
-        if not sessions:
-            return {"message": "No learning data yet. Start your first session!"}
+        insights["total_sessions"] += 1
+        complete = session["complete"] if "complete" in session else is_complete_session(session["responses"])
+        if complete:
+            insights["complete_sessions"] += 1
+        insights["topic_counts"][topic] = insights["topic_counts"].get(topic, 0) + 1
+        
+        recent_topics = insights["recent_topics"]
+        recent_topics.append(topic)
+        del recent_topics[:-self.RECENT_TOPICS]
         
-        total_sessions = len(sessions)
-        topics_covered = list(set(session["user_input"] for session in sessions))
+        day = session["timestamp"][:10]
+        active_days = insights["active_days"]
+        if not active_days or day > active_days[-1]:
+            active_days.append(day)
+        else:
+            index = bisect.bisect_left(active_days, day)
+            if active_days[index] != day:
+                active_days.insert(index, day)
         
-        # Calculate session completion rate
-        complete_sessions = 0
-        for session in sessions:
-            if all(key in session["responses"] for key in ["study_plan", "explanation", "quiz"]):
-                complete_sessions += 1
+        if insights["first_session"] is None or session["timestamp"] < insights["first_session"]:
+            insights["first_session"] = session["timestamp"]
+    
+    def compact_memory(self) -> int:
+        """Archive the oldest sessions beyond ``max_sessions`` in whole segments
+        
+        The insights aggregate still covers the full history, and archived
+        sessions stay reachable through ``get_session`` and paging.
+        """
+        return self.archive_sessions(self.max_sessions, Config.ARCHIVE_SEGMENT_SESSIONS)
+    
+    def get_learning_insights(self, user_id: str = "default") -> Dict:
+        """Generate insights from the running aggregate"""
+        self.refresh()
+        insights = self.memory["insights"]
+        user_progress = self.get_user_progress(user_id)
         
-        # Recent activity
-        recent_sessions = sessions[-5:] if sessions else []
-        recent_topics = [session["user_input"] for session in recent_sessions]
+        total_sessions = insights["total_sessions"]
+        if not total_sessions:
+            return {"message": "No learning data yet. Start your first session!"}
         
         return {
             "total_sessions": total_sessions,
-            "topics_covered": len(topics_covered),
-            "completion_rate": f"{(complete_sessions/total_sessions)*100:.1f}%",
+            "topics_covered": len(insights["topic_counts"]),
+            "completion_rate": f"{(insights['complete_sessions']/total_sessions)*100:.1f}%",
             "average_quiz_score": f"{user_progress.get('average_score', 0):.1f}%",
-            "recent_topics": recent_topics,
-            "learning_streak": self._calculate_learning_streak(sessions),
-            "first_session": sessions[0]["timestamp"][:10] if sessions else "Never"
+            "recent_topics": list(insights["recent_topics"]),
+            "learning_streak": self._calculate_learning_streak(insights["active_days"]),
+            "first_session": insights["first_session"][:10]
         }
     
-    def _calculate_learning_streak(self, sessions: List[Dict]) -> int:
-        """Calculate consecutive days of learning"""
-        if not sessions:
-            return 0
-        
-        # Get unique days with sessions
-        session_days = set()
-        for session in sessions:
-            session_date = session["timestamp"][:10]  # YYYY-MM-DD
-            session_days.add(session_date)
-        
-        # Sort dates and calculate streak
-        sorted_days = sorted(session_days, reverse=True)
+    def _calculate_learning_streak(self, active_days: List[str]) -> int:
+        """Calculate consecutive days of learning from the sorted list of active days"""
         streak = 0
         current_date = datetime.now().date()
         
-        for day_str in sorted_days:
+        # Walk back from the most recent day; only the streak itself is visited
+        for day_str in reversed(active_days):
             day_date = datetime.strptime(day_str, "%Y-%m-%d").date()
             if (current_date - day_date).days == streak:
                 streak += 1
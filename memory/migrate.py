@@ -0,0 +1,38 @@
+#!/usr/bin/env python3
+"""
+Import JSON learning memory into the SQLite memory backend
+
+The default memory file and every per-user shard under the users directory
+are imported; running it again only adds what is new.
+
+Usage: python -m memory.migrate [--source data/learning_memory.json] [--users-dir data/users]
+                                [--target data/learning_memory.db]
+"""
+
+import argparse
+import glob
+import os
+
+from config import Config
+from .sqlite_memory_bank import SQLiteMemoryBank
+
+def main():
+    parser = argparse.ArgumentParser(description="Migrate JSON learning memory to SQLite")
+    parser.add_argument("--source", default=Config.MEMORY_FILE, help="JSON memory file to import")
+    parser.add_argument("--users-dir", default=Config.USER_MEMORY_DIR, help="directory of per-user JSON shards")
+    parser.add_argument("--target", default=Config.MEMORY_DB_FILE, help="SQLite database to create or extend")
+    args = parser.parse_args()
+    
+    database = SQLiteMemoryBank(args.target)
+    # A shard that was never compacted has only its journal so far
+    shards = {path[:-len(".journal")] if path.endswith(".journal") else path
+              for pattern in ("*.json", "*.json.journal") for path in glob.glob(os.path.join(args.users_dir, pattern))}
+    for source in [args.source] + sorted(shards):
+        if not (os.path.exists(source) or os.path.exists(source + ".journal")):
+            continue
+        imported = database.import_json(source)
+        print(f"✅ Imported {imported} sessions from {source} into {args.target}")
+    print("💡 Set Config.MEMORY_BACKEND = \"sqlite\" to use the database")
+
+if __name__ == "__main__":
+    main()
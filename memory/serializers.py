@@ -0,0 +1,131 @@
+import json
+import zlib
+from typing import Any, Tuple
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+try:
+    import msgpack
+    MSGPACK_AVAILABLE = True
+except ImportError:
+    MSGPACK_AVAILABLE = False
+
+from config import Config
+
+def dumps_json(obj: Any) -> bytes:
+    """Compact JSON, encoded with orjson when it is installed"""
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(obj)
+    return json.dumps(obj, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+def loads_json(data: bytes) -> Any:
+    return orjson.loads(data) if ORJSON_AVAILABLE else json.loads(data)
+
+class Serializer:
+    """Turns the memory snapshot into bytes and back"""
+    
+    name = "unknown"
+    
+    def dumps(self, obj: Any) -> bytes:
+        raise NotImplementedError
+    
+    def loads(self, data: bytes) -> Any:
+        raise NotImplementedError
+
+class JsonSerializer(Serializer):
+    """JSON, compact unless an ``indent`` is given"""
+    
+    def __init__(self, indent: int = None):
+        self.indent = indent
+        self.name = "json-pretty" if indent else "json"
+    
+    def dumps(self, obj: Any) -> bytes:
+        if self.indent:
+            return json.dumps(obj, indent=self.indent).encode("utf-8")
+        return dumps_json(obj)
+    
+    def loads(self, data: bytes) -> Any:
+        return loads_json(data)
+
+class MsgpackSerializer(Serializer):
+    """MessagePack: binary, smaller and faster to parse than JSON"""
+    
+    name = "msgpack"
+    
+    def dumps(self, obj: Any) -> bytes:
+        return msgpack.packb(obj, use_bin_type=True)
+    
+    def loads(self, data: bytes) -> Any:
+        return msgpack.unpackb(data, raw=False, strict_map_key=False)
+
+class CompressedSerializer(Serializer):
+    """Another serializer's output, zlib-compressed"""
+    
+    def __init__(self, inner: Serializer, level: int = 6):
+        self.inner = inner
+        self.level = level
+        self.name = f"{inner.name}+zlib"
+    
+    def dumps(self, obj: Any) -> bytes:
+        return zlib.compress(self.inner.dumps(obj), self.level)
+    
+    def loads(self, data: bytes) -> Any:
+        return self.inner.loads(zlib.decompress(data))
+
+_msgpack_warned = False
+
+def get_serializer(fmt: str = None, compression: int = None) -> Serializer:
+    """The serializer for Config.MEMORY_FORMAT and Config.MEMORY_COMPRESSION
+    
+    ``compression`` is a zlib level; 0 turns compression off.
+    """
+    fmt = fmt or Config.MEMORY_FORMAT
+    compression = Config.MEMORY_COMPRESSION if compression is None else compression
+    if fmt == "msgpack" and not MSGPACK_AVAILABLE:
+        global _msgpack_warned
+        if not _msgpack_warned:
+            print("Warning: msgpack not installed. Writing memory as compact JSON instead.")
+            _msgpack_warned = True
+        fmt = "json"
+    
+    if fmt == "json":
+        serializer = JsonSerializer()
+    elif fmt == "json-pretty":
+        serializer = JsonSerializer(indent=2)
+    elif fmt == "msgpack":
+        serializer = MsgpackSerializer()
+    else:
+        raise ValueError(f"Unknown memory format: {fmt}")
+    return CompressedSerializer(serializer, compression) if compression else serializer
+
+def loads_any(data: bytes) -> Tuple[Any, str]:
+    """Decode a snapshot written in any supported format
+    
+    Returns ``(obj, format_name)``; raises ValueError if ``data`` is not a
+    readable snapshot. A zlib stream always starts with 0x78 ("x"), which
+    neither a JSON object nor a MessagePack map can.
+    """
+    compressed = data[:1] == b"\x78"
+    try:
+        if compressed:
+            data = zlib.decompress(data)
+        head = data[:64].lstrip()
+        if head[:1] in (b"{", b"["):
+            obj = loads_json(data)
+            name = "json-pretty" if b"\n" in data[:64] else "json"
+        elif MSGPACK_AVAILABLE:
+            obj, name = msgpack.unpackb(data, raw=False, strict_map_key=False), "msgpack"
+        else:
+            raise ValueError("snapshot is not JSON and msgpack is not installed to read it")
+    except zlib.error as e:
+        raise ValueError(f"corrupt compressed snapshot: {e}")
+    except ValueError:
+        raise
+    except Exception as e:
+        # msgpack reports malformed input with its own exception types
+        raise ValueError(f"unreadable snapshot: {e}")
+    return obj, f"{name}+zlib" if compressed else name
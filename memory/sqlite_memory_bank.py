@@ -0,0 +1,394 @@
+import json
+import os
+import sqlite3
+import threading
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from config import Config
+from .memory_bank import MemoryBank, compact_responses, is_complete_session
+from .topic_index import TopicIndex, pick_reusable_session, popular_topics
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id TEXT NOT NULL,
+    topic TEXT NOT NULL,
+    timestamp TEXT NOT NULL,
+    day TEXT NOT NULL,
+    complete INTEGER NOT NULL,
+    score REAL,
+    responses TEXT NOT NULL,
+    user_profile TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_sessions_user_time ON sessions(user_id, timestamp);
+CREATE INDEX IF NOT EXISTS idx_sessions_user_id ON sessions(user_id, id);
+CREATE INDEX IF NOT EXISTS idx_sessions_user_topic ON sessions(user_id, topic);
+CREATE INDEX IF NOT EXISTS idx_sessions_user_day ON sessions(user_id, day);
+
+CREATE TABLE IF NOT EXISTS study_plans (
+    topic TEXT PRIMARY KEY,
+    plan TEXT NOT NULL,
+    created_at TEXT NOT NULL,
+    sessions_count INTEGER NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS progress (
+    user_id TEXT PRIMARY KEY,
+    started_at TEXT NOT NULL,
+    total_sessions INTEGER NOT NULL,
+    score_sum REAL NOT NULL,
+    score_count INTEGER NOT NULL,
+    last_session TEXT
+);
+
+CREATE TABLE IF NOT EXISTS progress_topics (
+    user_id TEXT NOT NULL,
+    topic TEXT NOT NULL,
+    PRIMARY KEY (user_id, topic)
+);
+
+CREATE TABLE IF NOT EXISTS quiz_scores (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id TEXT NOT NULL,
+    score REAL NOT NULL,
+    timestamp TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_quiz_scores_user ON quiz_scores(user_id);
+"""
+
+class SQLiteMemoryBank:
+    """SQLite-backed memory with the same interface as EnhancedMemoryBank
+    
+    Sessions, progress and study plans live in indexed tables, so dashboard
+    and history queries are index lookups instead of scans over a list
+    held in memory. WAL mode lets readers run alongside a writer.
+    """
+    
+    def __init__(self, filename: str = "data/learning_memory.db", max_sessions: int = 100):
+        self.filename = filename
+        self.max_sessions = max_sessions
+        self._local = threading.local()
+        # Per-user topic indexes and the last session id each has seen
+        self._topic_indexes: Dict[str, TopicIndex] = {}
+        self._indexed_up_to: Dict[str, int] = {}
+        self._index_lock = threading.Lock()
+        os.makedirs(os.path.dirname(filename) or ".", exist_ok=True)
+        columns = [row["name"] for row in self._conn.execute("PRAGMA table_info(sessions)")]
+        if columns and "score" not in columns:
+            # Databases created before session scores were indexed
+            self._conn.execute("ALTER TABLE sessions ADD COLUMN score REAL")
+        self._conn.executescript(SCHEMA)
+        self._upgrade_sessions()
+    
+    def _upgrade_sessions(self):
+        """Store failed sections as error codes in databases written before
+        that was done, and recompute which sessions are complete"""
+        if self._conn.execute("PRAGMA user_version").fetchone()[0] >= 1:
+            return
+        with self._conn as conn:
+            for row in conn.execute("SELECT id, responses FROM sessions").fetchall():
+                responses = compact_responses(json.loads(row["responses"]))
+                conn.execute("UPDATE sessions SET responses = ?, complete = ? WHERE id = ?",
+                             (json.dumps(responses), int(is_complete_session(responses)), row["id"]))
+            conn.execute("PRAGMA user_version = 1")
+    
+    @property
+    def _conn(self) -> sqlite3.Connection:
+        """One connection per thread, and per process: connections are
+        neither thread-safe nor safe to use across a fork"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.filename, timeout=30)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn, self._local.pid = conn, os.getpid()
+        return conn
+    
+    @property
+    def memory(self) -> Dict:
+        """Materialize the whole store in the JSON layout (for compatibility only)"""
+        sessions = [self._session_from_row(row) for row in
+                    self._conn.execute("SELECT * FROM sessions ORDER BY id")]
+        study_plans = {
+            row["topic"]: {
+                "plan": row["plan"],
+                "created_at": row["created_at"],
+                "sessions_count": row["sessions_count"]
+            }
+            for row in self._conn.execute("SELECT * FROM study_plans")
+        }
+        progress = {}
+        for row in self._conn.execute("SELECT user_id FROM progress"):
+            progress[row["user_id"]] = self.get_user_progress(row["user_id"])
+        return {"sessions": sessions, "study_plans": study_plans, "progress": progress, "user_profiles": {}}
+    
+    def save(self):
+        """Every change is committed as it happens; kept for interface parity"""
+    
+    def add_session(self, user_input: str, agent_responses: Dict, user_profile: Dict = None,
+                    user_id: str = "default"):
+        """Record a complete learning session"""
+        with self._conn as conn:
+            self._insert_session(conn, {
+                "timestamp": datetime.now().isoformat(),
+                "user_id": user_id,
+                "user_input": user_input,
+                "responses": agent_responses,
+                "user_profile": user_profile or {}
+            })
+    
+    def _insert_session(self, conn: sqlite3.Connection, session: Dict):
+        timestamp = session["timestamp"]
+        responses = compact_responses(session["responses"])
+        conn.execute(
+            "INSERT INTO sessions "
+            "(user_id, topic, timestamp, day, complete, score, responses, user_profile) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (session.get("user_id", "default"), session["user_input"], timestamp, timestamp[:10],
+             int(is_complete_session(responses)), responses.get("score"),
+             json.dumps(responses), json.dumps(session.get("user_profile", {})))
+        )
+    
+    def save_study_plan(self, topic: str, plan: str):
+        """Save a study plan for future reference"""
+        with self._conn as conn:
+            conn.execute(
+                "INSERT INTO study_plans (topic, plan, created_at, sessions_count) VALUES (?, ?, ?, 1) "
+                "ON CONFLICT(topic) DO UPDATE SET plan = excluded.plan, "
+                "created_at = excluded.created_at, sessions_count = sessions_count + 1",
+                (topic, plan, datetime.now().isoformat())
+            )
+    
+    def get_user_progress(self, user_id: str = "default") -> Dict:
+        """Get learning progress for a user"""
+        row = self._conn.execute("SELECT * FROM progress WHERE user_id = ?", (user_id,)).fetchone()
+        if row is None:
+            return {
+                "started_at": datetime.now().isoformat(),
+                "total_sessions": 0,
+                "topics_covered": [],
+                "average_score": 0.0
+            }
+        
+        topics = [r["topic"] for r in self._conn.execute(
+            "SELECT topic FROM progress_topics WHERE user_id = ? ORDER BY rowid", (user_id,))]
+        scores = [r["score"] for r in self._conn.execute(
+            "SELECT score FROM quiz_scores WHERE user_id = ? ORDER BY id", (user_id,))]
+        return {
+            "started_at": row["started_at"],
+            "total_sessions": row["total_sessions"],
+            "topics_covered": topics,
+            "quiz_scores": scores,
+            "average_score": row["score_sum"] / row["score_count"] if row["score_count"] else 0.0,
+            "last_session": row["last_session"]
+        }
+    
+    def update_progress(self, topic: str, quiz_score: Optional[float] = None, user_id: str = "default"):
+        """Update learning progress for a topic and user"""
+        now = datetime.now().isoformat()
+        with self._conn as conn:
+            self._apply_progress(conn, user_id, topic, quiz_score, now)
+    
+    def _apply_progress(self, conn: sqlite3.Connection, user_id: str, topic: str,
+                        quiz_score: Optional[float], timestamp: str):
+        scored = quiz_score is not None
+        conn.execute(
+            "INSERT INTO progress (user_id, started_at, total_sessions, score_sum, score_count, last_session) "
+            "VALUES (?, ?, 1, ?, ?, ?) "
+            "ON CONFLICT(user_id) DO UPDATE SET total_sessions = total_sessions + 1, "
+            "score_sum = score_sum + excluded.score_sum, score_count = score_count + excluded.score_count, "
+            "last_session = excluded.last_session",
+            (user_id, timestamp, quiz_score if scored else 0.0, int(scored), timestamp)
+        )
+        conn.execute("INSERT OR IGNORE INTO progress_topics (user_id, topic) VALUES (?, ?)", (user_id, topic))
+        if scored:
+            conn.execute("INSERT INTO quiz_scores (user_id, score, timestamp) VALUES (?, ?, ?)",
+                         (user_id, quiz_score, timestamp))
+    
+    def get_recent_sessions(self, limit: int = 10, user_id: str = "default") -> List[Dict]:
+        """Return the most recent sessions, oldest first"""
+        rows = self._conn.execute(
+            "SELECT * FROM sessions WHERE user_id = ? ORDER BY timestamp DESC LIMIT ?", (user_id, limit)
+        ).fetchall()
+        return [self._session_from_row(row) for row in reversed(rows)]
+    
+    def get_popular_topics(self, limit: int = 10, window: int = Config.CACHE_WARM_WINDOW) -> List[Dict]:
+        """The most requested topics among the last ``window`` sessions of every user"""
+        rows = self._conn.execute(
+            "SELECT topic, user_profile FROM sessions ORDER BY id DESC LIMIT ?", (window,)
+        ).fetchall()
+        return popular_topics(({"user_input": row["topic"], "user_profile": json.loads(row["user_profile"])}
+                               for row in reversed(rows)), limit)
+    
+    def get_session(self, session_id: int) -> Optional[Dict]:
+        """Load one full session (including agent responses) by id"""
+        row = self._conn.execute("SELECT * FROM sessions WHERE id = ?", (session_id,)).fetchone()
+        return self._session_from_row(row) if row is not None else None
+    
+    def find_similar_session(self, topic: str, profile: Dict = None, user_id: str = "default",
+                             threshold: float = Config.TOPIC_REUSE_THRESHOLD) -> Optional[Dict]:
+        """The best earlier session of ``user_id`` on a near-identical topic
+        for the same kind of learner, with its ``similarity`` score, or None
+        
+        Each lookup first indexes the user's sessions added since the last
+        one, including those written by other processes.
+        """
+        with self._index_lock:
+            index = self._topic_indexes.setdefault(user_id, TopicIndex())
+            rows = self._conn.execute(
+                "SELECT id, topic FROM sessions WHERE user_id = ? AND id > ? ORDER BY id",
+                (user_id, self._indexed_up_to.get(user_id, 0))).fetchall()
+            for row in rows:
+                index.add(row["id"], row["topic"])
+            if rows:
+                self._indexed_up_to[user_id] = rows[-1]["id"]
+            matches = index.search(topic, threshold)
+        return pick_reusable_session(matches, self.get_session, profile)
+    
+    def get_sessions_page(self, cursor: Optional[int] = None, limit: int = 10,
+                          user_id: str = "default") -> Dict:
+        """Return one page of the session index, newest first, without response bodies"""
+        rows = self._conn.execute(
+            "SELECT id, timestamp, user_id, topic, score, complete FROM sessions "
+            "WHERE user_id = ? AND id < ? ORDER BY id DESC LIMIT ?",
+            (user_id, cursor if cursor is not None else 2 ** 63 - 1, limit + 1)
+        ).fetchall()
+        page = [{
+            "id": row["id"],
+            "timestamp": row["timestamp"],
+            "user_id": row["user_id"],
+            "user_input": row["topic"],
+            "score": row["score"],
+            "complete": bool(row["complete"])
+        } for row in rows[:limit]]
+        return {
+            "sessions": page,
+            "next_cursor": page[-1]["id"] if len(rows) > limit else None
+        }
+    
+    def compact_memory(self, user_id: Optional[str] = None) -> int:
+        """Remove each user's oldest sessions beyond ``max_sessions``; returns how many were removed
+        
+        Only ``user_id``'s sessions are trimmed when given, so one busy
+        user never pushes out another user's history.
+        """
+        if user_id is None:
+            user_ids = [row["user_id"] for row in self._conn.execute("SELECT DISTINCT user_id FROM sessions")]
+        else:
+            user_ids = [user_id]
+        removed = 0
+        with self._conn as conn:
+            for user in user_ids:
+                removed += conn.execute(
+                    "DELETE FROM sessions WHERE user_id = ? AND id NOT IN "
+                    "(SELECT id FROM sessions WHERE user_id = ? ORDER BY id DESC LIMIT ?)",
+                    (user, user, self.max_sessions)
+                ).rowcount
+        with self._index_lock:
+            for user in user_ids:
+                self._topic_indexes.pop(user, None)
+                self._indexed_up_to.pop(user, None)
+        return removed
+    
+    def get_learning_insights(self, user_id: str = "default") -> Dict:
+        """Generate insights from learning history using indexed aggregate queries"""
+        totals = self._conn.execute(
+            "SELECT COUNT(*) AS total, COALESCE(SUM(complete), 0) AS complete, "
+            "COUNT(DISTINCT topic) AS topics, MIN(timestamp) AS first "
+            "FROM sessions WHERE user_id = ?", (user_id,)
+        ).fetchone()
+        
+        if not totals["total"]:
+            return {"message": "No learning data yet. Start your first session!"}
+        
+        recent_topics = [row["topic"] for row in reversed(self._conn.execute(
+            "SELECT topic FROM sessions WHERE user_id = ? ORDER BY timestamp DESC LIMIT 5", (user_id,)
+        ).fetchall())]
+        user_progress = self.get_user_progress(user_id)
+        
+        return {
+            "total_sessions": totals["total"],
+            "topics_covered": totals["topics"],
+            "completion_rate": f"{(totals['complete']/totals['total'])*100:.1f}%",
+            "average_quiz_score": f"{user_progress.get('average_score', 0):.1f}%",
+            "recent_topics": recent_topics,
+            "learning_streak": self._calculate_learning_streak(user_id),
+            "first_session": totals["first"][:10]
+        }
+    
+    def _calculate_learning_streak(self, user_id: str = "default") -> int:
+        """Calculate consecutive days of learning, reading only as many days as the streak"""
+        streak = 0
+        current_date = datetime.now().date()
+        
+        for row in self._conn.execute(
+            "SELECT DISTINCT day FROM sessions WHERE user_id = ? ORDER BY day DESC", (user_id,)
+        ):
+            day_date = datetime.strptime(row["day"], "%Y-%m-%d").date()
+            if (current_date - day_date).days == streak:
+                streak += 1
+            else:
+                break
+        
+        return streak
+    
+    def import_json(self, filename: str) -> int:
+        """Import a JSON memory file (snapshot, journal and archive); returns sessions imported
+        
+        The JSON files are only read. Session ids are only unique within one
+        file, so sessions get fresh ids here, and one already present (same
+        user, timestamp and topic) is skipped, as is progress for users the
+        database already has; importing a file again adds nothing twice.
+        """
+        bank = MemoryBank(filename, read_only=True)
+        source = bank.memory
+        imported = 0
+        
+        with self._conn as conn:
+            for session in bank.iter_sessions():
+                if conn.execute(
+                    "SELECT 1 FROM sessions WHERE user_id = ? AND timestamp = ? AND topic = ?",
+                    (session.get("user_id", "default"), session["timestamp"], session["user_input"])
+                ).fetchone():
+                    continue
+                self._insert_session(conn, session)
+                imported += 1
+            
+            for topic, plan in source.get("study_plans", {}).items():
+                conn.execute(
+                    "INSERT OR REPLACE INTO study_plans (topic, plan, created_at, sessions_count) "
+                    "VALUES (?, ?, ?, ?)",
+                    (topic, plan["plan"], plan["created_at"], plan.get("sessions_count", 1))
+                )
+            
+            for user_id, progress in source.get("progress", {}).items():
+                scores = progress.get("quiz_scores", [])
+                cursor = conn.execute(
+                    "INSERT OR IGNORE INTO progress "
+                    "(user_id, started_at, total_sessions, score_sum, score_count, last_session) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (user_id, progress["started_at"], progress.get("total_sessions", 0),
+                     sum(scores), len(scores), progress.get("last_session"))
+                )
+                if cursor.rowcount == 0:
+                    continue
+                for topic in progress.get("topics_covered", []):
+                    conn.execute("INSERT OR IGNORE INTO progress_topics (user_id, topic) VALUES (?, ?)",
+                                 (user_id, topic))
+                for score in scores:
+                    conn.execute("INSERT INTO quiz_scores (user_id, score, timestamp) VALUES (?, ?, ?)",
+                                 (user_id, score, progress.get("last_session") or progress["started_at"]))
+        
+        return imported
+    
+    def _session_from_row(self, row: sqlite3.Row) -> Dict:
+        return {
+            "id": row["id"],
+            "timestamp": row["timestamp"],
+            "user_id": row["user_id"],
+            "user_input": row["topic"],
+            "responses": json.loads(row["responses"]),
+            "user_profile": json.loads(row["user_profile"])
+        }
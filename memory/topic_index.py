@@ -0,0 +1,238 @@
+import math
+import os
+import re
+from collections import Counter
+from typing import Callable, Dict, Hashable, Iterable, List, Optional, Tuple
+
+# Words that say how a topic is asked for rather than what it is about
+FILLER_WORDS = {
+    "a", "an", "the", "to", "of", "for", "on", "about", "into", "in",
+    "intro", "introduction", "introductory", "basics", "basic", "fundamentals", "fundamental",
+    "overview", "101", "primer", "guide", "beginner", "beginners", "essentials",
+    "learn", "learning", "understanding", "getting", "started", "what", "is", "are",
+}
+# Kept whole even though "learning" on its own is filler
+PROTECTED_PHRASES = {"machine learning", "deep learning", "reinforcement learning"}
+
+COMMON_ACRONYMS = {
+    "ai": "artificial intelligence",
+    "ml": "machine learning",
+    "dl": "deep learning",
+    "rl": "reinforcement learning",
+    "nlp": "natural language processing",
+    "cv": "computer vision",
+    "nn": "neural networks",
+    "cs": "computer science",
+    "os": "operating systems",
+    "db": "databases",
+    "oop": "object oriented programming",
+    "js": "javascript",
+    "api": "application programming interface",
+    "ui": "user interface",
+}
+
+def _one_edit_apart(a: str, b: str) -> bool:
+    """Whether one letter inserted, removed or changed turns ``a`` into ``b``"""
+    if len(a) > len(b):
+        a, b = b, a
+    if len(b) - len(a) > 1:
+        return False
+    i = 0
+    while i < len(a) and a[i] == b[i]:
+        i += 1
+    return a[i + 1:] == b[i + 1:] if len(a) == len(b) else a[i:] == b[i + 1:]
+
+def same_word(a: str, b: str) -> bool:
+    """Whether two words differ only by an ending or a one-letter typo
+    
+    Words shorter than four letters and numbers must match exactly, so
+    "R" is never taken for some other word, and a typo must keep the first
+    two letters, since a differing start is often a prefix that reverses
+    the meaning ("synchronous" and "asynchronous").
+    """
+    if a == b:
+        return True
+    if min(len(a), len(b)) < 4 or a.isdigit() or b.isdigit():
+        return False
+    if len(os.path.commonprefix([a, b])) >= max(len(a), len(b)) - 3:
+        return True
+    return a[:2] == b[:2] and _one_edit_apart(a, b)
+
+def profile_key(profile: Optional[Dict]) -> Tuple[str, str, str]:
+    """The parts of a learner profile that shape a session's prompts"""
+    profile = profile or {}
+    return (profile.get("level", "beginner"), profile.get("style", "mixed"),
+            profile.get("timeline", "flexible"))
+
+def pick_reusable_session(matches: List[Tuple[Hashable, float]], load: Callable[[Hashable], Optional[Dict]],
+                          profile: Optional[Dict]) -> Optional[Dict]:
+    """The best earlier session among index ``matches`` for a learner with ``profile``
+    
+    Sessions for a different level, style or timeline are skipped; a
+    complete session wins over a better-matching partial one. The chosen
+    session is returned with its ``similarity`` added.
+    """
+    wanted = profile_key(profile)
+    fallback = None
+    for key, score in matches:
+        session = load(key)
+        if session is None or profile_key(session.get("user_profile")) != wanted:
+            continue
+        session = dict(session, similarity=round(score, 3))
+        if not session["responses"].get("errors"):
+            return session
+        fallback = fallback or session
+    return fallback
+
+def popular_topics(sessions: Iterable[Dict], limit: int) -> List[Dict]:
+    """The most requested topics among ``sessions``, each for one kind of learner
+    
+    Sessions (oldest first) are grouped by their topic, ignoring case and
+    spacing, and the profile fields in ``profile_key``. Each group is
+    returned as ``{"user_input", "user_profile", "count"}`` with its latest
+    spelling and profile; a session may carry a ``count`` of its own, so
+    results from several stores can be merged by passing them through again.
+    """
+    groups: Dict[Tuple, Dict] = {}
+    for order, session in enumerate(sessions):
+        key = (" ".join(session["user_input"].split()).lower(), profile_key(session.get("user_profile")))
+        count = groups[key]["count"] if key in groups else 0
+        groups[key] = {"user_input": session["user_input"], "user_profile": session.get("user_profile") or {},
+                       "count": count + session.get("count", 1), "order": order}
+    ranked = sorted(groups.values(), key=lambda group: (-group["count"], -group["order"]))
+    return [{name: group[name] for name in ("user_input", "user_profile", "count")} for group in ranked[:limit]]
+
+class TopicIndex:
+    """Character n-gram TF-IDF index for finding near-duplicate topics
+    
+    "ML basics", "machine learning basics" and "intro to machine learning"
+    all normalize to "machine learning": acronyms are expanded, filler
+    words dropped, and the remaining text is compared by overlapping
+    character n-grams, which also absorbs plurals and small typos. Numbers
+    must match exactly, since "World War 1" is not "World War 2", and every
+    remaining word on either side must have a counterpart on the other, so
+    "R programming" is not taken for "programming" however close their
+    n-grams are.
+    
+    Adding a topic only touches its own postings. IDF weights change as
+    topics are added, so document norms are recomputed lazily on the next
+    search. Scoring walks the postings of the query's n-grams, so only
+    topics sharing at least one n-gram with the query are visited.
+    """
+    
+    def __init__(self, n: int = 3):
+        self.n = n
+        self.acronyms = dict(COMMON_ACRONYMS)
+        self._postings: Dict[str, Dict[Hashable, int]] = {}
+        self._doc_terms: Dict[Hashable, Counter] = {}
+        self._doc_numbers: Dict[Hashable, frozenset] = {}
+        self._doc_words: Dict[Hashable, Tuple[str, ...]] = {}
+        self._norms: Dict[Hashable, float] = {}
+        self._norms_stale = False
+    
+    def __len__(self) -> int:
+        return len(self._doc_terms)
+    
+    def normalize(self, topic: str) -> str:
+        """Reduce a topic to the words that say what it is about
+        
+        Acronyms, well-known or learned from indexed topics, are only
+        expanded when written in capitals, so an ordinary word that happens
+        to match ("cv writing") is left alone.
+        """
+        expanded = []
+        for word in re.sub(r"[^A-Za-z0-9+#]+", " ", topic).split():
+            lowered = word.lower()
+            if word.isupper() and lowered in self.acronyms:
+                expanded.append(self.acronyms[lowered])
+            else:
+                expanded.append(lowered)
+        words = " ".join(expanded)
+        for phrase in PROTECTED_PHRASES:
+            words = words.replace(phrase, phrase.replace(" ", "_"))
+        kept = [word.replace("_", " ") for word in words.split() if word not in FILLER_WORDS]
+        return " ".join(kept)
+    
+    def _terms(self, topic: str) -> Counter:
+        text = self.normalize(topic)
+        if not text:
+            return Counter()
+        padded = f" {text} "
+        return Counter(padded[i:i + self.n] for i in range(len(padded) - self.n + 1))
+    
+    def _numbers(self, topic: str) -> frozenset:
+        return frozenset(re.findall(r"\d+", self.normalize(topic)))
+    
+    def _words_match(self, words: Tuple[str, ...], key: Hashable) -> bool:
+        """Whether every word of a query and of an indexed topic has a counterpart in the other"""
+        doc_words = self._doc_words[key]
+        return (all(any(same_word(word, other) for other in doc_words) for word in words)
+                and all(any(same_word(other, word) for word in words) for other in doc_words))
+    
+    def _learn_acronyms(self, topic: str):
+        """Remember initials of multi-word topics, so "GT" can find "graph theory" later"""
+        words = self.normalize(topic).split()
+        if 2 <= len(words) <= 4 and all(word[0].isalpha() for word in words):
+            self.acronyms.setdefault("".join(word[0] for word in words), " ".join(words))
+    
+    def _idf(self, term: str) -> float:
+        return math.log((1 + len(self._doc_terms)) / (1 + len(self._postings.get(term, ())))) + 1
+    
+    def add(self, key: Hashable, topic: str):
+        """Index ``topic`` under ``key``, replacing any earlier topic for that key"""
+        if key in self._doc_terms:
+            self.remove(key)
+        self._learn_acronyms(topic)
+        terms = self._terms(topic)
+        self._doc_terms[key] = terms
+        self._doc_numbers[key] = self._numbers(topic)
+        self._doc_words[key] = tuple(self.normalize(topic).split())
+        for term, count in terms.items():
+            self._postings.setdefault(term, {})[key] = count
+        self._norms_stale = True
+    
+    def remove(self, key: Hashable):
+        for term in self._doc_terms.pop(key, ()):
+            postings = self._postings[term]
+            postings.pop(key, None)
+            if not postings:
+                del self._postings[term]
+        self._doc_numbers.pop(key, None)
+        self._doc_words.pop(key, None)
+        self._norms.pop(key, None)
+        self._norms_stale = True
+    
+    def _refresh_norms(self):
+        if self._norms_stale:
+            idf = {term: self._idf(term) for term in self._postings}
+            self._norms = {
+                key: math.sqrt(sum((count * idf[term]) ** 2 for term, count in terms.items()))
+                for key, terms in self._doc_terms.items()
+            }
+            self._norms_stale = False
+    
+    def search(self, topic: str, threshold: float = 0.0, limit: int = 5) -> List[Tuple[Hashable, float]]:
+        """Indexed keys whose topics have cosine similarity of at least
+        ``threshold`` with ``topic``, best first (newest first among ties
+        when keys increase over time)"""
+        terms = self._terms(topic)
+        if not terms or not self._doc_terms:
+            return []
+        self._refresh_norms()
+        
+        weights = {term: count * self._idf(term) for term, count in terms.items()}
+        query_norm = math.sqrt(sum(weight ** 2 for weight in weights.values()))
+        dots: Dict[Hashable, float] = {}
+        for term, weight in weights.items():
+            idf = self._idf(term)
+            for key, count in self._postings.get(term, {}).items():
+                dots[key] = dots.get(key, 0.0) + weight * count * idf
+        
+        numbers = self._numbers(topic)
+        scores = [(key, dot / (query_norm * self._norms[key])) for key, dot in dots.items()
+                  if self._norms.get(key) and self._doc_numbers[key] == numbers]
+        words = tuple(self.normalize(topic).split())
+        scores = [(key, min(1.0, score)) for key, score in scores
+                  if score >= threshold and self._words_match(words, key)]
+        scores.sort(key=lambda item: (item[1], item[0]), reverse=True)
+        return scores[:limit]
@@ -0,0 +1,3 @@
+from .session_executor import SessionExecutor
+
+__all__ = ["SessionExecutor"]
@@ -0,0 +1,297 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from contextvars import copy_context
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from agents.retry import run_with_deadline
+from config import Config
+
+def normalize_topic(topic: str) -> str:
+    """Key under which identical topics are generated only once"""
+    return " ".join(topic.split()).lower()
+
+def unique_topics(topics: List[str]) -> List[str]:
+    """Drop blank and repeated topics, keeping the first spelling of each"""
+    seen = {}
+    for topic in topics:
+        topic = topic.strip()
+        if topic and normalize_topic(topic) not in seen:
+            seen[normalize_topic(topic)] = topic
+    return list(seen.values())
+
+class BatchExecutor:
+    """Runs the agent calls of many sessions through one bounded pool
+    
+    Every call of every session is queued on the same pool, so a batch of
+    fifty topics keeps at most ``max_workers`` calls in flight (each still
+    going through the shared rate limiter) instead of fifty sessions' worth.
+    A call that is still running ``call_timeout`` seconds after a worker
+    picked it up is reported as timed out, so one hung call cannot stall
+    the rest of the batch.
+    """
+    
+    # How often the gatherer checks whether a queued call has been picked up
+    QUEUE_POLL_SECONDS = 0.05
+    
+    def __init__(self, max_workers: int = Config.BATCH_MAX_WORKERS,
+                 call_timeout: float = Config.SESSION_CALL_TIMEOUT):
+        self.call_timeout = call_timeout
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="batch")
+    
+    def stream(self, sessions: Dict[str, Dict[str, Callable[[], Any]]]
+               ) -> Iterator[Tuple[str, Dict[str, Any], Dict[str, str]]]:
+        """Run every session's calls and yield ``(key, results, errors)``
+        for each session as soon as its last call finishes"""
+        futures = {}
+        pending = {}
+        deadlines: Dict[Tuple[str, str], float] = {}
+        outcomes = {key: ({}, {}) for key in sessions}
+        for key, calls in sessions.items():
+            pending[key] = len(calls)
+            for name, call in calls.items():
+                future = self._pool.submit(copy_context().run, self._run_call, deadlines, (key, name), call)
+                futures[future] = (key, name)
+        
+        for key in [key for key, count in pending.items() if count == 0]:
+            yield key, {}, {}
+        
+        remaining = set(futures)
+        while remaining:
+            now = time.monotonic()
+            waits = [deadlines[futures[future]] - now if futures[future] in deadlines else self.QUEUE_POLL_SECONDS
+                     for future in remaining]
+            done, _ = wait(remaining, timeout=max(0.0, min(waits)), return_when=FIRST_COMPLETED)
+            now = time.monotonic()
+            expired = {future for future in remaining - done if deadlines.get(futures[future], now + 1) <= now}
+            for future in done | expired:
+                remaining.discard(future)
+                key, name = futures[future]
+                results, errors = outcomes[key]
+                if future in expired:
+                    # The worker stays busy until the call returns, but the batch moves on
+                    future.cancel()
+                    errors[name] = f"timed out after {self.call_timeout:.0f}s"
+                else:
+                    try:
+                        results[name] = future.result()
+                    except Exception as e:
+                        errors[name] = str(e)
+                pending[key] -= 1
+                if pending[key] == 0:
+                    yield key, results, errors
+    
+    def _run_call(self, deadlines: Dict[Tuple[str, str], float], call_key: Tuple[str, str],
+                  call: Callable[[], Any]):
+        # The deadline starts when the call does, not when it was queued
+        deadlines[call_key] = deadline = time.monotonic() + self.call_timeout
+        return run_with_deadline(deadline, call)
+    
+    def shutdown(self, wait: bool = False):
+        """Stop accepting work and release the worker threads"""
+        self._pool.shutdown(wait=wait, cancel_futures=True)
+
+class BatchJob:
+    """Progress and results of one batch, for polling
+    
+    Once added to a BatchJobStore, every change is written through to it,
+    so any process sharing the store can report on the batch.
+    """
+    
+    def __init__(self, topics: List[str], user_id: str = "default"):
+        self.job_id = uuid.uuid4().hex
+        self.user_id = user_id
+        self.topics = topics
+        self.status = "queued"
+        self.results: Dict[str, Dict] = {}
+        self.failed_topics: List[str] = []
+        self.error: Optional[str] = None
+        self.created_at = datetime.now().isoformat()
+        self.finished_at: Optional[str] = None
+        self.store: Optional["BatchJobStore"] = None
+    
+    def start(self):
+        self.status = "running"
+        if self.store is not None:
+            self.store.save(self)
+    
+    def record(self, topic: str, session_data: Dict):
+        self.results[topic] = session_data
+        if session_data.get("errors"):
+            self.failed_topics.append(topic)
+        if self.store is not None:
+            self.store.save_result(self, topic, session_data)
+    
+    def finish(self, error: Optional[str] = None):
+        self.status = "failed" if error else "done"
+        self.error = error
+        self.finished_at = datetime.now().isoformat()
+        if self.store is not None:
+            self.store.save(self)
+    
+    def to_dict(self, include_results: bool = True) -> Dict:
+        data = {
+            "job_id": self.job_id,
+            "status": self.status,
+            "total": len(self.topics),
+            "completed": len(self.results),
+            "topics_with_errors": list(self.failed_topics),
+            "created_at": self.created_at,
+            "finished_at": self.finished_at,
+        }
+        if self.error:
+            data["error"] = self.error
+        if include_results:
+            data["results"] = dict(self.results)
+        return data
+
+BATCH_SCHEMA = """
+CREATE TABLE IF NOT EXISTS batches (
+    id TEXT PRIMARY KEY,
+    user_id TEXT NOT NULL,
+    status TEXT NOT NULL,
+    topics TEXT NOT NULL,
+    error TEXT,
+    created_at TEXT NOT NULL,
+    finished_at TEXT,
+    updated_at REAL NOT NULL,
+    lease_until REAL
+);
+CREATE TABLE IF NOT EXISTS batch_results (
+    batch_id TEXT NOT NULL,
+    topic TEXT NOT NULL,
+    session_data TEXT NOT NULL,
+    failed INTEGER NOT NULL,
+    PRIMARY KEY (batch_id, topic)
+);
+"""
+
+class BatchJobStore:
+    """Recent batch jobs in SQLite, shared by every process using the file
+    
+    A batch runs in the process that accepted it, but its progress and
+    results are stored as they arrive, so a status poll answered by any
+    worker process sees them, and finished batches survive a restart.
+    While a batch runs, its process renews a lease on it; a running batch
+    whose lease has lapsed is reported as failed with ``worker_lost``.
+    Finished (or lost) jobs are dropped after ``ttl`` seconds, and the
+    oldest of them go once more than ``max_jobs`` are held; a job that may
+    still be running is never dropped.
+    
+    Nothing is opened until a job is first added or looked up, and
+    ``filename`` defaults to Config.JOB_QUEUE_DB_FILE as it is then.
+    """
+    
+    def __init__(self, filename: Optional[str] = None, max_jobs: int = Config.BATCH_MAX_JOBS,
+                 ttl: float = Config.BATCH_JOB_TTL_SECONDS, lease_seconds: float = Config.JOB_LEASE_SECONDS):
+        self.filename = filename
+        self.max_jobs = max_jobs
+        self.ttl = ttl
+        self.lease_seconds = lease_seconds
+        self._local = threading.local()
+        self._running = set()
+        self._heartbeat: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._schema_ready = False
+    
+    @property
+    def _conn(self) -> sqlite3.Connection:
+        """One connection per thread, and per process: connections are
+        neither thread-safe nor safe to use across a fork"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            with self._lock:
+                if self.filename is None:
+                    self.filename = Config.JOB_QUEUE_DB_FILE
+                os.makedirs(os.path.dirname(self.filename) or ".", exist_ok=True)
+            conn = sqlite3.connect(self.filename, timeout=30, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            if not self._schema_ready:
+                conn.executescript(BATCH_SCHEMA)
+                self._schema_ready = True
+            self._local.conn, self._local.pid = conn, os.getpid()
+        return conn
+    
+    def add(self, job: BatchJob):
+        job.store = self
+        self._prune()
+        self._conn.execute(
+            "INSERT INTO batches (id, user_id, status, topics, created_at, updated_at, lease_until) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (job.job_id, job.user_id, job.status, json.dumps(job.topics), job.created_at, time.time(),
+             time.time() + self.lease_seconds))
+        with self._lock:
+            self._running.add(job.job_id)
+            if self._heartbeat is None:
+                self._heartbeat = threading.Thread(target=self._renew_leases, name="batch-heartbeat", daemon=True)
+                self._heartbeat.start()
+        excess = self._conn.execute("SELECT COUNT(*) FROM batches").fetchone()[0] - self.max_jobs
+        if excess > 0:
+            self._delete([row["id"] for row in self._conn.execute(
+                "SELECT id FROM batches WHERE finished_at IS NOT NULL OR lease_until < ? ORDER BY rowid LIMIT ?",
+                (time.time(), excess))])
+    
+    def save(self, job: BatchJob):
+        """Write a job's status through to the store"""
+        finished = job.status in ("done", "failed")
+        self._conn.execute(
+            "UPDATE batches SET status = ?, error = ?, finished_at = ?, updated_at = ?, lease_until = ? "
+            "WHERE id = ?",
+            (job.status, job.error, job.finished_at, time.time(),
+             None if finished else time.time() + self.lease_seconds, job.job_id))
+        if finished:
+            with self._lock:
+                self._running.discard(job.job_id)
+    
+    def save_result(self, job: BatchJob, topic: str, session_data: Dict):
+        self._conn.execute(
+            "INSERT OR REPLACE INTO batch_results (batch_id, topic, session_data, failed) VALUES (?, ?, ?, ?)",
+            (job.job_id, topic, json.dumps(session_data), int(bool(session_data.get("errors")))))
+        self._conn.execute("UPDATE batches SET updated_at = ?, lease_until = ? WHERE id = ?",
+                           (time.time(), time.time() + self.lease_seconds, job.job_id))
+    
+    def get(self, job_id: str) -> Optional[BatchJob]:
+        self._prune()
+        row = self._conn.execute("SELECT * FROM batches WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        job = BatchJob(json.loads(row["topics"]), row["user_id"])
+        job.job_id = row["id"]
+        job.status, job.error = row["status"], row["error"]
+        job.created_at, job.finished_at = row["created_at"], row["finished_at"]
+        for result in self._conn.execute(
+                "SELECT topic, session_data, failed FROM batch_results WHERE batch_id = ? ORDER BY rowid",
+                (job_id,)):
+            job.results[result["topic"]] = json.loads(result["session_data"])
+            if result["failed"]:
+                job.failed_topics.append(result["topic"])
+        if job.status not in ("done", "failed") and row["lease_until"] < time.time():
+            # The process running it stopped renewing the lease
+            job.status, job.error = "failed", "worker_lost"
+        return job
+    
+    def _renew_leases(self):
+        while True:
+            time.sleep(self.lease_seconds / 3)
+            with self._lock:
+                running = list(self._running)
+            for job_id in running:
+                self._conn.execute("UPDATE batches SET lease_until = ? WHERE id = ?",
+                                   (time.time() + self.lease_seconds, job_id))
+    
+    def _prune(self):
+        self._delete([row["id"] for row in self._conn.execute(
+            "SELECT id FROM batches WHERE (finished_at IS NOT NULL OR lease_until < ?) AND updated_at < ?",
+            (time.time(), time.time() - self.ttl))])
+    
+    def _delete(self, job_ids: List[str]):
+        for job_id in job_ids:
+            self._conn.execute("DELETE FROM batch_results WHERE batch_id = ?", (job_id,))
+            self._conn.execute("DELETE FROM batches WHERE id = ?", (job_id,))
@@ -0,0 +1,135 @@
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+from agents.rate_limiter import RateLimiter, background_priority, get_shared_rate_limiter
+from config import Config
+from memory.topic_index import profile_key
+from .batch import normalize_topic
+from .metrics import CACHE_WARMER_SESSIONS
+
+class WarmStore:
+    """Complete sessions generated ahead of time, by topic and kind of learner
+    
+    Entries hold the sections of a session that succeeded in full, so a
+    request for a warm topic is answered without any model call. They
+    expire with the completion cache they were generated from.
+    """
+    
+    def __init__(self, ttl: float = Config.CACHE_TTL_SECONDS):
+        self.ttl = ttl
+        self._entries: Dict[Tuple, Tuple[Dict, float]] = {}
+        self._lock = threading.Lock()
+    
+    @staticmethod
+    def key(topic: str, profile: Optional[Dict]) -> Tuple:
+        return (normalize_topic(topic), profile_key(profile))
+    
+    def get(self, topic: str, profile: Optional[Dict]) -> Optional[Dict]:
+        """The warm sections for a topic and learner, or None"""
+        with self._lock:
+            entry = self._entries.get(self.key(topic, profile))
+        if entry is None or time.monotonic() - entry[1] > self.ttl:
+            return None
+        return dict(entry[0])
+    
+    def put(self, topic: str, profile: Optional[Dict], sections: Dict):
+        with self._lock:
+            self._entries[self.key(topic, profile)] = (dict(sections), time.monotonic())
+    
+    def age(self, topic: str, profile: Optional[Dict]) -> Optional[float]:
+        """Seconds since the topic was last warmed, or None if it never was"""
+        with self._lock:
+            entry = self._entries.get(self.key(topic, profile))
+        return None if entry is None else time.monotonic() - entry[1]
+    
+    def __len__(self) -> int:
+        return len(self._entries)
+
+class CacheWarmer:
+    """Keeps the warm store filled in a background thread
+    
+    Every ``interval`` seconds the topics returned by ``targets`` (topic
+    and profile pairs) that are missing from the store, or older than
+    ``refresh_after``, are generated with ``generate``, which returns a
+    session's sections or None if any of them failed. Sessions are only
+    started while the rate limiter has spare capacity, and their calls run
+    under ``background_priority``, so live requests are never kept waiting
+    by the warmer; whatever does not fit is picked up on a later pass.
+    """
+    
+    def __init__(self, generate: Callable[[str, Dict], Optional[Dict]],
+                 targets: Callable[[], List[Tuple[str, Dict]]], store: WarmStore,
+                 rate_limiter: Optional[RateLimiter] = None, interval: float = Config.CACHE_WARM_INTERVAL,
+                 refresh_after: float = Config.CACHE_WARM_REFRESH_SECONDS):
+        self.generate = generate
+        self.targets = targets
+        self.store = store
+        self.rate_limiter = rate_limiter
+        self.interval = interval
+        self.refresh_after = refresh_after
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+    
+    def start(self):
+        """Start the background thread, once"""
+        with self._lock:
+            if self._thread is None:
+                self._stop.clear()
+                self._thread = threading.Thread(target=self._run, name="cache-warmer", daemon=True)
+                self._thread.start()
+    
+    def stop(self):
+        self._stop.set()
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            thread.join(timeout=self.interval)
+    
+    def due(self) -> List[Tuple[str, Dict]]:
+        """Targets that are not warm, or not fresh enough, missing ones first"""
+        due, seen = [], set()
+        for topic, profile in self.targets():
+            key = self.store.key(topic, profile)
+            if key in seen:
+                continue
+            seen.add(key)
+            age = self.store.age(topic, profile)
+            if age is None or age >= self.refresh_after:
+                due.append((age is not None, topic, profile))
+        return [(topic, profile) for _, topic, profile in sorted(due, key=lambda item: item[0])]
+    
+    def _idle(self) -> bool:
+        """Whether a background call would be admitted right now"""
+        limiter = self.rate_limiter or get_shared_rate_limiter()
+        with background_priority():
+            return limiter.time_until_available() == 0.0
+    
+    def warm_once(self) -> int:
+        """Generate the due topics while there is spare quota; returns how many were warmed"""
+        warmed = 0
+        for topic, profile in self.due():
+            if self._stop.is_set() or not self._idle():
+                break
+            try:
+                with background_priority():
+                    sections = self.generate(topic, profile)
+            except Exception as e:
+                print(f"Warning: Could not warm '{topic}': {e}")
+                sections = None
+            if sections is None:
+                CACHE_WARMER_SESSIONS.inc(result="failed")
+                continue
+            self.store.put(topic, profile, sections)
+            CACHE_WARMER_SESSIONS.inc(result="warmed")
+            warmed += 1
+        return warmed
+    
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.warm_once()
+            except Exception as e:
+                print(f"Warning: Cache warming pass failed: {e}")
+            self._stop.wait(self.interval)
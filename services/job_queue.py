@@ -0,0 +1,200 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Dict, Optional
+
+from config import Config
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+PRIORITIES = {"high": 10, "normal": 0, "low": -10}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    user_id TEXT NOT NULL,
+    priority INTEGER NOT NULL,
+    status TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    result TEXT,
+    error TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    worker TEXT,
+    lease_until REAL,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_claim ON jobs(status, priority DESC, created_at);
+CREATE INDEX IF NOT EXISTS idx_jobs_user_status ON jobs(user_id, status);
+"""
+
+class JobQueue:
+    """Durable queue of learning-session jobs in SQLite
+    
+    Web processes ``enqueue`` and poll ``get``; worker processes ``claim``
+    the highest-priority queued job and report back with ``complete`` or
+    ``fail``. A claim is a lease: a job whose worker died mid-run becomes
+    claimable again once ``lease_seconds`` pass, so queued and interrupted
+    jobs both survive restarts. ``max_per_user`` caps how many of one
+    user's jobs run at once, so one large submission cannot starve others.
+    """
+    
+    def __init__(self, filename: str = Config.JOB_QUEUE_DB_FILE,
+                 lease_seconds: float = Config.JOB_LEASE_SECONDS,
+                 max_attempts: int = Config.JOB_MAX_ATTEMPTS,
+                 max_per_user: int = Config.JOB_MAX_RUNNING_PER_USER):
+        self.filename = filename
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.max_per_user = max_per_user
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(filename) or ".", exist_ok=True)
+        self._conn.executescript(SCHEMA)
+    
+    @property
+    def _conn(self) -> sqlite3.Connection:
+        """One connection per thread, and per process: connections are
+        neither thread-safe nor safe to use across a fork"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.filename, timeout=30, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn, self._local.pid = conn, os.getpid()
+        return conn
+    
+    def enqueue(self, kind: str, payload: Dict, user_id: str = "default", priority: int = 0) -> str:
+        """Add a job and return its id"""
+        job_id = uuid.uuid4().hex
+        self._conn.execute(
+            "INSERT INTO jobs (id, kind, user_id, priority, status, payload, created_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (job_id, kind, user_id, priority, QUEUED, json.dumps(payload), time.time()))
+        return job_id
+    
+    def claim(self, worker: str) -> Optional[Dict]:
+        """Lease the next runnable job to ``worker``, or return None"""
+        now = time.time()
+        conn = self._conn
+        # BEGIN IMMEDIATE takes the write lock up front, so two workers
+        # cannot pick the same job
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            # Jobs whose worker stopped renewing the lease go back to the queue
+            conn.execute(
+                "UPDATE jobs SET status = CASE WHEN attempts >= ? THEN ? ELSE ? END, "
+                "error = CASE WHEN attempts >= ? THEN 'worker_lost' ELSE error END, "
+                "finished_at = CASE WHEN attempts >= ? THEN ? ELSE finished_at END "
+                "WHERE status = ? AND lease_until < ?",
+                (self.max_attempts, FAILED, QUEUED, self.max_attempts, self.max_attempts, now,
+                 RUNNING, now))
+            row = conn.execute(
+                "SELECT * FROM jobs WHERE status = ? AND user_id NOT IN ("
+                "    SELECT user_id FROM jobs WHERE status = ? GROUP BY user_id HAVING COUNT(*) >= ?"
+                ") ORDER BY priority DESC, created_at LIMIT 1",
+                (QUEUED, RUNNING, self.max_per_user)).fetchone()
+            if row is not None:
+                conn.execute(
+                    "UPDATE jobs SET status = ?, worker = ?, attempts = attempts + 1, lease_until = ?, "
+                    "started_at = ? WHERE id = ?",
+                    (RUNNING, worker, now + self.lease_seconds, now, row["id"]))
+                row = conn.execute("SELECT * FROM jobs WHERE id = ?", (row["id"],)).fetchone()
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return None if row is None else self._job_from_row(row)
+    
+    def renew(self, job_id: str, worker: str) -> bool:
+        """Extend a running job's lease; False if the worker no longer holds it"""
+        cursor = self._conn.execute(
+            "UPDATE jobs SET lease_until = ? WHERE id = ? AND worker = ? AND status = ?",
+            (time.time() + self.lease_seconds, job_id, worker, RUNNING))
+        return cursor.rowcount == 1
+    
+    def complete(self, job_id: str, result: Dict, worker: Optional[str] = None) -> bool:
+        return self._finish(job_id, DONE, worker, result=json.dumps(result))
+    
+    def fail(self, job_id: str, error: str, worker: Optional[str] = None) -> bool:
+        return self._finish(job_id, FAILED, worker, error=error)
+    
+    def _finish(self, job_id: str, status: str, worker: Optional[str] = None,
+                result: Optional[str] = None, error: Optional[str] = None) -> bool:
+        """Record a job's outcome; False if ``worker`` no longer holds its lease
+        
+        A worker whose lease ran out may finish after another worker has
+        re-claimed the job, and must not overwrite that worker's outcome.
+        """
+        if worker is None:
+            cursor = self._conn.execute(
+                "UPDATE jobs SET status = ?, result = ?, error = ?, lease_until = NULL, finished_at = ? "
+                "WHERE id = ?", (status, result, error, time.time(), job_id))
+        else:
+            cursor = self._conn.execute(
+                "UPDATE jobs SET status = ?, result = ?, error = ?, lease_until = NULL, finished_at = ? "
+                "WHERE id = ? AND worker = ? AND status = ?",
+                (status, result, error, time.time(), job_id, worker, RUNNING))
+        return cursor.rowcount == 1
+    
+    def get(self, job_id: str) -> Optional[Dict]:
+        row = self._conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return None if row is None else self._job_from_row(row)
+    
+    def position(self, job_id: str) -> Optional[int]:
+        """How many queued jobs run before this one; None unless it is queued"""
+        job = self._conn.execute("SELECT status, priority, created_at FROM jobs WHERE id = ?",
+                                 (job_id,)).fetchone()
+        if job is None or job["status"] != QUEUED:
+            return None
+        return self._conn.execute(
+            "SELECT COUNT(*) FROM jobs WHERE status = ? AND "
+            "(priority > ? OR (priority = ? AND created_at < ?))",
+            (QUEUED, job["priority"], job["priority"], job["created_at"])).fetchone()[0]
+    
+    def counts(self) -> Dict[str, int]:
+        """Number of jobs in each status"""
+        return {row["status"]: row["n"] for row in
+                self._conn.execute("SELECT status, COUNT(*) AS n FROM jobs GROUP BY status")}
+    
+    def prune(self, older_than: float = Config.JOB_RETENTION_SECONDS) -> int:
+        """Delete finished jobs older than ``older_than`` seconds"""
+        cursor = self._conn.execute("DELETE FROM jobs WHERE status IN (?, ?) AND finished_at < ?",
+                                    (DONE, FAILED, time.time() - older_than))
+        return cursor.rowcount
+    
+    @staticmethod
+    def _job_from_row(row: sqlite3.Row) -> Dict:
+        return {
+            "job_id": row["id"],
+            "kind": row["kind"],
+            "user_id": row["user_id"],
+            "priority": row["priority"],
+            "status": row["status"],
+            "payload": json.loads(row["payload"]),
+            "result": json.loads(row["result"]) if row["result"] else None,
+            "error": row["error"],
+            "attempts": row["attempts"],
+            "created_at": row["created_at"],
+            "started_at": row["started_at"],
+            "finished_at": row["finished_at"],
+        }
+
+_queue: Optional[JobQueue] = None
+_queue_lock = threading.Lock()
+
+def get_job_queue() -> JobQueue:
+    """Return the process-wide job queue"""
+    global _queue
+    with _queue_lock:
+        if _queue is None:
+            _queue = JobQueue()
+        return _queue
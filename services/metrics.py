@@ -0,0 +1,240 @@
+import bisect
+import json
+import logging
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional, Tuple
+
+from config import Config
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+def _label_key(labels: Dict[str, str]) -> Tuple:
+    return tuple(sorted(labels.items()))
+
+def _format_labels(key: Tuple, extra: Tuple = ()) -> str:
+    pairs = key + extra
+    if not pairs:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace('"', '\\"') for _, value in pairs)
+    return "{" + ",".join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + "}"
+
+def _format_value(value: float) -> str:
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+class Counter:
+    """A value that only goes up, one series per label set"""
+    
+    kind = "counter"
+    
+    def __init__(self, name: str, documentation: str):
+        self.name = name
+        self.documentation = documentation
+        self._values: Dict[Tuple, float] = {}
+        self._lock = threading.Lock()
+    
+    def inc(self, amount: float = 1, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+    
+    def value(self, **labels) -> float:
+        return self._values.get(_label_key(labels), 0)
+    
+    def samples(self) -> List[str]:
+        with self._lock:
+            return [f"{self.name}{_format_labels(key)} {_format_value(value)}"
+                    for key, value in sorted(self._values.items())]
+
+class Gauge(Counter):
+    """A value that can go up and down; ``fn`` computes it at scrape time"""
+    
+    kind = "gauge"
+    
+    def __init__(self, name: str, documentation: str, fn: Optional[Callable[[], float]] = None):
+        super().__init__(name, documentation)
+        self.fn = fn
+    
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._values[_label_key(labels)] = value
+    
+    def samples(self) -> List[str]:
+        if self.fn is not None:
+            return [f"{self.name} {_format_value(self.fn())}"]
+        return super().samples()
+
+class Histogram:
+    """Observations counted into cumulative buckets, one series per label set"""
+    
+    kind = "histogram"
+    
+    def __init__(self, name: str, documentation: str, buckets: Tuple = LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.buckets = tuple(buckets)
+        self._series: Dict[Tuple, list] = {}
+        self._lock = threading.Lock()
+    
+    def observe(self, value: float, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                # Per-bucket counts (the last one is +Inf), then sum and count
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][bisect.bisect_left(self.buckets, value)] += 1
+            series[1] += value
+            series[2] += 1
+    
+    @contextmanager
+    def time(self, **labels):
+        """Observe how long the block takes, in seconds"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+    
+    def count(self, **labels) -> int:
+        series = self._series.get(_label_key(labels))
+        return series[2] if series else 0
+    
+    def samples(self) -> List[str]:
+        lines = []
+        with self._lock:
+            for key, (counts, total, count) in sorted(self._series.items()):
+                cumulative = 0
+                for bound, bucket_count in zip(self.buckets + ("+Inf",), counts):
+                    cumulative += bucket_count
+                    le = bound if bound == "+Inf" else _format_value(bound)
+                    lines.append(f"{self.name}_bucket{_format_labels(key, (('le', le),))} {cumulative}")
+                lines.append(f"{self.name}_sum{_format_labels(key)} {_format_value(total)}")
+                lines.append(f"{self.name}_count{_format_labels(key)} {count}")
+        return lines
+
+class MetricsRegistry:
+    """Holds every metric and renders them in the Prometheus text format"""
+    
+    def __init__(self):
+        self._metrics: Dict[str, object] = {}
+        self._lock = threading.Lock()
+    
+    def _register(self, metric):
+        with self._lock:
+            return self._metrics.setdefault(metric.name, metric)
+    
+    def counter(self, name: str, documentation: str) -> Counter:
+        return self._register(Counter(name, documentation))
+    
+    def gauge(self, name: str, documentation: str, fn: Optional[Callable[[], float]] = None) -> Gauge:
+        return self._register(Gauge(name, documentation, fn))
+    
+    def histogram(self, name: str, documentation: str, buckets: Tuple = LATENCY_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, documentation, buckets))
+    
+    def render(self) -> str:
+        lines = []
+        for metric in list(self._metrics.values()):
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+REGISTRY = MetricsRegistry()
+
+AGENT_CALL_SECONDS = REGISTRY.histogram(
+    "agent_call_seconds", "Model call latency per agent, excluding rate-limiter waits")
+AGENT_RETRIES = REGISTRY.counter("agent_retries_total", "Model calls retried after a failure")
+AGENT_BACKOFF_SECONDS = REGISTRY.counter("agent_backoff_seconds_total", "Time spent backing off between retries")
+AGENT_FAILURES = REGISTRY.counter("agent_failures_total", "Agent calls that failed after every retry, by error class")
+AGENT_CACHE_FALLBACKS = REGISTRY.counter(
+    "agent_cache_fallbacks_total", "Failed agent calls answered from a cached (possibly stale) completion")
+AGENT_COALESCED = REGISTRY.counter(
+    "agent_calls_coalesced_total", "Agent calls answered by an identical model call already in flight")
+RATE_LIMITER_WAIT_SECONDS = REGISTRY.histogram(
+    "rate_limiter_wait_seconds", "Time spent waiting for the rate limiter per acquire")
+CACHE_REQUESTS = REGISTRY.counter("completion_cache_requests_total", "Completion cache lookups by result")
+REGISTRY.gauge(
+    "completion_cache_hit_ratio", "Share of completion cache lookups that were hits",
+    lambda: CACHE_REQUESTS.value(result="hit") / max(1, CACHE_REQUESTS.value(result="hit")
+                                                     + CACHE_REQUESTS.value(result="miss")))
+MEMORY_SAVE_SECONDS = REGISTRY.histogram("memory_save_seconds", "Duration of memory snapshot writes")
+MEMORY_SNAPSHOT_BYTES = REGISTRY.gauge("memory_snapshot_bytes", "Size of the most recently written memory snapshot")
+MEMORY_JOURNAL_BYTES = REGISTRY.gauge("memory_journal_bytes", "Size of the most recently appended memory journal")
+SESSION_REUSES = REGISTRY.counter(
+    "learning_session_reuse_total",
+    "Sessions answered wholly (served) or partly (seeded) from an earlier session on a similar topic")
+SESSION_COALESCED = REGISTRY.counter(
+    "learning_session_coalesced_total", "Sessions that joined an identical session already being generated")
+SESSION_WARM_HITS = REGISTRY.counter(
+    "learning_session_warm_hits_total", "Sessions served from the warm store of pre-generated sessions")
+CACHE_WARMER_SESSIONS = REGISTRY.counter(
+    "cache_warmer_sessions_total", "Sessions generated in the background for the warm store, by result")
+PREFETCHES = REGISTRY.counter(
+    "prefetch_requests_total", "Speculative subtopic explanations by result (fetched, failed, cancelled, dropped)")
+SESSION_STAGE_SECONDS = REGISTRY.histogram(
+    "learning_session_stage_seconds", "Duration of each learning-session stage, and of the whole session")
+
+timing_logger = logging.getLogger("learning_companion.timing")
+if not timing_logger.handlers:
+    _handler = logging.StreamHandler()
+    _handler.setFormatter(logging.Formatter("%(message)s"))
+    timing_logger.addHandler(_handler)
+    timing_logger.setLevel(logging.INFO)
+    timing_logger.propagate = False
+
+class SessionTimer:
+    """Times the stages of one learning session
+    
+    Stage durations feed ``learning_session_stage_seconds``; with
+    Config.SESSION_TIMING_LOG enabled, ``finish`` also logs one JSON line
+    per session so a slow session can be traced by its id.
+    """
+    
+    def __init__(self, session_id: Optional[str] = None):
+        self.session_id = session_id or uuid.uuid4().hex[:12]
+        self.stages: Dict[str, float] = {}
+        self._started = time.perf_counter()
+    
+    @contextmanager
+    def stage(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages[name] = time.perf_counter() - start
+    
+    def wrap(self, calls: Dict[str, Callable]) -> Dict[str, Callable]:
+        """Time each of a session's calls as its own stage"""
+        def timed(name, call):
+            def run(*args, **kwargs):
+                with self.stage(name):
+                    return call(*args, **kwargs)
+            return run
+        return {name: timed(name, call) for name, call in calls.items()}
+    
+    def awrap(self, calls: Dict[str, Callable]) -> Dict[str, Callable]:
+        """Like wrap, for coroutine functions"""
+        def timed(name, call):
+            async def run(*args, **kwargs):
+                with self.stage(name):
+                    return await call(*args, **kwargs)
+            return run
+        return {name: timed(name, call) for name, call in calls.items()}
+    
+    def finish(self, **fields):
+        """Record the session's stages and total time"""
+        self.stages["total"] = time.perf_counter() - self._started
+        for name, seconds in self.stages.items():
+            SESSION_STAGE_SECONDS.observe(seconds, stage=name)
+        
+        if Config.SESSION_TIMING_LOG:
+            timing_logger.info(json.dumps({
+                "event": "learning_session_timing",
+                "session_id": self.session_id,
+                **fields,
+                "stages_ms": {name: round(seconds * 1000, 1) for name, seconds in self.stages.items()},
+            }))
@@ -0,0 +1,84 @@
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Dict, Hashable, Optional
+
+from agents.cache import cache_ttl
+from agents.rate_limiter import RateLimiter, background_priority, get_shared_rate_limiter
+from agents.retry import deadline_at
+from config import Config
+from .metrics import PREFETCHES
+
+class Prefetcher:
+    """Runs speculative calls in a small background pool
+    
+    ``fetch`` is expected to leave its answer in the completion cache and
+    return whether it succeeded; it runs under ``background_priority`` and
+    caches what it generates for ``ttl`` seconds. A prefetch only starts
+    while the rate limiter has spare capacity; once live requests have
+    used it up, every prefetch still queued is cancelled instead of
+    competing with them. At most ``max_pending`` prefetches are queued.
+    """
+    
+    def __init__(self, fetch: Callable[..., bool], max_workers: int = Config.PREFETCH_WORKERS,
+                 max_pending: int = Config.PREFETCH_MAX_PENDING, rate_limiter: Optional[RateLimiter] = None,
+                 timeout: float = Config.PREFETCH_TIMEOUT, ttl: float = Config.PREFETCH_TTL_SECONDS):
+        self.fetch = fetch
+        self.max_pending = max_pending
+        self.rate_limiter = rate_limiter
+        self.timeout = timeout
+        self.ttl = ttl
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="prefetch")
+        self._pending: Dict[Hashable, Future] = {}
+        self._lock = threading.Lock()
+    
+    def submit(self, key: Hashable, *args) -> bool:
+        """Queue ``fetch(*args)`` unless the same key is already queued or the queue is full"""
+        with self._lock:
+            if key in self._pending:
+                return False
+            if len(self._pending) >= self.max_pending:
+                PREFETCHES.inc(result="dropped")
+                return False
+            self._pending[key] = self._pool.submit(self._run, key, args)
+            return True
+    
+    def pending(self) -> int:
+        with self._lock:
+            return len(self._pending)
+    
+    def cancel_pending(self) -> int:
+        """Cancel every prefetch that has not started yet; returns how many were cancelled"""
+        with self._lock:
+            cancelled = [key for key, future in self._pending.items() if future.cancel()]
+            for key in cancelled:
+                del self._pending[key]
+        if cancelled:
+            PREFETCHES.inc(len(cancelled), result="cancelled")
+        return len(cancelled)
+    
+    def _idle(self) -> bool:
+        """Whether a background call would be admitted right now"""
+        limiter = self.rate_limiter or get_shared_rate_limiter()
+        with background_priority():
+            return limiter.time_until_available() == 0.0
+    
+    def _run(self, key: Hashable, args: tuple):
+        try:
+            if not self._idle():
+                PREFETCHES.inc(result="cancelled")
+                self.cancel_pending()
+                return
+            with background_priority(), cache_ttl(self.ttl), deadline_at(time.monotonic() + self.timeout):
+                ok = self.fetch(*args)
+            PREFETCHES.inc(result="fetched" if ok else "failed")
+        except Exception as e:
+            print(f"Warning: Prefetch failed: {e}")
+            PREFETCHES.inc(result="failed")
+        finally:
+            with self._lock:
+                self._pending.pop(key, None)
+    
+    def shutdown(self, wait: bool = False):
+        self.cancel_pending()
+        self._pool.shutdown(wait=wait)
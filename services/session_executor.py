@@ -0,0 +1,192 @@
+import asyncio
+import contextvars
+import queue
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Iterator, Optional, Tuple
+
+from agents.retry import deadline_at, run_with_deadline
+from config import Config
+
+class SessionExecutor:
+    """Runs the independent calls of a learning session concurrently
+    
+    Each session fans out over a pool of its own, at most ``max_workers``
+    threads wide, so concurrent sessions never queue behind each other's
+    calls. A call's timeout starts when a worker picks it up.
+    """
+    
+    # How often a gatherer checks whether a queued call has been picked up
+    QUEUE_POLL_SECONDS = 0.05
+    
+    def __init__(self, max_workers: int = Config.SESSION_MAX_WORKERS,
+                 call_timeout: float = Config.SESSION_CALL_TIMEOUT):
+        self.max_workers = max_workers
+        self.call_timeout = call_timeout
+    
+    def run(self, calls: Dict[str, Callable[[], Any]],
+            timeout: Optional[float] = None) -> Tuple[Dict[str, Any], Dict[str, str]]:
+        """Fan out named calls and gather them.
+        
+        Returns ``(results, errors)``: every call that finished in time is in
+        ``results``; every call that raised or timed out is in ``errors``
+        with a short description, so callers can still use partial results.
+        """
+        timeout = self.call_timeout if timeout is None else timeout
+        pool = self._session_pool(len(calls))
+        deadlines = {}
+        futures = {name: self._submit(pool, timeout, deadlines, name, call) for name, call in calls.items()}
+        
+        results, errors = {}, {}
+        try:
+            for name, future in futures.items():
+                try:
+                    results[name] = self._result(future, deadlines, name)
+                except FutureTimeoutError:
+                    future.cancel()
+                    errors[name] = f"timed out after {timeout:.0f}s"
+                except Exception as e:
+                    errors[name] = str(e)
+        finally:
+            pool.shutdown(wait=False, cancel_futures=True)
+        
+        return results, errors
+    
+    def stream(self, calls: Dict[str, Callable[[Callable[[str], None]], Any]],
+               timeout: Optional[float] = None) -> Iterator[Tuple[str, str, Any]]:
+        """Fan out named calls and yield events as soon as they happen.
+        
+        Each call receives an ``on_chunk(text)`` callback for partial output.
+        Yields ``("delta", name, text)`` for partial output, then exactly one
+        ``("section", name, result)`` or ``("error", name, message)`` per call.
+        """
+        timeout = self.call_timeout if timeout is None else timeout
+        events = queue.Queue()
+        
+        def execute(name, call):
+            try:
+                result = call(lambda text: events.put(("delta", name, text)))
+                events.put(("section", name, result))
+            except Exception as e:
+                events.put(("error", name, str(e)))
+        
+        pool = self._session_pool(len(calls))
+        deadlines = {}
+        futures = {name: self._submit(pool, timeout, deadlines, name, execute, name, call)
+                   for name, call in calls.items()}
+        pending = set(calls)
+        
+        try:
+            while pending:
+                now = time.monotonic()
+                for name in sorted(name for name in pending if deadlines.get(name, now + 1) <= now):
+                    futures[name].cancel()
+                    pending.discard(name)
+                    yield "error", name, f"timed out after {timeout:.0f}s"
+                if not pending:
+                    return
+                waits = [deadlines[name] - now if name in deadlines else self.QUEUE_POLL_SECONDS
+                         for name in pending]
+                try:
+                    kind, name, payload = events.get(timeout=max(0.0, min(waits)))
+                except queue.Empty:
+                    continue
+                if name not in pending:
+                    # Output of a call already reported as timed out
+                    continue
+                if kind != "delta":
+                    pending.discard(name)
+                yield kind, name, payload
+        finally:
+            pool.shutdown(wait=False, cancel_futures=True)
+    
+    async def arun(self, calls: Dict[str, Callable[[], Awaitable[Any]]],
+                   timeout: Optional[float] = None) -> Tuple[Dict[str, Any], Dict[str, str]]:
+        """Async variant of run: awaits coroutine functions on the event loop
+        instead of occupying pool threads"""
+        timeout = self.call_timeout if timeout is None else timeout
+        names = list(calls)
+        with deadline_at(time.monotonic() + timeout):
+            outcomes = await asyncio.gather(
+                *(asyncio.wait_for(calls[name](), timeout) for name in names),
+                return_exceptions=True
+            )
+        
+        results, errors = {}, {}
+        for name, outcome in zip(names, outcomes):
+            if isinstance(outcome, asyncio.TimeoutError):
+                errors[name] = f"timed out after {timeout:.0f}s"
+            elif isinstance(outcome, BaseException):
+                errors[name] = str(outcome)
+            else:
+                results[name] = outcome
+        return results, errors
+    
+    async def astream(self, calls: Dict[str, Callable[[Callable[[str], None]], Awaitable[Any]]],
+                      timeout: Optional[float] = None) -> AsyncIterator[Tuple[str, str, Any]]:
+        """Async variant of stream, yielding the same events"""
+        timeout = self.call_timeout if timeout is None else timeout
+        events = asyncio.Queue()
+        
+        async def execute(name, call):
+            try:
+                result = await call(lambda text: events.put_nowait(("delta", name, text)))
+                events.put_nowait(("section", name, result))
+            except Exception as e:
+                events.put_nowait(("error", name, str(e)))
+        
+        deadline = time.monotonic() + timeout
+        with deadline_at(deadline):
+            # Tasks copy the current context, deadline included, when created
+            tasks = {name: asyncio.ensure_future(execute(name, call)) for name, call in calls.items()}
+        pending = set(calls)
+        
+        try:
+            while pending:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    for name in sorted(pending):
+                        yield "error", name, f"timed out after {timeout:.0f}s"
+                    return
+                try:
+                    kind, name, payload = await asyncio.wait_for(events.get(), remaining)
+                except asyncio.TimeoutError:
+                    continue
+                if kind != "delta":
+                    pending.discard(name)
+                yield kind, name, payload
+        finally:
+            for task in tasks.values():
+                task.cancel()
+    
+    def _session_pool(self, calls: int) -> ThreadPoolExecutor:
+        return ThreadPoolExecutor(max_workers=max(1, min(calls, self.max_workers)), thread_name_prefix="session")
+    
+    def _submit(self, pool: ThreadPoolExecutor, timeout: float, deadlines: Dict[str, float], name: str, fn, *args):
+        """Run ``fn`` on ``pool`` in a copy of the caller's context
+        
+        The call's deadline is set in ``deadlines[name]`` when a worker picks
+        it up, and is in effect while it runs, so agent retries stop when
+        the call would time out.
+        """
+        context = contextvars.copy_context()
+        
+        def start():
+            deadlines[name] = deadline = time.monotonic() + timeout
+            return context.run(run_with_deadline, deadline, fn, *args)
+        
+        return pool.submit(start)
+    
+    def _result(self, future: Future, deadlines: Dict[str, float], name: str):
+        """Wait for a call until its deadline, however long it was queued first"""
+        while True:
+            deadline = deadlines.get(name)
+            wait = self.QUEUE_POLL_SECONDS if deadline is None else max(0.0, deadline - time.monotonic())
+            try:
+                return future.result(timeout=wait)
+            except FutureTimeoutError:
+                if deadline is not None:
+                    raise
+    
+    def shutdown(self, wait: bool = False):
+        """Kept for interface parity; each session's pool is released when it ends"""
@@ -44,7 +44,6 @@ class LearningCompanionApp {
     initModal() {
         const modal = document.getElementById('sessionModal');
         const closeBtn = document.getElementById('modalClose');
-        const viewButtons = document.querySelectorAll('.view-session-btn');
 
         if (closeBtn) {
             closeBtn.addEventListener('click', () => {
@@ -59,13 +58,86 @@ class LearningCompanionApp {
             }
         });
 
-        // View session buttons
-        viewButtons.forEach(btn => {
-            btn.addEventListener('click', () => {
-                const sessionData = JSON.parse(btn.getAttribute('data-session'));
-                this.showSessionModal(sessionData);
+        // View session buttons; the full session is only fetched when opened
+        const sessionsList = document.getElementById('sessionsList');
+        if (sessionsList) {
+            sessionsList.addEventListener('click', (e) => {
+                const btn = e.target.closest('.view-session-btn');
+                if (btn) {
+                    this.loadSessionDetails(btn.getAttribute('data-session-id'));
+                }
             });
-        });
+        }
+
+        const loadMoreBtn = document.getElementById('loadMoreHistory');
+        if (loadMoreBtn) {
+            loadMoreBtn.addEventListener('click', () => this.loadMoreHistory(loadMoreBtn));
+        }
+    }
+
+    async loadSessionDetails(sessionId) {
+        try {
+            const response = await fetch(`/api/history/${sessionId}`);
+            const data = await response.json();
+
+            if (data.success) {
+                this.showSessionModal(data.session);
+            } else {
+                this.showAlert('Error: ' + data.error, 'error');
+            }
+        } catch (error) {
+            this.showAlert('Network error: ' + error.message, 'error');
+        }
+    }
+
+    async loadMoreHistory(button) {
+        try {
+            const response = await fetch(`/api/history?cursor=${button.getAttribute('data-cursor')}`);
+            const page = await response.json();
+            const sessionsList = document.getElementById('sessionsList');
+
+            page.sessions.forEach(session => {
+                sessionsList.insertAdjacentHTML('beforeend', this.createSessionCard(session));
+            });
+
+            if (page.next_cursor) {
+                button.setAttribute('data-cursor', page.next_cursor);
+            } else {
+                button.remove();
+            }
+        } catch (error) {
+            this.showAlert('Network error: ' + error.message, 'error');
+        }
+    }
+
+    createSessionCard(session) {
+        let scoreHTML = '';
+        if (session.score) {
+            const scoreClass = session.score >= 80 ? 'score-high' : session.score >= 60 ? 'score-medium' : 'score-low';
+            scoreHTML = `
+                <div class="session-score">
+                    <span class="score-label">Quiz Score:</span>
+                    <span class="score-value ${scoreClass}">${session.score}%</span>
+                </div>
+            `;
+        }
+
+        return `
+            <div class="session-card">
+                <div class="session-header">
+                    <h3 class="session-topic">${this.escapeHtml(session.user_input)}</h3>
+                    <span class="session-date">${session.timestamp.slice(0, 10)}</span>
+                </div>
+                <div class="session-details">
+                    ${scoreHTML}
+                    <div class="session-actions">
+                        <button class="btn btn-small btn-outline view-session-btn" data-session-id="${session.id}">
+                            View Details
+                        </button>
+                    </div>
+                </div>
+            </div>
+        `;
     }
 
     showSessionModal(sessionData) {
@@ -136,7 +208,7 @@ class LearningCompanionApp {
         this.updateProgress(0, 'Starting learning session...');
 
         try {
-            const response = await fetch('/api/learning-session', {
+            const response = await fetch('/api/learning-session/stream', {
                 method: 'POST',
                 headers: {
                     'Content-Type': 'application/json',
@@ -147,16 +219,23 @@ class LearningCompanionApp {
                 })
             });
 
-            const data = await response.json();
-
-            if (data.success) {
-                this.updateProgress(100, 'Complete!');
-                setTimeout(() => {
-                    this.displaySessionResults(data.session_data, data.topic);
-                }, 500);
-            } else {
-                this.showAlert('Error: ' + data.error, 'error');
+            if (!response.body || !(response.headers.get('Content-Type') || '').includes('ndjson')) {
+                const data = await response.json();
+                if (data.success && data.job_id) {
+                    // The server queued the session for a worker; poll until it is ready
+                    const job = await this.waitForJob(data.status_url, job => this.updateProgress(
+                        job.status === 'queued' ? 10 : 50,
+                        job.status === 'queued' ? `Queued (position ${job.position + 1})...` : 'Generating your session...'));
+                    this.updateProgress(100, 'Complete!');
+                    this.displaySessionResults(job.session_data, job.topic);
+                } else {
+                    this.showAlert('Error: ' + data.error, 'error');
+                }
+                return;
             }
+
+            this.renderStreamingSession(topic);
+            await this.readSessionStream(response.body, topic);
         } catch (error) {
             this.showAlert('Network error: ' + error.message, 'error');
         } finally {
@@ -164,6 +243,123 @@ class LearningCompanionApp {
         }
     }
 
+    async waitForJob(statusUrl, onStatus) {
+        // Poll a queued session until a worker has finished it
+        while (true) {
+            const response = await fetch(statusUrl);
+            const job = await response.json();
+            if (!job.success) {
+                throw new Error(job.error || 'Job not found');
+            }
+            if (job.status === 'done') {
+                return job;
+            }
+            if (job.status === 'failed') {
+                throw new Error(job.error || 'The session could not be generated');
+            }
+            if (onStatus) {
+                onStatus(job);
+            }
+            await new Promise(resolve => setTimeout(resolve, 1000));
+        }
+    }
+
+    async readSessionStream(body, topic) {
+        // The server sends one JSON event per line as each section completes
+        const reader = body.getReader();
+        const decoder = new TextDecoder();
+        let buffer = '';
+        let completed = 0;
+
+        while (true) {
+            const { done, value } = await reader.read();
+            if (done) break;
+
+            buffer += decoder.decode(value, { stream: true });
+            const lines = buffer.split('\n');
+            buffer = lines.pop();
+
+            for (const line of lines) {
+                if (!line.trim()) continue;
+                const event = JSON.parse(line);
+
+                if (event.event === 'delta') {
+                    this.appendSectionText(event.section, event.text);
+                } else if (event.event === 'section' || event.event === 'error') {
+                    completed += 1;
+                    this.updateSection(event.section, event.event === 'section' ? event.data : null, event.error);
+                    const total = Object.keys(this.streamingSections).length;
+                    this.updateProgress(Math.round((completed / total) * 100), `${completed} of ${total} sections ready...`);
+                } else if (event.event === 'done') {
+                    this.updateProgress(100, 'Complete!');
+                    this.displaySessionResults(event.session_data, event.topic);
+                } else if (event.event === 'failed') {
+                    this.showAlert('Error: ' + event.error, 'error');
+                }
+            }
+        }
+    }
+
+    renderStreamingSession(topic) {
+        const resultsSection = document.getElementById('resultsSection');
+        if (!resultsSection) return;
+
+        this.streamingSections = {
+            study_plan: '📝 Study Plan',
+            subtopics: '🧩 Topic Breakdown',
+            analogy: '💡 Helpful Analogy',
+            time_estimate: '⏱️ Time Estimate',
+            explanation: '🤖 Detailed Explanation',
+            quiz: '🎯 Knowledge Check'
+        };
+
+        let resultsHTML = `
+            <div class="session-header card">
+                <h2 class="card-title">
+                    <span class="card-icon">⏳</span>
+                    Building Your Session: ${this.escapeHtml(topic)}
+                </h2>
+            </div>
+        `;
+        Object.entries(this.streamingSections).forEach(([section, title]) => {
+            resultsHTML += `
+                <div class="content-box" id="section-${section}">
+                    <h3>${title}</h3>
+                    <div class="content-text loading-text">Waiting for the agent...</div>
+                </div>
+            `;
+        });
+
+        resultsSection.style.display = 'block';
+        resultsSection.innerHTML = resultsHTML;
+    }
+
+    appendSectionText(section, text) {
+        const box = document.querySelector(`#section-${section} .content-text`);
+        if (!box) return;
+
+        if (box.classList.contains('loading-text')) {
+            box.classList.remove('loading-text');
+            box.dataset.raw = '';
+        }
+        box.dataset.raw += text;
+        box.innerHTML = this.formatContent(box.dataset.raw);
+    }
+
+    updateSection(section, data, error) {
+        const box = document.querySelector(`#section-${section} .content-text`);
+        if (!box) return;
+
+        box.classList.remove('loading-text');
+        if (error) {
+            box.innerHTML = `⚠️ ${this.escapeHtml(error)}`;
+        } else if (Array.isArray(data)) {
+            box.innerHTML = '<ul>' + data.map(item => `<li>${this.escapeHtml(item)}</li>`).join('') + '</ul>';
+        } else {
+            box.innerHTML = this.formatContent(data || '');
+        }
+    }
+
     updateProgress(percent, text) {
         const progressBar = document.getElementById('progressBar');
         const progressText = document.getElementById('progressText');
@@ -238,6 +434,21 @@ class LearningCompanionApp {
             resultsHTML += this.createContentBox('🎯 Knowledge Check', sessionData.quiz);
         }
 
+        // Sections that failed or timed out
+        if (sessionData.errors) {
+            let errorsContent = '<ul>';
+            Object.keys(sessionData.errors).forEach(section => {
+                errorsContent += `<li>${this.escapeHtml(section)}: ${this.escapeHtml(this.describeError(sessionData.errors[section]))}</li>`;
+            });
+            errorsContent += '</ul>';
+            resultsHTML += `
+                <div class="content-box">
+                    <h3>⚠️ Some sections could not be generated</h3>
+                    <div class="content-text">${errorsContent}</div>
+                </div>
+            `;
+        }
+
         // Results
         if (sessionData.score !== undefined) {
             const scoreClass = sessionData.score >= 80 ? 'score-high' : 
@@ -275,6 +486,12 @@ class LearningCompanionApp {
         return this.escapeHtml(content).replace(/\n/g, '<br>');
     }
 
+    describeError(code) {
+        // Failed sections are stored as compact codes; the page gets their
+        // descriptions from the server (agents/result.py ERROR_MESSAGES)
+        return (window.ERROR_MESSAGES || {})[code] || code;
+    }
+
     escapeHtml(text) {
         const div = document.createElement('div');
         div.textContent = text;
@@ -291,7 +508,10 @@ class LearningCompanionApp {
 
         try {
             const response = await fetch('/api/quick-demo');
-            const data = await response.json();
+            let data = await response.json();
+            if (data.success && data.job_id) {
+                data = await this.waitForJob(data.status_url);
+            }
 
             if (data.success) {
                 if (demoResults) {
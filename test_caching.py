@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Test script to verify the agent completion cache
+"""
+
+import os
+import sys
+import time
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+# Add project root to Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+def test_completion_cache():
+    """Test key derivation, LRU/TTL eviction and the disk tier"""
+    print("🗄️ Testing Completion Cache...")
+    
+    try:
+        from agents.cache import CompletionCache, MemoryCacheTier, SQLiteCacheTier
+        
+        key = CompletionCache.make_key("system", "prompt", "model", {"level": "beginner"})
+        assert key == CompletionCache.make_key("system", "prompt", "model", {"level": "beginner", "name": "Ada"})
+        assert key != CompletionCache.make_key("system", "prompt", "model", {"level": "advanced"})
+        
+        memory_tier = MemoryCacheTier(max_entries=2, ttl=60)
+        memory_tier.set("a", "1")
+        memory_tier.set("b", "2")
+        memory_tier.get("a")
+        memory_tier.set("c", "3")
+        assert memory_tier.get("b") is None, "least recently used entry should be evicted"
+        memory_tier.set("d", "4", ttl=-1)
+        assert memory_tier.get("d") is None, "expired entry should not be returned"
+        
+        db_file = "data/test_completion_cache.db"
+        cache = CompletionCache(MemoryCacheTier(), SQLiteCacheTier(db_file))
+        assert cache.get(key) is None
+        cache.set(key, "cached answer")
+        
+        # A fresh process-local tier falls through to disk
+        cache = CompletionCache(MemoryCacheTier(), SQLiteCacheTier(db_file))
+        start = time.perf_counter()
+        assert cache.get(key) == "cached answer"
+        lookup_ms = (time.perf_counter() - start) * 1000
+        assert cache.get(key) == "cached answer"
+        assert cache.stats()["hits"] == 2
+        
+        # Promotion to memory keeps the disk entry's remaining lifetime
+        cache.set("short", "soon stale", ttl=0.2)
+        cache = CompletionCache(MemoryCacheTier(ttl=60), SQLiteCacheTier(db_file))
+        assert cache.get("short") == "soon stale"
+        time.sleep(0.3)
+        assert cache.get("short") is None, "promoted entry outlived its disk row"
+        
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(db_file + suffix):
+                os.remove(db_file + suffix)
+        
+        print(f"✅ Completion Cache Tests: disk hit in {lookup_ms:.2f}ms, LRU and TTL honored")
+        return True
+        
+    except Exception as e:
+        print(f"❌ Completion Cache Error: {e}")
+        return False
+
+if __name__ == "__main__":
+    print("🚀 Testing Caching Components\n")
+    
+    cache_ok = test_completion_cache()
+    
+    if cache_ok:
+        print("\n🎉 All caching tests passed!")
+    else:
+        print("\n💥 Some tests failed. Please check the errors above.")
+        sys.exit(1)
@@ -0,0 +1,724 @@
+#!/usr/bin/env python3
+"""
+Test script to verify concurrent session execution
+"""
+
+import os
+import sys
+import time
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+# Add project root to Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+def test_session_executor():
+    """Test that session calls run concurrently and fail independently"""
+    print("⚡ Testing Session Executor...")
+    
+    try:
+        from services.session_executor import SessionExecutor
+        
+        executor = SessionExecutor(max_workers=6, call_timeout=2)
+        
+        def slow(value):
+            time.sleep(0.3)
+            return value
+        
+        def broken():
+            raise RuntimeError("model unavailable")
+        
+        start = time.time()
+        results, errors = executor.run({
+            "first": lambda: slow(1),
+            "second": lambda: slow(2),
+            "third": lambda: slow(3),
+            "broken": broken,
+        })
+        elapsed = time.time() - start
+        
+        assert results == {"first": 1, "second": 2, "third": 3}
+        assert "model unavailable" in errors["broken"]
+        assert elapsed < 0.8, f"calls ran serially ({elapsed:.2f}s)"
+        
+        results, errors = executor.run({"stuck": lambda: slow("late")}, timeout=0.05)
+        assert not results and "timed out" in errors["stuck"]
+        
+        # Concurrent sessions don't queue behind each other's calls
+        from concurrent.futures import ThreadPoolExecutor
+        with ThreadPoolExecutor(max_workers=8) as sessions:
+            outcomes = list(sessions.map(lambda _: executor.run(
+                {str(n): (lambda n=n: slow(n)) for n in range(4)}, timeout=0.5), range(8)))
+        assert all(not errors for _, errors in outcomes), "sessions timed out waiting for a shared pool"
+        
+        # A call's timeout starts when a worker picks it up, not while it is queued
+        narrow = SessionExecutor(max_workers=1)
+        results, errors = narrow.run({"first": lambda: slow(1), "second": lambda: slow(2)}, timeout=0.45)
+        assert results == {"first": 1, "second": 2} and not errors, errors
+        
+        executor.shutdown()
+        print(f"✅ Session Executor Tests: 3 calls in {elapsed:.2f}s, failures isolated")
+        return True
+        
+    except Exception as e:
+        print(f"❌ Session Executor Error: {e}")
+        return False
+
+def test_session_streaming():
+    """Test that streamed sections arrive as soon as each call finishes"""
+    print("📡 Testing Session Streaming...")
+    
+    try:
+        from services.session_executor import SessionExecutor
+        
+        executor = SessionExecutor(max_workers=3, call_timeout=0.5)
+        
+        def fast(on_chunk):
+            on_chunk("partial ")
+            return "fast result"
+        
+        def slow(on_chunk):
+            time.sleep(0.2)
+            return "slow result"
+        
+        def stuck(on_chunk):
+            time.sleep(1)
+        
+        start = time.time()
+        events = []
+        first_section_at = None
+        for kind, name, payload in executor.stream({"slow": slow, "fast": fast, "stuck": stuck}):
+            if kind == "section" and first_section_at is None:
+                first_section_at = time.time() - start
+            events.append((kind, name))
+        
+        assert events[:2] == [("delta", "fast"), ("section", "fast")], events
+        assert ("section", "slow") in events
+        assert events[-1] == ("error", "stuck")
+        assert first_section_at < 0.1, f"first section took {first_section_at:.2f}s"
+        
+        executor.shutdown()
+        print(f"✅ Session Streaming Tests: first section after {first_section_at * 1000:.0f}ms")
+        return True
+        
+    except Exception as e:
+        print(f"❌ Session Streaming Error: {e}")
+        return False
+
+def test_async_sessions():
+    """Test that async sessions overlap on one event loop"""
+    print("🌀 Testing Async Sessions...")
+    
+    try:
+        import asyncio
+        from services.session_executor import SessionExecutor
+        
+        executor = SessionExecutor(call_timeout=0.5)
+        
+        async def call(on_chunk=None):
+            await asyncio.sleep(0.2)
+            return "done"
+        
+        async def stuck(on_chunk=None):
+            await asyncio.sleep(1)
+        
+        async def many_sessions():
+            return await asyncio.gather(*(
+                executor.arun({"a": call, "b": call, "stuck": stuck}) for _ in range(200)
+            ))
+        
+        async def streamed():
+            return [(kind, name) async for kind, name, _ in executor.astream({"a": call, "stuck": stuck})]
+        
+        start = time.time()
+        sessions = asyncio.run(many_sessions())
+        elapsed = time.time() - start
+        
+        assert all(results == {"a": "done", "b": "done"} for results, _ in sessions)
+        assert all("stuck" in errors for _, errors in sessions)
+        assert elapsed < 1.5, f"200 sessions took {elapsed:.2f}s"
+        assert asyncio.run(streamed()) == [("section", "a"), ("error", "stuck")]
+        
+        executor.shutdown()
+        print(f"✅ Async Session Tests: 200 sessions in {elapsed:.2f}s")
+        return True
+        
+    except Exception as e:
+        print(f"❌ Async Session Error: {e}")
+        return False
+
+def test_batch_executor():
+    """Test that batched sessions share one bounded pool and finish independently"""
+    print("📚 Testing Batch Executor...")
+    
+    try:
+        import threading
+        from services.batch import BatchExecutor, BatchJob, BatchJobStore, unique_topics
+        
+        assert unique_topics(["Python", " python ", "", "Neural  Networks", "neural networks"]) == \
+            ["Python", "Neural  Networks"]
+        
+        executor = BatchExecutor(max_workers=3, call_timeout=5)
+        lock = threading.Lock()
+        in_flight = [0, 0]  # current, peak
+        
+        def call(delay):
+            def run():
+                with lock:
+                    in_flight[0] += 1
+                    in_flight[1] = max(in_flight[1], in_flight[0])
+                time.sleep(delay)
+                with lock:
+                    in_flight[0] -= 1
+                return delay
+            return run
+        
+        def failing():
+            raise RuntimeError("boom")
+        
+        sessions = {f"topic {i}": {"a": call(0.05), "b": call(0.05)} for i in range(6)}
+        sessions["slow"] = {"a": call(0.3)}
+        sessions["broken"] = {"a": call(0.01), "b": failing}
+        
+        start = time.time()
+        finished = [(key, results, errors) for key, results, errors in executor.stream(sessions)]
+        elapsed = time.time() - start
+        
+        assert len(finished) == len(sessions)
+        assert in_flight[1] <= 3, f"{in_flight[1]} calls ran at once"
+        assert dict((key, errors) for key, _, errors in finished)["broken"] == {"b": "boom"}
+        assert elapsed < 1.0, f"batch took {elapsed:.2f}s"
+        executor.shutdown()
+        
+        # A hung call is reported as timed out instead of stalling the stream
+        release = threading.Event()
+        executor = BatchExecutor(max_workers=2, call_timeout=0.2)
+        start = time.time()
+        finished = dict((key, errors) for key, _, errors in executor.stream(
+            {"hung": {"a": lambda: release.wait(10)}, "quick": {"a": call(0.01)}}))
+        elapsed = time.time() - start
+        release.set()
+        executor.shutdown()
+        assert finished["quick"] == {} and "timed out" in finished["hung"]["a"], finished
+        assert elapsed < 1.0, f"hung call held the stream for {elapsed:.2f}s"
+        
+        import tempfile
+        from config import Config
+        with tempfile.TemporaryDirectory() as workdir:
+            # Nothing is opened until first use, and the default file is read then
+            filename = os.path.join(workdir, "jobs.db")
+            original, Config.JOB_QUEUE_DB_FILE = Config.JOB_QUEUE_DB_FILE, filename
+            try:
+                store = BatchJobStore(max_jobs=2, ttl=60)
+                assert not os.path.exists(filename)
+                assert store.get("unknown") is None and os.path.exists(filename)
+            finally:
+                Config.JOB_QUEUE_DB_FILE = original
+            jobs = [BatchJob(["a", "b"]) for _ in range(4)]
+            store.add(jobs[0])
+            jobs[0].finish()
+            for job in jobs[1:3]:
+                store.add(job)
+            assert store.get(jobs[0].job_id) is None, "oldest finished job should be evicted"
+            store.add(jobs[3])
+            assert all(store.get(job.job_id) for job in jobs[1:]), "unfinished jobs are never evicted"
+            jobs[2].record("a", {"quiz": "q"})
+            jobs[2].record("b", {"errors": {"quiz": "timeout"}})
+            jobs[2].finish()
+            status = store.get(jobs[2].job_id).to_dict(include_results=False)
+            assert status["status"] == "done" and status["completed"] == 2 and status["topics_with_errors"] == ["b"]
+            
+            # Another process sharing the file sees the same batches; one whose
+            # process stopped renewing its lease is reported lost
+            other = BatchJobStore(filename, max_jobs=10, ttl=60, lease_seconds=0)
+            assert other.get(jobs[2].job_id).to_dict()["results"]["a"] == {"quiz": "q"}
+            lost = BatchJob(["c"])
+            other.add(lost)
+            lost.start()
+            assert store.get(lost.job_id).to_dict()["error"] == "worker_lost"
+        
+        print(f"✅ Batch Executor Tests: {len(sessions)} sessions in {elapsed:.2f}s, peak {in_flight[1]} calls")
+        return True
+        
+    except Exception as e:
+        print(f"❌ Batch Executor Error: {e}")
+        return False
+
+def test_job_queue():
+    """Test queued jobs: priorities, per-user limits, leases and the worker"""
+    print("📬 Testing Job Queue...")
+    
+    try:
+        import tempfile
+        from services.job_queue import JobQueue
+        from worker import JobWorker
+        
+        with tempfile.TemporaryDirectory() as workdir:
+            filename = os.path.join(workdir, "jobs.db")
+            queue = JobQueue(filename, lease_seconds=60, max_attempts=2, max_per_user=1)
+            low = queue.enqueue("echo", {"n": 1}, "alice", priority=-10)
+            high = queue.enqueue("echo", {"n": 2}, "alice", priority=10)
+            other = queue.enqueue("echo", {"n": 3}, "bob")
+            assert queue.position(low) == 2 and queue.position(high) == 0
+            
+            first = queue.claim("w1")
+            assert first["job_id"] == high and first["status"] == "running" and first["attempts"] == 1
+            # alice already has a job running, so bob's goes next
+            assert queue.claim("w1")["job_id"] == other
+            assert queue.claim("w1") is None
+            
+            # A restarted process sees the same jobs; once the dead worker's
+            # leases run out its jobs are retried, up to max_attempts
+            queue = JobQueue(filename, lease_seconds=60, max_attempts=2, max_per_user=5)
+            assert queue.get(low)["status"] == "queued"
+            expire_leases = lambda: queue._conn.execute("UPDATE jobs SET lease_until = 0 WHERE status = 'running'")
+            expire_leases()
+            retried = queue.claim("w2")
+            assert retried["job_id"] == high and retried["attempts"] == 2
+            # w1 lost the lease on this job, so its late result is ignored
+            assert not queue.complete(high, {"n": "stale"}, "w1")
+            assert queue.get(high)["status"] == "running"
+            expire_leases()
+            
+            handlers = {"echo": lambda job: {"n": job["payload"]["n"]}}
+            worker = JobWorker(queue, handlers, concurrency=1, poll_interval=0.01)
+            while worker.run_once():
+                pass
+            statuses = {job_id: queue.get(job_id) for job_id in (low, high, other)}
+            assert all(job["status"] in ("done", "failed") for job in statuses.values()), statuses
+            assert statuses[low]["result"] == {"n": 1}
+            assert any(job["error"] == "worker_lost" for job in statuses.values()), \
+                "a job over its attempt limit should fail"
+            
+            broken = queue.enqueue("echo", {}, "carol")
+            worker.start()
+            time.sleep(0.2)
+            worker.stop()
+            worker.join()
+            assert queue.get(broken)["status"] == "failed" and "'n'" in queue.get(broken)["error"]
+            assert queue.counts()["failed"] == 2
+        
+        print("✅ Job Queue Tests: priorities, per-user limit, lease recovery and worker verified")
+        return True
+        
+    except Exception as e:
+        print(f"❌ Job Queue Error: {e}")
+        return False
+
+def test_stub_backend():
+    """Test the local stub backend and agents running on it"""
+    print("🧪 Testing Stub Backend...")
+    
+    try:
+        import asyncio
+        from agents.backends import StubBackend, StubRateLimitError
+        from agents.base_agent import BaseAgent
+        from agents.rate_limiter import RateLimiter
+        
+        backend = StubBackend(latency=0.05, tokens_per_second=1000, response_tokens=50, quota_per_minute=3)
+        start = time.time()
+        text = backend.generate("explain recursion")
+        elapsed = time.time() - start
+        assert text == backend.response_for("explain recursion"), "responses should be deterministic"
+        assert 0.09 <= elapsed < 0.5, f"latency plus 50 tokens took {elapsed:.2f}s"
+        
+        agent = BaseAgent("Stub Tester", "You are a test agent.", backend=backend)
+        agent.cache = None
+        agent.rate_limiter = RateLimiter(calls_per_minute=600)
+        chunks = []
+        streamed = agent.run("explain recursion", on_chunk=chunks.append)
+        assert len(chunks) > 1 and "".join(chunks) == streamed
+        assert asyncio.run(agent.arun("explain recursion")) == streamed
+        
+        try:
+            backend.generate("one call over quota")
+            assert False, "quota should have been exhausted"
+        except StubRateLimitError as e:
+            assert "Please retry in" in str(e) and e.retry_after > 0
+        
+        flaky = StubBackend(latency=0, tokens_per_second=0, error_rate=0.5, seed=7)
+        outcomes = []
+        for _ in range(40):
+            try:
+                flaky.generate("x")
+                outcomes.append(True)
+            except Exception:
+                outcomes.append(False)
+        assert 10 <= outcomes.count(False) <= 30 and flaky.failures == outcomes.count(False)
+        
+        print(f"✅ Stub Backend Tests: {elapsed * 1000:.0f}ms per call, quota and errors simulated")
+        return True
+        
+    except Exception as e:
+        print(f"❌ Stub Backend Error: {e}")
+        return False
+
+def test_metrics():
+    """Test metric rendering and per-session stage timing"""
+    print("📈 Testing Metrics...")
+    
+    try:
+        from services.metrics import MetricsRegistry, SessionTimer, SESSION_STAGE_SECONDS
+        
+        registry = MetricsRegistry()
+        calls = registry.counter("test_calls_total", "Calls made")
+        latency = registry.histogram("test_latency_seconds", "Call latency", buckets=(0.1, 1))
+        calls.inc(agent="planner")
+        calls.inc(2, agent="planner")
+        latency.observe(0.05)
+        latency.observe(0.5)
+        latency.observe(5)
+        
+        text = registry.render()
+        assert 'test_calls_total{agent="planner"} 3' in text
+        assert 'test_latency_seconds_bucket{le="0.1"} 1' in text
+        assert 'test_latency_seconds_bucket{le="1"} 2' in text
+        assert 'test_latency_seconds_bucket{le="+Inf"} 3' in text
+        assert "test_latency_seconds_count 3" in text
+        
+        timer = SessionTimer()
+        before = SESSION_STAGE_SECONDS.count(stage="plan")
+        wrapped = timer.wrap({"plan": lambda on_chunk=None: time.sleep(0.05) or "ok"})
+        assert wrapped["plan"]() == "ok"
+        timer.finish()
+        assert 0.05 <= timer.stages["plan"] <= timer.stages["total"]
+        assert SESSION_STAGE_SECONDS.count(stage="plan") == before + 1
+        
+        print("✅ Metrics Tests: counters, histograms and stage timings recorded")
+        return True
+        
+    except Exception as e:
+        print(f"❌ Metrics Error: {e}")
+        return False
+
+def test_retry_policy():
+    """Test retry-after parsing, jittered backoff, deadlines and the circuit breaker"""
+    print("🔁 Testing Retry Policy...")
+    
+    try:
+        from agents.backends import StubBackend
+        from agents.base_agent import BaseAgent
+        from agents.cache import CompletionCache, MemoryCacheTier
+        from agents.rate_limiter import RateLimiter
+        from agents.retry import (CircuitBreaker, CircuitOpenError, RetryPolicy, classify_error,
+                                  deadline_at, parse_retry_after, FATAL, RATE_LIMITED, RETRYABLE)
+        
+        quota_error = Exception("429 You exceeded your current quota. Please retry in 44.03s. "
+                                "[retry_delay {\n  seconds: 44\n}]")
+        assert parse_retry_after(quota_error) == 44.03
+        assert parse_retry_after(Exception("retry_delay {\n  seconds: 36\n}")) == 36
+        assert classify_error(quota_error) == RATE_LIMITED
+        assert classify_error(Exception("400 API key not valid")) == FATAL
+        assert classify_error(Exception("503 The service is currently unavailable")) == RETRYABLE
+        
+        policy = RetryPolicy(max_attempts=4, base_delay=1, max_delay=20, max_wait=10)
+        assert all(0 <= policy.next_delay(2, Exception("500")) <= 4 for _ in range(50))
+        assert 3 <= policy.next_delay(0, Exception("429 Please retry in 3s")) <= 4
+        assert policy.next_delay(0, quota_error) is None, "long hints should not be slept through"
+        assert policy.next_delay(3, Exception("500")) is None, "attempts exhausted"
+        assert policy.next_delay(0, Exception("400 bad request")) is None
+        with deadline_at(time.monotonic() + 2):
+            assert policy.next_delay(0, Exception("429 Please retry in 3s")) is None
+        
+        breaker = CircuitBreaker(failure_threshold=2, reset_timeout=0.1)
+        breaker.record_failure(Exception("500"))
+        breaker.before_call()
+        breaker.record_failure(Exception("500"))
+        try:
+            breaker.before_call()
+            assert False, "breaker should be open"
+        except CircuitOpenError:
+            pass
+        time.sleep(0.15)
+        breaker.before_call()  # the probe
+        try:
+            breaker.before_call()
+            assert False, "only one probe at a time"
+        except CircuitOpenError:
+            pass
+        breaker.record_success()
+        breaker.before_call()
+        
+        # A quota error is answered from the stale cache without sleeping
+        backend = StubBackend(latency=0, tokens_per_second=0, rate_limit_rate=1, retry_after=44)
+        agent = BaseAgent("Retry Tester", "You are a test agent.", backend=backend)
+        agent.rate_limiter = RateLimiter(calls_per_minute=600)
+        agent.circuit_breaker = CircuitBreaker()
+        agent.cache = CompletionCache(MemoryCacheTier())
+        agent.cache.set(CompletionCache.make_key(agent.system_prompt, "recursion", "stub"), "cached answer", ttl=-1)
+        
+        start = time.time()
+        assert agent.run("recursion") == "cached answer"
+        assert "provider unavailable" in agent.run("something new")
+        assert backend.calls == 1, "the open circuit should stop the second call"
+        assert time.time() - start < 1
+        
+        print("✅ Retry Policy Tests: hints honored, jitter bounded, circuit fails fast")
+        return True
+        
+    except Exception as e:
+        print(f"❌ Retry Policy Error: {e}")
+        return False
+
+def test_single_flight():
+    """Test that identical concurrent calls share one upstream call"""
+    print("🛫 Testing Single Flight...")
+    
+    try:
+        import asyncio
+        from concurrent.futures import ThreadPoolExecutor
+        from agents.backends import StubBackend
+        from agents.base_agent import BaseAgent
+        from agents.rate_limiter import RateLimiter
+        from agents.retry import CircuitBreaker
+        from agents.single_flight import SingleFlight
+        
+        backend = StubBackend(latency=0.2, tokens_per_second=0)
+        agent = BaseAgent("Flight Tester", "You are a test agent.", backend=backend)
+        agent.rate_limiter = RateLimiter(calls_per_minute=600)
+        agent.circuit_breaker = CircuitBreaker()
+        agent.cache = None
+        agent.single_flight = SingleFlight()
+        
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            results = list(pool.map(lambda _: agent.call("recursion"), range(8)))
+        assert backend.calls == 1, f"expected one upstream call, got {backend.calls}"
+        assert len({result.text for result in results}) == 1 and all(result.ok for result in results)
+        assert sum(result.coalesced for result in results) == 7
+        
+        async def gather_calls():
+            return await asyncio.gather(*(agent.acall("iteration") for _ in range(5)))
+        assert all(result.ok for result in asyncio.run(gather_calls()))
+        assert backend.calls == 2
+        
+        # Cancelling the leader does not take the shared call down with it
+        async def cancel_leader():
+            leader = asyncio.ensure_future(agent.acall("closures"))
+            await asyncio.sleep(0.05)
+            follower = asyncio.ensure_future(agent.acall("closures"))
+            await asyncio.sleep(0.05)
+            leader.cancel()
+            return await follower
+        result = asyncio.run(cancel_leader())
+        assert result.ok and result.coalesced and backend.calls == 3
+        
+        # Failures are not shared: the follower runs again instead
+        flight = SingleFlight()
+        calls = []
+        def flaky():
+            attempt = len(calls)
+            calls.append(attempt)
+            time.sleep(0.1)
+            if attempt == 0:
+                raise ValueError("leader failed")
+            return "answer"
+        def call_flaky():
+            try:
+                return flight.do("key", flaky)
+            except ValueError:
+                return None, False
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            outcomes = list(pool.map(lambda _: call_flaky(), range(2)))
+        assert sorted(outcomes, key=str) == [("answer", False), (None, False)], outcomes
+        
+        # A follower stops waiting after the timeout and calls on its own
+        flight = SingleFlight(timeout=0.05)
+        def slow():
+            time.sleep(0.2)
+            return "answer"
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            outcomes = list(pool.map(lambda _: flight.do("key", slow), range(2)))
+        assert outcomes == [("answer", False)] * 2, outcomes
+        
+        print("✅ Single Flight Tests: 8 identical calls cost 1, cancellation and failures isolated")
+        return True
+        
+    except Exception as e:
+        print(f"❌ Single Flight Error: {e}")
+        return False
+
+def test_rate_limiter():
+    """Test the shared token-bucket limiter"""
+    print("🚦 Testing Rate Limiter...")
+    
+    try:
+        from agents.rate_limiter import RateLimiter
+        
+        state_file = "data/test_rate_limit.state"
+        for backend_file in (None, state_file):
+            limiter = RateLimiter(calls_per_minute=3, tokens_per_minute=100, state_file=backend_file)
+            assert all(limiter.try_acquire(10) for _ in range(3))
+            assert not limiter.try_acquire(10), "request bucket should be empty"
+            wait = limiter.time_until_available()
+            assert 0 < wait <= 20, f"unexpected wait {wait:.1f}s"
+        
+        # A second limiter on the same file sees the first one's usage
+        assert not RateLimiter(calls_per_minute=3, state_file=state_file).try_acquire()
+        
+        # Workers forked after the file was opened (gunicorn --preload) still exclude each other
+        if hasattr(os, "fork"):
+            from agents.rate_limiter import _FileState
+            shared = _FileState(state_file)
+            shared.update(lambda state: (None, state))
+            spans_file = "data/test_rate_limit.spans"
+            children = []
+            for _ in range(2):
+                pid = os.fork()
+                if pid == 0:
+                    def hold(state):
+                        began = time.time()
+                        time.sleep(0.2)
+                        with open(spans_file, "a") as f:
+                            f.write(f"{began} {time.time()}\n")
+                        return None, state
+                    shared.update(hold)
+                    os._exit(0)
+                children.append(pid)
+            for pid in children:
+                os.waitpid(pid, 0)
+            with open(spans_file) as f:
+                spans = sorted(tuple(map(float, line.split())) for line in f)
+            os.remove(spans_file)
+            assert len(spans) == 2 and spans[0][1] <= spans[1][0], "forked workers held the lock together"
+        os.remove(state_file)
+        
+        limiter = RateLimiter(calls_per_minute=60, tokens_per_minute=100)
+        assert limiter.try_acquire(80)
+        assert not limiter.try_acquire(80), "token bucket should be nearly empty"
+        
+        print("✅ Rate Limiter Tests: request and token buckets enforced")
+        return True
+        
+    except Exception as e:
+        print(f"❌ Rate Limiter Error: {e}")
+        return False
+
+def test_cache_warmer():
+    """Test background warming with lower rate-limit priority than live calls"""
+    print("🔥 Testing Cache Warmer...")
+    
+    try:
+        from agents.rate_limiter import RateLimiter, background_priority
+        from memory.topic_index import popular_topics
+        from services.cache_warmer import CacheWarmer, WarmStore
+        
+        # Background calls leave half of each bucket for live requests
+        limiter = RateLimiter(calls_per_minute=4)
+        with background_priority():
+            assert limiter.try_acquire() and limiter.try_acquire()
+            assert not limiter.try_acquire(), "background call should not dip into the reserve"
+        assert limiter.try_acquire() and limiter.try_acquire(), "live calls should still be admitted"
+        
+        sessions = [{"user_input": topic, "user_profile": {"level": level}} for topic, level in (
+            ("Rust", "beginner"), ("rust ", "beginner"), ("Rust", "advanced"), ("Go", "beginner"))]
+        popular = popular_topics(sessions, 2)
+        assert [(entry["user_input"], entry["count"]) for entry in popular] == [("rust ", 2), ("Go", 1)]
+        
+        generated = []
+        def generate(topic, profile):
+            generated.append(topic)
+            return None if topic == "broken" else {"study_plan": f"plan for {topic}"}
+        
+        store = WarmStore()
+        targets = [("demo", {}), ("Popular", {}), ("popular", {}), ("broken", {})]
+        warmer = CacheWarmer(generate, lambda: targets, store, RateLimiter(calls_per_minute=600), refresh_after=60)
+        assert warmer.warm_once() == 2
+        assert generated == ["demo", "Popular", "broken"], f"unexpected warming order {generated}"
+        assert store.get("POPULAR ", {})["study_plan"] == "plan for Popular"
+        assert store.get("broken", {}) is None, "failed sessions should not be stored"
+        
+        # Fresh entries are left alone; only the failed topic is retried
+        generated.clear()
+        warmer.warm_once()
+        assert generated == ["broken"]
+        
+        # Nothing is started while live traffic has used up the spare quota
+        busy = RateLimiter(calls_per_minute=4)
+        assert all(busy.try_acquire() for _ in range(3))
+        generated.clear()
+        assert CacheWarmer(generate, lambda: targets, WarmStore(), busy).warm_once() == 0 and not generated
+        
+        print("✅ Cache Warmer Tests: warm store filled from spare quota, live calls first")
+        return True
+        
+    except Exception as e:
+        print(f"❌ Cache Warmer Error: {e}")
+        return False
+
+def test_prefetcher():
+    """Test bounded speculative prefetching that yields to live traffic"""
+    print("🔮 Testing Prefetcher...")
+    
+    try:
+        import threading
+        from agents.cache import CompletionCache, MemoryCacheTier, cache_ttl
+        from agents.rate_limiter import RateLimiter
+        from services.prefetcher import Prefetcher
+        
+        # Completions made under cache_ttl expire on its schedule
+        cache = CompletionCache(MemoryCacheTier(ttl=3600))
+        with cache_ttl(-1):
+            cache.set("speculative", "answer")
+        cache.set("live", "answer")
+        assert cache.get("speculative") is None and cache.get("live") == "answer"
+        
+        release = threading.Event()
+        fetched = []
+        def fetch(topic):
+            release.wait(5)
+            fetched.append(topic)
+            return True
+        
+        prefetcher = Prefetcher(fetch, max_workers=1, max_pending=3, rate_limiter=RateLimiter(calls_per_minute=600))
+        assert [prefetcher.submit(topic, topic) for topic in ("a", "b", "a", "c", "d")] == [
+            True, True, False, True, False], "duplicates and overflow should be refused"
+        release.set()
+        deadline = time.time() + 5
+        while prefetcher.pending() and time.time() < deadline:
+            time.sleep(0.01)
+        assert sorted(fetched) == ["a", "b", "c"], f"unexpected prefetches {fetched}"
+        
+        # Once live calls have taken the spare quota, queued prefetches are cancelled
+        busy = RateLimiter(calls_per_minute=4)
+        assert all(busy.try_acquire() for _ in range(3))
+        fetched.clear()
+        prefetcher = Prefetcher(fetch, max_workers=1, rate_limiter=busy)
+        for topic in ("x", "y", "z"):
+            prefetcher.submit(topic, topic)
+        deadline = time.time() + 5
+        while prefetcher.pending() and time.time() < deadline:
+            time.sleep(0.01)
+        assert not fetched and not prefetcher.pending(), "prefetches should yield to live traffic"
+        prefetcher.shutdown()
+        
+        print("✅ Prefetcher Tests: bounded, deduplicated, short-lived and cancelled under load")
+        return True
+        
+    except Exception as e:
+        print(f"❌ Prefetcher Error: {e}")
+        return False
+
+if __name__ == "__main__":
+    print("🚀 Testing Concurrency Components\n")
+    
+    executor_ok = test_session_executor()
+    streaming_ok = test_session_streaming()
+    async_ok = test_async_sessions()
+    batch_ok = test_batch_executor()
+    jobs_ok = test_job_queue()
+    stub_ok = test_stub_backend()
+    metrics_ok = test_metrics()
+    retry_ok = test_retry_policy()
+    limiter_ok = test_rate_limiter()
+    flight_ok = test_single_flight()
+    warmer_ok = test_cache_warmer()
+    prefetch_ok = test_prefetcher()
+    
+    if (executor_ok and streaming_ok and async_ok and batch_ok and jobs_ok and stub_ok and metrics_ok
+            and retry_ok and limiter_ok and flight_ok and warmer_ok and prefetch_ok):
+        print("\n🎉 All concurrency tests passed!")
+    else:
+        print("\n💥 Some tests failed. Please check the errors above.")
+        sys.exit(1)
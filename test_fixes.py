@@ -43,8 +43,10 @@ def test_memory():
         print(f"✅ Memory works - Sessions: {insights.get('total_sessions', 0)}")
         
         # Clean up
-        if os.path.exists("data/test_fix.json"):
-            os.remove("data/test_fix.json")
+        for suffix in ("", ".journal", ".sessions", ".lock"):
+            path = "data/test_fix.json" + suffix
+            if os.path.exists(path):
+                os.remove(path)
             
         return True
     except Exception as e:
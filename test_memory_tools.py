@@ -42,8 +42,10 @@ def test_memory_system():
         print(f"   - Completion Rate: {insights.get('completion_rate', '0%')}")
         
         # Clean up test file
-        if os.path.exists("data/test_memory.json"):
-            os.remove("data/test_memory.json")
+        for suffix in ("", ".journal", ".sessions", ".lock"):
+            path = "data/test_memory.json" + suffix
+            if os.path.exists(path):
+                os.remove(path)
             
         return True
         
@@ -79,6 +81,64 @@ def test_learning_tools():
         print(f"❌ Learning Tools Error: {e}")
         return False
 
+def test_topic_toolkit():
+    """Test the single-call topic toolkit and its per-tool fallback"""
+    print("🧰 Testing Topic Toolkit...")
+    
+    try:
+        import asyncio
+        import time
+        from agents.backends import StubBackend
+        from agents.rate_limiter import RateLimiter
+        from agents.retry import CircuitBreaker
+        from tools.learning_tools import LearningTools
+        
+        tools = LearningTools()
+        backend = StubBackend(latency=0, tokens_per_second=0, response_tokens=40)
+        agents = [tools.toolkit_agent, tools.topic_analyzer, tools.analogy_creator, tools.time_estimator]
+        for agent in agents:
+            agent.backend = backend
+            agent.cache = None
+            agent.rate_limiter = RateLimiter(calls_per_minute=600)
+            agent.circuit_breaker = CircuitBreaker()
+        
+        toolkit = tools.topic_toolkit("graph theory", "beginner")
+        assert backend.calls == 1, f"toolkit made {backend.calls} calls"
+        assert len(toolkit["subtopics"]) == 4 and toolkit["analogy"] and toolkit["time_estimate"]
+        assert asyncio.run(tools.atopic_toolkit("graph theory", "beginner")) == toolkit
+        
+        # Missing or malformed fields come from the individual tools
+        backend.response_for = lambda prompt, json_schema=None: (
+            '```json\n{"subtopics": ["Vertices", " "], "analogy": 7}\n```' if json_schema else "- A\n- B")
+        toolkit = tools.topic_toolkit("graph theory", "beginner")
+        assert toolkit["subtopics"] == ["Vertices"] and toolkit["analogy"] == "- A\n- B"
+        assert toolkit["time_estimate"] == "- A\n- B"
+        
+        backend.response_for = lambda prompt, json_schema=None: "not json" if json_schema else "- A\n- B"
+        assert asyncio.run(tools.atopic_toolkit("graph theory"))["subtopics"] == ["A", "B"]
+        
+        # An unusable answer is not cached, so the next session asks again
+        from agents.cache import CompletionCache, MemoryCacheTier
+        tools.toolkit_agent.cache = CompletionCache(MemoryCacheTier())
+        calls = backend.calls
+        tools.topic_toolkit("set theory")
+        tools.topic_toolkit("set theory")
+        assert backend.calls - calls == 8, f"{backend.calls - calls} calls"
+        
+        # The fallbacks run concurrently
+        backend.latency = 0.2
+        start = time.time()
+        tools.topic_toolkit("set theory", use_cache=False)
+        elapsed = time.time() - start
+        assert elapsed < 0.6, f"fallbacks took {elapsed:.2f}s"
+        
+        print("✅ Topic Toolkit Tests: one call for three sections, per-tool fallback")
+        return True
+        
+    except Exception as e:
+        print(f"❌ Topic Toolkit Error: {e}")
+        return False
+
 if __name__ == "__main__":
     print("🚀 Testing Step 3: Memory System & Learning Tools\n")
     
@@ -87,8 +147,9 @@ if __name__ == "__main__":
     
     # Test learning tools  
     tools_ok = test_learning_tools()
+    toolkit_ok = test_topic_toolkit()
     
-    if memory_ok and tools_ok:
+    if memory_ok and tools_ok and toolkit_ok:
         print("\n🎉 All Step 3 tests passed! Ready for Step 4: Web Interface!")
     else:
         print("\n💥 Some tests failed. Please check the errors above.")
@@ -0,0 +1,575 @@
+#!/usr/bin/env python3
+"""
+Test script to verify memory storage backends
+"""
+
+import os
+import sys
+import glob
+import shutil
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+# Add project root to Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+def _cleanup(prefix):
+    for path in glob.glob(prefix + "*"):
+        if os.path.isdir(path):
+            shutil.rmtree(path)
+        else:
+            os.remove(path)
+
+def test_journaled_memory():
+    """Test that journaled changes survive reloads, torn writes and compaction"""
+    print("📒 Testing Journaled Memory...")
+    
+    filename = "data/test_journal.json"
+    try:
+        from memory.memory_bank import MemoryBank
+        _cleanup(filename)
+        
+        memory = MemoryBank(filename)
+        memory.add_session("photosynthesis", {"study_plan": "plan"})
+        memory.update_progress("photosynthesis", 90.0)
+        memory.save_study_plan("photosynthesis", "plan")
+        assert not os.path.exists(filename), "snapshot should not be rewritten per change"
+        
+        # Simulate a crash in the middle of appending the next entry
+        with open(memory.journal_filename, 'a') as f:
+            f.write('{"op": "add_session", "sess')
+        
+        reloaded = MemoryBank(filename)
+        assert len(reloaded.memory["sessions"]) == 1
+        assert reloaded.memory["progress"]["default"]["average_score"] == 90.0
+        assert reloaded.memory["study_plans"]["photosynthesis"]["sessions_count"] == 1
+        
+        # A snapshot followed by a crash before the journal is truncated
+        # must not apply the same entries twice
+        with open(reloaded.journal_filename) as f:
+            journal = f.read()
+        reloaded.save()
+        with open(reloaded.journal_filename, 'w') as f:
+            f.write(journal)
+        reloaded = MemoryBank(filename)
+        assert len(reloaded.memory["sessions"]) == 1
+        assert reloaded.memory["progress"]["default"]["total_sessions"] == 1
+        
+        reloaded.add_session("osmosis", {})
+        assert len(MemoryBank(filename).memory["sessions"]) == 2
+        
+        print("✅ Journaled Memory Tests: replay, torn writes and snapshots consistent")
+        return True
+        
+    except Exception as e:
+        print(f"❌ Journaled Memory Error: {e}")
+        return False
+    finally:
+        _cleanup(filename)
+
+def test_incremental_insights():
+    """Test that the insights aggregate matches the session history"""
+    print("📈 Testing Incremental Insights...")
+    
+    filename = "data/test_insights.json"
+    try:
+        from datetime import datetime, timedelta
+        from memory.memory_bank import EnhancedMemoryBank
+        _cleanup(filename)
+        
+        memory = EnhancedMemoryBank(filename)
+        today = datetime.now()
+        # Two days in a row, a gap, then an older day recorded out of order
+        for days_ago, topic in [(1, "algebra"), (0, "geometry"), (0, "algebra"), (5, "history")]:
+            session = {
+                "timestamp": (today - timedelta(days=days_ago)).isoformat(),
+                "user_input": topic,
+                "responses": {"study_plan": "p", "explanation": "e", "quiz": "q"} if topic != "history" else {},
+                "user_profile": {}
+            }
+            memory._record({"op": "add_session", "session": session})
+            memory.update_progress(topic, 70.0 if topic == "history" else 90.0)
+        
+        insights = memory.get_learning_insights()
+        assert insights["total_sessions"] == 4
+        assert insights["topics_covered"] == 3
+        assert insights["completion_rate"] == "75.0%"
+        assert insights["average_quiz_score"] == "85.0%"
+        assert insights["learning_streak"] == 2
+        assert insights["first_session"] == (today - timedelta(days=5)).isoformat()[:10]
+        assert insights["recent_topics"] == ["algebra", "geometry", "algebra", "history"]
+        
+        # The aggregate survives a snapshot and is rebuilt for legacy files
+        memory.save()
+        assert EnhancedMemoryBank(filename).get_learning_insights() == insights
+        del memory.memory["insights"]
+        memory.save()
+        assert EnhancedMemoryBank(filename).get_learning_insights() == insights
+        
+        print("✅ Incremental Insights Tests: aggregate matches history")
+        return True
+        
+    except Exception as e:
+        print(f"❌ Incremental Insights Error: {e}")
+        return False
+    finally:
+        _cleanup(filename)
+
+def test_paginated_history():
+    """Test the compact session index, lazy bodies and cursor pagination"""
+    print("📖 Testing Paginated History...")
+    
+    filename = "data/test_history.json"
+    try:
+        import json
+        from memory.memory_bank import EnhancedMemoryBank
+        _cleanup(filename)
+        
+        memory = EnhancedMemoryBank(filename)
+        for i in range(25):
+            memory.add_session(f"topic {i}", {"study_plan": "long text " * 100, "score": 80.0})
+        
+        assert "responses" not in memory.memory["sessions"][0], "bodies should not stay resident"
+        
+        seen, cursor = [], None
+        while True:
+            page = memory.get_sessions_page(cursor, limit=10)
+            seen.extend(entry["user_input"] for entry in page["sessions"])
+            cursor = page["next_cursor"]
+            if cursor is None:
+                break
+        assert seen == [f"topic {i}" for i in reversed(range(25))]
+        
+        first_id = memory.memory["sessions"][0]["id"]
+        assert memory.get_session(first_id)["responses"]["study_plan"].startswith("long text")
+        assert [s["user_input"] for s in memory.get_recent_sessions(2)] == ["topic 23", "topic 24"]
+        
+        # Files written before the split keep their bodies inline; they move out on load
+        legacy = {"sessions": [{"timestamp": "2025-01-01T10:00:00", "user_input": "legacy",
+                                "responses": {"study_plan": "p", "explanation": "e", "quiz": "q"},
+                                "user_profile": {}}],
+                  "study_plans": {}, "progress": {}, "user_profiles": {}}
+        _cleanup(filename)
+        with open(filename, 'w') as f:
+            json.dump(legacy, f)
+        memory = EnhancedMemoryBank(filename)
+        assert "responses" not in memory.memory["sessions"][0]
+        assert memory.get_session(1)["user_input"] == "legacy"
+        assert EnhancedMemoryBank(filename).get_learning_insights()["total_sessions"] == 1
+        
+        print("✅ Paginated History Tests: 25 sessions paged, bodies loaded lazily")
+        return True
+        
+    except Exception as e:
+        print(f"❌ Paginated History Error: {e}")
+        return False
+    finally:
+        _cleanup(filename)
+
+def _write_sessions(filename, worker, count):
+    """Worker process for test_concurrent_writers"""
+    from memory.memory_bank import EnhancedMemoryBank
+    memory = EnhancedMemoryBank(filename)
+    for i in range(count):
+        memory.add_session(f"topic {worker}-{i}", {"study_plan": "p"})
+        memory.update_progress(f"topic {worker}", 50.0)
+
+def test_concurrent_writers():
+    """Test that worker processes sharing a shard never lose updates"""
+    print("👥 Testing Concurrent Writers...")
+    
+    filename = "data/test_shared.json"
+    try:
+        import multiprocessing
+        from config import Config
+        from memory.memory_bank import EnhancedMemoryBank
+        from memory.backends import UserMemoryRegistry
+        _cleanup(filename)
+        
+        # Small journal limit so the workers also compact under each other
+        original_limit = Config.JOURNAL_COMPACT_BYTES
+        Config.JOURNAL_COMPACT_BYTES = 4096
+        try:
+            workers = [multiprocessing.Process(target=_write_sessions, args=(filename, w, 40))
+                       for w in range(4)]
+            for worker in workers:
+                worker.start()
+            for worker in workers:
+                worker.join()
+        finally:
+            Config.JOURNAL_COMPACT_BYTES = original_limit
+        
+        memory = EnhancedMemoryBank(filename)
+        assert len(memory.memory["sessions"]) == 160
+        assert memory.get_learning_insights()["total_sessions"] == 160
+        assert memory.get_user_progress()["total_sessions"] == 160
+        
+        registry = UserMemoryRegistry(backend="json", users_dir="data/test_users")
+        assert registry.get("alice") is registry.get("alice")
+        assert registry.get("alice").filename != registry.get("bob").filename
+        assert registry.get("../etc/passwd").filename.startswith("data/test_users/")
+        assert registry.get("reader").get_learning_insights()["message"]
+        assert not glob.glob("data/test_users/reader*"), "reading creates no shard files"
+        # The first new visitor inherits the pre-partitioning "default" history, once
+        assert registry.claim_default() and not registry.claim_default()
+        assert not UserMemoryRegistry(backend="json", users_dir="data/test_users").claim_default()
+        
+        print("✅ Concurrent Writers Tests: 160/160 sessions kept across 4 processes")
+        return True
+        
+    except Exception as e:
+        print(f"❌ Concurrent Writers Error: {e}")
+        return False
+    finally:
+        _cleanup(filename)
+        _cleanup("data/test_users")
+
+def test_sqlite_memory():
+    """Test the SQLite backend against the JSON backend it replaces"""
+    print("🗃️ Testing SQLite Memory...")
+    
+    json_file = "data/test_migrate.json"
+    shard_file = "data/test_migrate_u1.json"
+    db_file = "data/test_memory.db"
+    try:
+        from memory.memory_bank import EnhancedMemoryBank
+        from memory.sqlite_memory_bank import SQLiteMemoryBank
+        _cleanup(json_file)
+        _cleanup(shard_file)
+        _cleanup(db_file)
+        
+        json_memory = EnhancedMemoryBank(json_file)
+        for topic, responses in [("algebra", {"study_plan": "p", "explanation": "e", "quiz": "q"}),
+                                 ("geometry", {"study_plan": "p"}),
+                                 ("algebra", {"study_plan": "p", "explanation": "e", "quiz": "q"})]:
+            json_memory.add_session(topic, responses, {"level": "beginner"})
+            json_memory.update_progress(topic, 80.0)
+        json_memory.save_study_plan("algebra", "plan")
+        
+        source_files = [json_file, json_file + ".journal", json_memory.sessions_filename]
+        before = {name: open(name, "rb").read() for name in source_files if os.path.exists(name)}
+        db_memory = SQLiteMemoryBank(db_file)
+        assert db_memory.import_json(json_file) == 3
+        after = {name: open(name, "rb").read() for name in source_files if os.path.exists(name)}
+        assert after == before, "importing must not rewrite the JSON files"
+        
+        # Importing again adds nothing twice
+        assert db_memory.import_json(json_file) == 0
+        assert db_memory.get_learning_insights()["total_sessions"] == 3
+        assert db_memory.get_user_progress()["quiz_scores"] == [80.0, 80.0, 80.0]
+        
+        # Another user's shard numbers its sessions from 1 too; all of them come in
+        shard = EnhancedMemoryBank(shard_file)
+        for topic in ("chemistry", "biology"):
+            shard.add_session(topic, {"study_plan": "p"}, {"level": "beginner"}, user_id="u1")
+            shard.update_progress(topic, 90.0, user_id="u1")
+        assert db_memory.import_json(shard_file) == 2
+        assert db_memory.import_json(shard_file) == 0
+        assert db_memory.get_learning_insights("u1")["total_sessions"] == 2
+        assert db_memory.get_learning_insights()["total_sessions"] == 3
+        
+        expected = json_memory.get_learning_insights()
+        actual = db_memory.get_learning_insights()
+        assert actual == expected, f"{actual} != {expected}"
+        assert db_memory.get_user_progress()["topics_covered"] == ["algebra", "geometry"]
+        assert [s["user_input"] for s in db_memory.get_recent_sessions(2)] == ["geometry", "algebra"]
+        page = db_memory.get_sessions_page(limit=2)
+        assert [s["user_input"] for s in page["sessions"]] == ["algebra", "geometry"]
+        assert db_memory.get_sessions_page(page["next_cursor"], limit=2)["next_cursor"] is None
+        
+        db_memory.add_session("calculus", {"study_plan": "p", "explanation": "e", "quiz": "q"})
+        db_memory.update_progress("calculus", 100.0)
+        insights = db_memory.get_learning_insights()
+        assert insights["total_sessions"] == 4 and insights["topics_covered"] == 3
+        assert insights["average_quiz_score"] == "85.0%"
+        assert insights["learning_streak"] == 1
+        
+        # Trimming keeps max_sessions per user, not across all users
+        db_memory.max_sessions = 2
+        db_memory.add_session("statistics", {"study_plan": "p"}, user_id="other")
+        assert db_memory.compact_memory("other") == 0
+        assert db_memory.get_learning_insights()["total_sessions"] == 4
+        assert db_memory.compact_memory() == 2
+        assert [s["user_input"] for s in db_memory.get_recent_sessions(5)] == ["algebra", "calculus"]
+        assert [s["user_input"] for s in db_memory.get_recent_sessions(5, user_id="other")] == ["statistics"]
+        
+        print("✅ SQLite Memory Tests: migration and insights match the JSON backend")
+        return True
+        
+    except Exception as e:
+        print(f"❌ SQLite Memory Error: {e}")
+        return False
+    finally:
+        _cleanup(json_file)
+        _cleanup(shard_file)
+        _cleanup(db_file)
+
+def test_failed_sessions():
+    """Test that failures are stored as error codes and never count as complete"""
+    print("🚫 Testing Failed Session Storage...")
+    
+    filename = "data/test_failures.json"
+    try:
+        from agents.backends import StubBackend
+        from agents.base_agent import BaseAgent
+        from agents.rate_limiter import RateLimiter
+        from agents.retry import CircuitBreaker
+        from memory.memory_bank import EnhancedMemoryBank, LEGACY_FAILURE_PREFIX
+        _cleanup(filename)
+        
+        agent = BaseAgent("Failing Agent", "You are a test agent.",
+                          backend=StubBackend(latency=0, tokens_per_second=0, rate_limit_rate=1, retry_after=60))
+        agent.cache = None
+        agent.rate_limiter = RateLimiter(calls_per_minute=600)
+        agent.circuit_breaker = CircuitBreaker()
+        result = agent.call("anything")
+        assert not result.ok and result.error_code == "rate_limited" and result.attempts == 1
+        
+        memory = EnhancedMemoryBank(filename)
+        memory.add_session("algebra", {"study_plan": "p", "explanation": "e", "quiz": "q", "score": 85.0})
+        memory.add_session("geometry", {"study_plan": "", "explanation": "e", "quiz": "q",
+                                        "errors": {"study_plan": "rate_limited"}})
+        
+        # A session saved by an older version, failure text and all
+        legacy_text = LEGACY_FAILURE_PREFIX + " Error: 429 You exceeded your current quota. " + "x" * 2000
+        memory.add_session("calculus", {"study_plan": legacy_text, "explanation": legacy_text,
+                                        "quiz": legacy_text, "subtopics": [legacy_text]})
+        memory.memory["sessions"][-1]["complete"] = True
+        memory.memory["insights"]["complete_sessions"] += 1
+        memory.memory["layout_version"] = 1
+        memory.save()
+        
+        reloaded = EnhancedMemoryBank(filename)
+        assert [s["complete"] for s in reloaded.memory["sessions"]] == [True, False, False]
+        assert reloaded.get_learning_insights()["completion_rate"] == "33.3%"
+        
+        geometry = reloaded.get_session(reloaded.memory["sessions"][1]["id"])["responses"]
+        assert "study_plan" not in geometry and geometry["errors"] == {"study_plan": "rate_limited"}
+        calculus = reloaded.get_session(reloaded.memory["sessions"][2]["id"])["responses"]
+        assert calculus == {"errors": {key: "rate_limited" for key in
+                                       ("study_plan", "explanation", "quiz", "subtopics")}}
+        
+        print("✅ Failed Session Tests: errors stored as codes, completion counts only valid sessions")
+        return True
+        
+    except Exception as e:
+        print(f"❌ Failed Session Error: {e}")
+        return False
+    finally:
+        _cleanup(filename)
+
+def test_similar_topics():
+    """Test near-duplicate topic lookup in both memory backends"""
+    print("🔎 Testing Similar Topic Lookup...")
+    
+    filename = "data/test_similar.json"
+    db_file = "data/test_similar.db"
+    try:
+        from memory.memory_bank import EnhancedMemoryBank
+        from memory.sqlite_memory_bank import SQLiteMemoryBank
+        from memory.topic_index import TopicIndex
+        _cleanup(filename)
+        _cleanup(db_file)
+        
+        index = TopicIndex()
+        for key, topic in enumerate(["machine learning basics", "graph theory", "World War 1"]):
+            index.add(key, topic)
+        assert index.search("ML basics", 0.85)[0][0] == 0
+        assert index.search("Intro to Machine Learning", 0.85)[0][0] == 0
+        assert index.search("GT", 0.85)[0][0] == 1
+        assert index.search("world war 2", 0.5) == [], "numbers must match"
+        assert index.search("machine learning for finance", 0.85) == []
+        
+        # Close n-grams are not enough when a word has no counterpart
+        for key, topic in enumerate(["programming", "computer vision", "neural networks"], start=3):
+            index.add(key, topic)
+        assert index.search("R programming", 0.85) == []
+        assert index.search("programming", 0.85)[0][0] == 3
+        assert index.search("neural network", 0.85)[0][0] == 5, "endings still match"
+        index.add(6, "R programming")
+        assert [key for key, _ in index.search("programming", 0.85)] == [3]
+        # Acronyms are only expanded when written in capitals
+        assert index.normalize("cv writing") == "cv writing"
+        assert index.search("CV writing", 0.85) == []
+        assert index.search("CV", 0.85)[0][0] == 4
+        # A differing first letter is a prefix, often one that reverses the meaning
+        for key, topic in enumerate(["asynchronous programming", "asymmetric key cryptography",
+                                     "asymmetric encryption"], start=7):
+            index.add(key, topic)
+        for topic in ("synchronous programming", "symmetric key cryptography", "symmetric encryption"):
+            assert index.search(topic, 0.85) == [], topic
+        assert index.search("asynchronous progamming", 0.85)[0][0] == 7, "one-letter typos still match"
+        
+        complete = {"study_plan": "p", "explanation": "e", "quiz": "q"}
+        beginner = {"level": "beginner"}
+        for memory in (EnhancedMemoryBank(filename), SQLiteMemoryBank(db_file)):
+            assert memory.find_similar_session("ML basics", beginner) is None
+            memory.add_session("machine learning basics", complete, beginner)
+            memory.add_session("machine learning", dict(complete, quiz="", errors={"quiz": "timeout"}), beginner)
+            memory.add_session("neural networks", complete, {"level": "advanced"})
+            
+            # The complete session wins over the newer partial one
+            match = memory.find_similar_session("ML basics", beginner)
+            assert match["user_input"] == "machine learning basics" and match["similarity"] == 1.0
+            assert memory.find_similar_session("neural network", beginner) is None, "profile must match"
+            assert memory.find_similar_session("neural network", {"level": "advanced"}) is not None
+            if isinstance(memory, SQLiteMemoryBank):
+                # One database serves every user, so lookups stay within the user's own sessions
+                assert memory.find_similar_session("ML basics", beginner, user_id="someone_else") is None
+            
+            # Sessions added after the index was built are found too
+            memory.add_session("graph theory", complete, beginner)
+            assert memory.find_similar_session("Graph Theory 101", beginner)["user_input"] == "graph theory"
+        
+        print("✅ Similar Topic Tests: acronyms, filler words and profiles handled in both backends")
+        return True
+        
+    except Exception as e:
+        print(f"❌ Similar Topic Error: {e}")
+        return False
+    finally:
+        _cleanup(filename)
+        _cleanup(db_file)
+
+def test_memory_retention():
+    """Test that old sessions move to the archive and stay queryable"""
+    print("🗄️  Testing Memory Retention...")
+    
+    filename = "data/test_retention.json"
+    db_file = "data/test_retention.db"
+    try:
+        from config import Config
+        from memory.memory_bank import EnhancedMemoryBank
+        from memory.sqlite_memory_bank import SQLiteMemoryBank
+        _cleanup(filename)
+        _cleanup(db_file)
+        
+        memory = EnhancedMemoryBank(filename, max_sessions=5)
+        complete = {"study_plan": "p", "explanation": "e", "quiz": "q"}
+        for n in range(1, 13):
+            memory.add_session(f"topic {n}", complete)
+        
+        # Whole segments only: 12 - 5 leaves room for one segment of 4
+        assert memory.archive_sessions(keep=5, segment_size=4) == 4
+        assert memory.compact_memory() == 0, "less than a segment over max_sessions"
+        assert [s["id"] for s in memory.memory["sessions"]][0] > 4
+        assert len(memory.memory["archives"]) >= 1
+        assert os.path.exists(memory.sessions_filename)
+        
+        # Archived sessions are still found, and history pages run on into the archive
+        assert memory.get_session(2)["user_input"] == "topic 2"
+        assert memory.get_session(12)["responses"]["quiz"] == "q"
+        assert memory.get_session(99) is None
+        seen, cursor = [], None
+        while True:
+            page = memory.get_sessions_page(cursor, limit=5)
+            seen += [s["id"] for s in page["sessions"]]
+            cursor = page["next_cursor"]
+            if cursor is None:
+                break
+        assert seen == list(range(12, 0, -1)), seen
+        assert memory.get_learning_insights()["total_sessions"] == 12
+        
+        # A fresh process sees the archive and new sessions land in the new file
+        reloaded = EnhancedMemoryBank(filename, max_sessions=5)
+        reloaded.add_session("topic 13", complete)
+        assert reloaded.get_session(13)["user_input"] == "topic 13"
+        assert reloaded.get_session(1)["user_input"] == "topic 1"
+        assert SQLiteMemoryBank(db_file).import_json(filename) == 13
+        
+        # Recording sessions archives in the background once a segment is due
+        original = Config.ARCHIVE_SEGMENT_SESSIONS
+        Config.ARCHIVE_SEGMENT_SESSIONS = 4
+        try:
+            reloaded.add_session("topic 14", complete)
+            reloaded._retention_thread.join(timeout=5)
+        finally:
+            Config.ARCHIVE_SEGMENT_SESSIONS = original
+        assert len(reloaded.memory["sessions"]) == 6
+        assert not os.path.exists(filename + ".sessions"), "only the previous sessions file is kept"
+        assert reloaded.get_session(14)["user_input"] == "topic 14"
+        assert reloaded.get_session(3)["user_input"] == "topic 3"
+        
+        print("✅ Retention Tests: old sessions archived, still queryable, live files bounded")
+        return True
+        
+    except Exception as e:
+        print(f"❌ Retention Error: {e}")
+        return False
+    finally:
+        _cleanup(filename)
+        _cleanup(db_file)
+
+def test_snapshot_formats():
+    """Test snapshot serializers, format detection and migration on load"""
+    print("📦 Testing Snapshot Formats...")
+    
+    from config import Config
+    
+    filename = "data/test_formats.json"
+    original = (Config.MEMORY_FORMAT, Config.MEMORY_COMPRESSION)
+    try:
+        from memory.memory_bank import EnhancedMemoryBank
+        from memory.serializers import MSGPACK_AVAILABLE, get_serializer, loads_any
+        _cleanup(filename)
+        
+        sample = {"sessions": [{"id": 1, "user_input": "caf\u00e9"}], "progress": {}}
+        formats = ["json", "json-pretty"] + (["msgpack"] if MSGPACK_AVAILABLE else [])
+        for fmt in formats:
+            for level in (0, 6):
+                serializer = get_serializer(fmt, level)
+                assert loads_any(serializer.dumps(sample)) == (sample, serializer.name), serializer.name
+        try:
+            loads_any(b"\x78 not really zlib")
+            assert False, "corrupt data should be rejected"
+        except ValueError:
+            pass
+        
+        # A pretty-printed file from an older version is rewritten in the configured format
+        Config.MEMORY_FORMAT, Config.MEMORY_COMPRESSION = "json-pretty", 0
+        memory = EnhancedMemoryBank(filename)
+        for n in range(5):
+            memory.add_session(f"topic {n}", {"study_plan": "p", "explanation": "e", "quiz": "q"})
+        memory.save()
+        with open(filename, "rb") as f:
+            assert f.read(2) == b"{\n"
+        insights = memory.get_learning_insights()
+        
+        Config.MEMORY_FORMAT, Config.MEMORY_COMPRESSION = "json", 6
+        migrated = EnhancedMemoryBank(filename)
+        with open(filename, "rb") as f:
+            assert loads_any(f.read())[1] == "json+zlib"
+        assert migrated.get_learning_insights() == insights
+        assert migrated.get_session(3)["user_input"] == "topic 2"
+        
+        print(f"✅ Snapshot Format Tests: {', '.join(formats)} round-trip, old files migrated on load")
+        return True
+        
+    except Exception as e:
+        print(f"❌ Snapshot Format Error: {e}")
+        return False
+    finally:
+        Config.MEMORY_FORMAT, Config.MEMORY_COMPRESSION = original
+        _cleanup(filename)
+
+if __name__ == "__main__":
+    print("🚀 Testing Memory Storage\n")
+    
+    journal_ok = test_journaled_memory()
+    insights_ok = test_incremental_insights()
+    history_ok = test_paginated_history()
+    writers_ok = test_concurrent_writers()
+    sqlite_ok = test_sqlite_memory()
+    failures_ok = test_failed_sessions()
+    similar_ok = test_similar_topics()
+    retention_ok = test_memory_retention()
+    formats_ok = test_snapshot_formats()
+    
+    if (journal_ok and insights_ok and history_ok and writers_ok and sqlite_ok and failures_ok
+            and similar_ok and retention_ok and formats_ok):
+        print("\n🎉 All storage tests passed!")
+    else:
+        print("\n💥 Some tests failed. Please check the errors above.")
+        sys.exit(1)
@@ -16,13 +16,27 @@ def test_web_imports():
     
     try:
         # Test Flask app import
-        from app import app, WebLearningCompanion
+        from app import app, companion, WebLearningCompanion
+        from config import Config
         print("✅ Flask app imports work")
         
+        # Nothing expensive happens until the first request needs it
+        if Config.LAZY_INIT:
+            assert companion.agents.built() == [], companion.agents.built()
+            assert not companion.memories._banks
+            assert companion.agents["planner"] is companion.agents["planner"]
+            print("✅ Agents and memory are built on first use")
+        
         # Test companion initialization
         companion = WebLearningCompanion()
         print("✅ Web learning companion initialized")
         
+        # Both entry points pick demo topics here, preferring warm ones
+        from app import DEMO_TOPICS, DEMO_PROFILE
+        companion.warm_store.put(DEMO_TOPICS[3], DEMO_PROFILE, {"study_plan": "p"})
+        assert {companion.demo_topic() for _ in range(20)} == {DEMO_TOPICS[3]}
+        print("✅ Quick demo prefers warm topics")
+        
         return True
         
     except Exception as e:
@@ -33,13 +47,24 @@ def test_flask_routes():
     """Test basic Flask functionality"""
     print("\nTesting Flask routes...")
     
+    import shutil
+    import tempfile
+    from config import Config
+    # Every file the app writes goes to a scratch directory, not data/
+    workdir = tempfile.mkdtemp()
+    data_paths = {"MEMORY_FILE": "learning_memory.json", "MEMORY_DB_FILE": "learning_memory.db",
+                  "USER_MEMORY_DIR": "users", "JOB_QUEUE_DB_FILE": "jobs.db"}
+    originals = {name: getattr(Config, name) for name in data_paths}
     try:
+        for name, path in data_paths.items():
+            setattr(Config, name, os.path.join(workdir, path))
         from app import app
         
         with app.test_client() as client:
             # Test home route
             response = client.get('/')
             assert response.status_code == 200
+            assert b"window.ERROR_MESSAGES" in response.data and b"rate_limited" in response.data
             print("✅ Home route works")
             
             # Test health check
@@ -57,11 +82,55 @@ def test_flask_routes():
             assert response.status_code == 200
             print("✅ Dashboard route works")
             
+            # Test metrics endpoint
+            response = client.get('/metrics')
+            assert response.status_code == 200
+            assert b"# TYPE agent_call_seconds histogram" in response.data
+            print("✅ Metrics route works")
+            
+            # Test batch validation and polling of unknown jobs
+            response = client.post('/api/batch', json={'topics': 'not a list'})
+            assert response.status_code == 400
+            response = client.get('/api/batch/unknown')
+            assert response.status_code == 404
+            print("✅ Batch routes work")
+            
+            # With the job queue on, the UI endpoints enqueue instead of generating
+            import tempfile
+            import app as app_module
+            from config import Config
+            from services.job_queue import JobQueue
+            with tempfile.TemporaryDirectory() as workdir:
+                queue = JobQueue(os.path.join(workdir, "jobs.db"))
+                get_job_queue, app_module.get_job_queue = app_module.get_job_queue, lambda: queue
+                enabled, Config.JOB_QUEUE_ENABLED = Config.JOB_QUEUE_ENABLED, True
+                try:
+                    streamed = client.post('/api/learning-session/stream', json={'topic': 'queued topic'})
+                    demo = client.get('/api/quick-demo')
+                    assert streamed.status_code == 202 and demo.status_code == 202
+                    job = client.get(streamed.get_json()['status_url']).get_json()
+                    assert job['status'] == 'queued' and job['topic'] == 'queued topic'
+                    assert queue.counts()['queued'] == 2
+                finally:
+                    Config.JOB_QUEUE_ENABLED = enabled
+                    app_module.get_job_queue = get_job_queue
+            print("✅ Queued session routes work")
+        
+        # A visitor who only reads leaves no memory files behind
+        with app.test_client() as other:
+            assert other.get('/dashboard').status_code == 200
+        assert os.listdir(Config.USER_MEMORY_DIR) == [".default_claimed"], os.listdir(Config.USER_MEMORY_DIR)
+        print("✅ Readers leave no memory files")
+        
         return True
         
     except Exception as e:
         print(f"❌ Flask route error: {e}")
         return False
+    finally:
+        for name, value in originals.items():
+            setattr(Config, name, value)
+        shutil.rmtree(workdir, ignore_errors=True)
 
 if __name__ == "__main__":
     print("🚀 Testing Step 4: Web Application\n")
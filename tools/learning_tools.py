@@ -1,36 +1,184 @@
+import asyncio
+import json
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import copy_context
+
 from agents.base_agent import BaseAgent
+from agents.registry import AGENTS, AgentRegistry
+
+TOOLKIT_FIELDS = ("subtopics", "analogy", "time_estimate")
+TOOLKIT_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "subtopics": {"type": "array", "items": {"type": "string"}},
+        "analogy": {"type": "string"},
+        "time_estimate": {"type": "string"},
+    },
+    "required": list(TOOLKIT_FIELDS),
+}
+
+AGENTS.register("topic_toolkit", lambda: BaseAgent(
+    "Topic Toolkit",
+    "You help learners get oriented in a new topic. Answer with a JSON object with exactly these keys: "
+    "\"subtopics\", a list of the 3-5 main subtopics; "
+    "\"analogy\", a simple, relatable analogy that makes the topic intuitive and memorable; "
+    "\"time_estimate\", a realistic study time for the given level at basic, intermediate "
+    "and comprehensive depth.",
+    response_schema=TOOLKIT_SCHEMA,
+    # An unusable answer would otherwise send every session on the topic down the fallback path
+    cacheable=lambda text: bool(parse_toolkit(text))
+))
+AGENTS.register("topic_analyzer", lambda: BaseAgent(
+    "Topic Analyzer",
+    "You break down complex topics into manageable subtopics. Return a clear list of 3-5 main subtopics."
+))
+AGENTS.register("analogy_creator", lambda: BaseAgent(
+    "Analogy Creator",
+    "You create simple, relatable analogies to explain complex concepts. Make them intuitive and memorable."
+))
+AGENTS.register("time_estimator", lambda: BaseAgent(
+    "Time Estimator",
+    "You estimate realistic study times for learning topics. Consider different depth levels (basic, intermediate, comprehensive)."
+))
+
+def parse_toolkit(text: str) -> dict:
+    """The well-formed fields of a toolkit answer's JSON"""
+    text = text.strip()
+    start, end = text.find("{"), text.rfind("}")
+    try:
+        data = json.loads(text[start:end + 1]) if start != -1 else None
+    except ValueError:
+        data = None
+    if not isinstance(data, dict):
+        return {}
+    
+    toolkit = {}
+    subtopics = data.get("subtopics")
+    if isinstance(subtopics, list):
+        subtopics = [item.strip() for item in subtopics if isinstance(item, str) and item.strip()]
+        if subtopics:
+            toolkit["subtopics"] = subtopics[:5]
+    for field in ("analogy", "time_estimate"):
+        if isinstance(data.get(field), str) and data[field].strip():
+            toolkit[field] = data[field].strip()
+    return toolkit
 
 class LearningTools:
-    """Custom tools for enhancing the learning experience"""
+    """Custom tools for enhancing the learning experience
+    
+    A tool whose agent call fails raises AgentCallError rather than
+    returning the failure text as if it were content. The tools' agents
+    come from ``agents`` and are only built when a tool is first used.
+    """
+    
+    def __init__(self, agents: AgentRegistry = AGENTS):
+        self.agents = agents
+    
+    @property
+    def toolkit_agent(self) -> BaseAgent:
+        return self.agents["topic_toolkit"]
+    
+    @property
+    def topic_analyzer(self) -> BaseAgent:
+        return self.agents["topic_analyzer"]
+    
+    @property
+    def analogy_creator(self) -> BaseAgent:
+        return self.agents["analogy_creator"]
     
-    def __init__(self):
-        self.topic_analyzer = BaseAgent(
-            "Topic Analyzer",
-            "You break down complex topics into manageable subtopics. Return a clear list of 3-5 main subtopics."
-        )
+    @property
+    def time_estimator(self) -> BaseAgent:
+        return self.agents["time_estimator"]
+    
+    def topic_toolkit(self, topic: str, level: str = "beginner", use_cache: bool = True) -> dict:
+        """Subtopics, analogy and study time estimate from a single model call
         
-        self.analogy_creator = BaseAgent(
-            "Analogy Creator",
-            "You create simple, relatable analogies to explain complex concepts. Make them intuitive and memorable."
-        )
+        Fields missing from the model's answer, or all three if it is not
+        valid JSON or the provider rejects JSON output, come from the
+        individual tools instead, called concurrently.
+        """
+        toolkit = self._parse_toolkit(self.toolkit_agent.call(
+            self._toolkit_prompt(topic, level), use_cache=use_cache))
+        fallbacks = {
+            "subtopics": lambda: self.break_down_topic(topic, use_cache),
+            "analogy": lambda: self.generate_analogy(topic, use_cache),
+            "time_estimate": lambda: self.estimate_study_time(topic, level, use_cache),
+        }
+        missing = [field for field in TOOLKIT_FIELDS if field not in toolkit]
+        if missing:
+            # Each call runs in a copy of this context, so the session deadline still applies
+            with ThreadPoolExecutor(max_workers=len(missing), thread_name_prefix="toolkit") as pool:
+                futures = [pool.submit(copy_context().run, fallbacks[field]) for field in missing]
+                toolkit.update(zip(missing, [future.result() for future in futures]))
+        return toolkit
+    
+    async def atopic_toolkit(self, topic: str, level: str = "beginner", use_cache: bool = True) -> dict:
+        """Async variant of topic_toolkit"""
+        toolkit = self._parse_toolkit(await self.toolkit_agent.acall(
+            self._toolkit_prompt(topic, level), use_cache=use_cache))
+        fallbacks = {
+            "subtopics": lambda: self.abreak_down_topic(topic, use_cache),
+            "analogy": lambda: self.agenerate_analogy(topic, use_cache),
+            "time_estimate": lambda: self.aestimate_study_time(topic, level, use_cache),
+        }
+        missing = [field for field in TOOLKIT_FIELDS if field not in toolkit]
+        values = await asyncio.gather(*(fallbacks[field]() for field in missing))
+        toolkit.update(zip(missing, values))
+        return toolkit
+    
+    def _toolkit_prompt(self, topic: str, level: str) -> str:
+        return f"Topic: {topic}\nStudent level: {level}"
+    
+    def _parse_toolkit(self, result) -> dict:
+        """The well-formed fields of a toolkit answer
         
-        self.time_estimator = BaseAgent(
-            "Time Estimator", 
-            "You estimate realistic study times for learning topics. Consider different depth levels (basic, intermediate, comprehensive)."
-        )
+        Raises AgentCallError if the call failed for any reason other than
+        the provider rejecting the request, which a plain call may survive.
+        """
+        if not result.ok:
+            if result.error_code != "request_rejected":
+                result.unwrap()
+            return {}
+        return parse_toolkit(result.text)
     
-    def break_down_topic(self, topic: str) -> list:
+    def break_down_topic(self, topic: str, use_cache: bool = True) -> list:
         """Break down a complex topic into subtopics"""
-        result = self.topic_analyzer.run(f"Break down this topic: {topic}")
+        result = self.topic_analyzer.call(f"Break down this topic: {topic}", use_cache=use_cache)
+        return self._parse_subtopics(result.unwrap())
+    
+    async def abreak_down_topic(self, topic: str, use_cache: bool = True) -> list:
+        """Async variant of break_down_topic"""
+        result = await self.topic_analyzer.acall(f"Break down this topic: {topic}", use_cache=use_cache)
+        return self._parse_subtopics(result.unwrap())
+    
+    def _parse_subtopics(self, result: str) -> list:
         # Simple parsing - extract lines that look like list items
         lines = [line.strip('- ').strip() for line in result.split('\n') if line.strip()]
         return lines[:5]  # Return max 5 subtopics
     
-    def generate_analogy(self, topic: str) -> str:
+    def generate_analogy(self, topic: str, use_cache: bool = True, on_chunk=None) -> str:
         """Generate a helpful analogy for understanding"""
-        return self.analogy_creator.run(f"Create an analogy to explain: {topic}")
+        return self.analogy_creator.call(f"Create an analogy to explain: {topic}",
+                                         use_cache=use_cache, on_chunk=on_chunk).unwrap()
+    
+    async def agenerate_analogy(self, topic: str, use_cache: bool = True, on_chunk=None) -> str:
+        """Async variant of generate_analogy"""
+        result = await self.analogy_creator.acall(f"Create an analogy to explain: {topic}",
+                                                  use_cache=use_cache, on_chunk=on_chunk)
+        return result.unwrap()
     
-    def estimate_study_time(self, topic: str, level: str = "beginner") -> str:
+    def estimate_study_time(self, topic: str, level: str = "beginner", use_cache: bool = True,
+                            on_chunk=None) -> str:
         """Estimate required study time"""
-        prompt = f"Estimate study time for a {level} to learn {topic}. Consider different depth levels."
-        return self.time_estimator.run(prompt)
\ No newline at end of file
+        return self.time_estimator.call(self._study_time_prompt(topic, level),
+                                        use_cache=use_cache, on_chunk=on_chunk).unwrap()
+    
+    async def aestimate_study_time(self, topic: str, level: str = "beginner", use_cache: bool = True,
+                                   on_chunk=None) -> str:
+        """Async variant of estimate_study_time"""
+        result = await self.time_estimator.acall(self._study_time_prompt(topic, level),
+                                                 use_cache=use_cache, on_chunk=on_chunk)
+        return result.unwrap()
+    
+    def _study_time_prompt(self, topic: str, level: str) -> str:
+        return f"Estimate study time for a {level} to learn {topic}. Consider different depth levels."
\ No newline at end of file
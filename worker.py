@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Background worker for queued learning sessions
+
+    python worker.py                # Config.JOB_WORKERS jobs at a time
+    python worker.py --workers 8
+
+Run it next to the web app started with JOB_QUEUE_ENABLED=1. Any number of
+worker processes can share one queue; stop one with Ctrl+C or SIGTERM and
+it finishes the jobs it is running before exiting.
+"""
+
+import argparse
+import os
+import signal
+import socket
+import sys
+import threading
+import time
+import uuid
+from typing import Callable, Dict
+
+# Add the project root to Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from config import Config
+from services.job_queue import JobQueue, get_job_queue
+
+class JobWorker:
+    """Runs queued jobs on a pool of threads until stopped
+    
+    ``handlers`` maps a job kind to a function taking the job and returning
+    its result. While jobs run, a heartbeat thread renews their leases so
+    other workers do not take them over.
+    """
+    
+    def __init__(self, queue: JobQueue, handlers: Dict[str, Callable[[Dict], Dict]],
+                 concurrency: int = Config.JOB_WORKERS, poll_interval: float = Config.JOB_POLL_INTERVAL):
+        self.queue = queue
+        self.handlers = handlers
+        self.concurrency = concurrency
+        self.poll_interval = poll_interval
+        self.name = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+        self._active = set()
+        self._lock = threading.Lock()
+        self._stopping = threading.Event()
+        self._stopped = threading.Event()
+        self._threads = []
+    
+    def run_once(self) -> bool:
+        """Claim and run one job; returns False if none was runnable"""
+        job = self.queue.claim(self.name)
+        if job is None:
+            return False
+        
+        with self._lock:
+            self._active.add(job["job_id"])
+        try:
+            handler = self.handlers.get(job["kind"])
+            if handler is None:
+                self.queue.fail(job["job_id"], f"Unknown job kind: {job['kind']}", self.name)
+            else:
+                self.queue.complete(job["job_id"], handler(job), self.name)
+        except Exception as e:
+            self.queue.fail(job["job_id"], f"An error occurred: {str(e)}", self.name)
+        finally:
+            with self._lock:
+                self._active.discard(job["job_id"])
+        return True
+    
+    def start(self):
+        self._threads = [threading.Thread(target=self._work, name=f"job-worker-{n}")
+                         for n in range(self.concurrency)]
+        self._threads.append(threading.Thread(target=self._heartbeat, name="job-heartbeat", daemon=True))
+        for thread in self._threads:
+            thread.start()
+    
+    def stop(self):
+        """Stop claiming jobs; the running ones still finish"""
+        self._stopping.set()
+    
+    def join(self):
+        for thread in self._threads[:-1]:
+            thread.join()
+        self._stopped.set()
+    
+    def _work(self):
+        while not self._stopping.is_set():
+            if not self.run_once():
+                self._stopping.wait(self.poll_interval)
+    
+    def _heartbeat(self):
+        last_prune = 0.0
+        while not self._stopped.wait(self.queue.lease_seconds / 3):
+            with self._lock:
+                active = list(self._active)
+            for job_id in active:
+                self.queue.renew(job_id, self.name)
+            if time.monotonic() - last_prune > 60 * 60:
+                self.queue.prune()
+                last_prune = time.monotonic()
+
+def learning_session_handler(companion) -> Callable[[Dict], Dict]:
+    """Run a queued learning session on ``companion``"""
+    def run(job: Dict) -> Dict:
+        payload = job["payload"]
+        session_data = companion.run_learning_session(payload["topic"], payload.get("profile"),
+                                                      payload.get("use_cache", True), job["user_id"])
+        return {"topic": payload["topic"], "session_data": session_data}
+    return run
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run queued learning sessions")
+    parser.add_argument("--workers", type=int, default=Config.JOB_WORKERS,
+                        help="jobs to run at once in this process")
+    args = parser.parse_args(argv)
+    
+    from app import companion
+    
+    worker = JobWorker(get_job_queue(), {"learning_session": learning_session_handler(companion)},
+                       concurrency=args.workers)
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(signum, lambda *_: worker.stop())
+    
+    print(f"🛠️  Worker {worker.name} running {args.workers} jobs at a time (Ctrl+C to stop)")
+    worker.start()
+    worker.join()
+    print("👋 Worker stopped")
+
+if __name__ == '__main__':
+    main()